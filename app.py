@@ -4,8 +4,7 @@
 import os
 import time
 import threading
-import numpy as np
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from collections import deque
 
 import pathway as pw
@@ -13,83 +12,52 @@ from dotenv import load_dotenv
 from codecarbon import EmissionsTracker
 
 from config import (
-    STATIONS, CITY_NAMES, AQI_POLL_INTERVAL, FIRE_POLL_INTERVAL,
-    PERSISTENCE_THRESHOLD, HIGH_AQI_THRESHOLD,
-    WINDOW_DURATION_MINUTES, WINDOW_HOP_MINUTES,
-    HYSTERESIS_CONFIRMATIONS, CPCB_BANDS, GRAP_STAGES,
-    VULNERABILITY_MULTIPLIERS,
+    STATIONS, CITY_NAMES, AQI_POLL_INTERVAL,
+    AQI_SCHEDULER_TICK_SECONDS, AQI_INGEST_MODE, AQI_BULK_BOUNDS,
+    REPLAY_DIR, REPLAY_SPEED, MICRO_NODE_COUNT, MICRO_NODE_SEED, MICRO_NODE_INTERVAL,
+    MICRO_PUSH_PORT, MICRO_PUSH_HOST, MICRO_PUSH_BACKLOG,
+    WINDOW_DURATION_MINUTES, WINDOW_HOP_MINUTES, HYSTERESIS_CONFIRMATIONS, WINDOW_EMIT_MODE,
+    ENRICH_MODE,
+)
+from ingestion.aqi_stream import (
+    poll_stations, poll_bounds, restate_unchanged, should_emit, forget_station,
+    parse_feed_payload, parse_bounds_payload, _debug_data,
+)
+from ingestion.poll_scheduler import PollScheduler
+from ingestion.firms_stream import (
+    get_firms_data, ingest_firms_csv, ingest_firms_region, detections, evict_detections,
+    start_firms_poller,
+)
+from ingestion.replay import iter_segments, paced
+from ingestion.micro_nodes import (
+    MicroNodeFleet, run_fleet, PushIngest, serve_push, run_push,
 )
-from ingestion.aqi_stream import fetch_aqi, _debug_data
-from ingestion.fire_stream import fetch_fire_count
-from ingestion.firms_stream import get_firms_data, compute_transport_score
 from rag.advisory_engine import generate_grounded_advisory, _rag_state
 from rag.llm_engine import generate_llm_analysis
+from rag.enrichment_queue import EnrichmentQueue
+from streaming.fire_transport import (
+    FireDetectionSchema, FireSiteSchema, FireDetectionConnector, FireSiteConnector,
+    station_fires, station_winds, transport_table, with_transport,
+)
+from streaming.risk_engine import (
+    cpcb_band, get_grap_stage, preemptive_advisory, compute_confidence, compute_eri,
+    assess_windows, enrich_windows,
+    WindowAssessor,
+)
+from streaming.state_machine import window_history
+from streaming.published_state import latest_state, lock as _state_lock, publish, patch_enrichment
+from streaming.window_gate import WindowGate, window_behavior
 
 load_dotenv()
 
 # shared state dicts (read by streamlit)
-latest_state = {}
 carbon_state = {"total_gco2": 0.0, "decision_count": 0, "per_decision_gco2": 0.0}
 escalation_log = deque(maxlen=50)
 
-# rolling buffer for trend prediction
-aqi_history = {}
-
-
-def compute_short_term_forecast(history):
-    """5-min and 30-min AQI projection via linear regression."""
-    if len(history) < 3:
-        return None
-
-    times = np.arange(len(history))
-    values = np.array([h["aqi"] for h in history])
-
-    slope, intercept = np.polyfit(times, values, 1)
-    projected_5min = max(0, min(500, int(slope * (len(history) + 5) + intercept)))
-    projected_30min = max(0, min(500, int(slope * (len(history) + 30) + intercept)))
-    current_aqi = values[-1]
-
-    if slope > 2:
-        direction = "rising"
-    elif slope < -2:
-        direction = "falling"
-    else:
-        direction = "stable"
-
-    # how long until we hit the threshold
-    escalation_eta = None
-    if slope > 0 and current_aqi < HIGH_AQI_THRESHOLD:
-        windows_to_threshold = (HIGH_AQI_THRESHOLD - current_aqi) / slope
-        escalation_eta = round(windows_to_threshold * (AQI_POLL_INTERVAL / 60), 1)
-
-    # z-score anomaly check
-    mean_aqi = np.mean(values)
-    std_aqi = np.std(values)
-    anomaly = bool(std_aqi > 0 and abs(current_aqi - mean_aqi) > 2 * std_aqi)
-
-    def _grap_for_aqi(a):
-        for lo, hi, stage, _ in GRAP_STAGES:
-            if lo <= a <= hi:
-                return stage
-        return "Stage IV (Severe+)" if a > 500 else "None"
-
-    return {
-        "slope": round(float(slope), 2),
-        "direction": direction,
-        "projected_5min": projected_5min,
-        "projected_30min": projected_30min,
-        "predicted_grap": _grap_for_aqi(projected_5min),
-        "predicted_grap_30min": _grap_for_aqi(projected_30min),
-        "exposure_score_30min": int(projected_30min * 0.6),
-        "escalation_eta": escalation_eta,
-        "anomaly": anomaly,
-        "rate_per_min": round(float(slope) * (60 / AQI_POLL_INTERVAL), 2),
-        "data_points": len(history),
-    }
-
+# event-driven transport patches between windows (TransportObserver)
+transport_refresh = {"patches": 0, "rescored": 0, "latencies": deque(maxlen=500)}
 
-# consecutive window tracker (observer-side)
-_consecutive_high = {}
+# GRAP hysteresis tracker (observer-side)
 _hysteresis_tracker = {}
 
 # carbon tracking
@@ -99,24 +67,6 @@ _last_carbon_flush = time.time()
 _CARBON_FLUSH_INTERVAL = 30
 
 
-def cpcb_band(aqi):
-    if aqi is None:
-        return "Unknown"
-    for lo, hi, label in CPCB_BANDS:
-        if lo <= aqi <= hi:
-            return label
-    return "Severe"
-
-
-def get_grap_stage(aqi):
-    if aqi is None:
-        return "Unknown", "No data"
-    for lo, hi, stage, desc in GRAP_STAGES:
-        if lo <= aqi <= hi:
-            return stage, desc
-    return "Stage IV (Severe+)", "Emergency actions under GRAP Stage IV"
-
-
 def check_hysteresis(city, new_stage):
     rec = _hysteresis_tracker.get(city, {"stage": "None", "pending": None, "count": 0})
 
@@ -143,50 +93,188 @@ def check_hysteresis(city, new_stage):
         return False, rec["stage"]
 
 
+def _hysteresis_pending(city):
+    """Poll-scheduler hint: a stage change is awaiting confirmation."""
+    return _hysteresis_tracker.get(city, {}).get("pending") is not None
+
+
 # --- Pathway schemas ---
 
 class AQISchema(pw.Schema):
     timestamp: pw.DateTimeUtc
+    event_time: pw.DateTimeUtc
     aqi: int
     city: str
-
-class FireSchema(pw.Schema):
-    timestamp: pw.DateTimeUtc
-    fire_count: int
+    # station wind, or the interpolated grid's when the feed has none
+    wind_speed: float | None = pw.column_definition(default_value=None)
+    wind_direction: float | None = pw.column_definition(default_value=None)
+    wind_source: str = pw.column_definition(default_value="none")
+    pollutants: int = pw.column_definition(default_value=0)  # pollutant readings in the payload
 
 
 # --- Connectors (pan-india) ---
 
 class AQIConnector(pw.io.python.ConnectorSubject):
     def run(self):
+        if AQI_INGEST_MODE == "bounds":
+            self._run_bounds()
+        else:
+            self._run_feeds()
+
+    def _run_bounds(self):
+        while True:
+            stats = poll_bounds(AQI_BULK_BOUNDS, self._emit)
+            print(
+                f"[AQI] bulk cycle {stats['cycle']}: {stats['emitted']}/{stats['stations']} "
+                f"stations emitted, {stats['suppressed']} unchanged suppressed, "
+                f"in {stats['wall_seconds']}s"
+            )
+            time.sleep(AQI_POLL_INTERVAL)
+
+    def _run_feeds(self):
         from station_loader import get_all_stations
         stations = get_all_stations(STATIONS, limit=30)
+        scheduler = PollScheduler(stations, hot_fn=_hysteresis_pending)
         while True:
-            for name, info in stations.items():
-                record = fetch_aqi(name, info["feed_id"])
-                if record:
-                    if record["timestamp"].tzinfo is None:
-                        record["timestamp"] = record["timestamp"].replace(tzinfo=timezone.utc)
-                    self.next(**record)
-            time.sleep(AQI_POLL_INTERVAL)
+            due = scheduler.pop_due()
+            if due:
+                stats = poll_stations(
+                    {name: stations[name] for name in due}, self._emit,
+                    on_result=scheduler.observe,
+                )
+                for name in stats["overran"]:
+                    scheduler.retry(name)
+                print(
+                    f"[AQI] cycle {stats['cycle']}: {stats['emitted']}/{stats['stations']} "
+                    f"due stations emitted, {stats['suppressed']} unchanged suppressed, "
+                    f"{stats['wall_seconds']}s ({int(stats['budget_used'] * 100)}% of budget)"
+                    + (f", overran: {', '.join(stats['overran'])}" if stats["overran"] else "")
+                )
+            restate_unchanged(self._emit)
+            time.sleep(min(scheduler.seconds_until_due(), AQI_SCHEDULER_TICK_SECONDS))
+
+    def _emit(self, record):
+        if record["timestamp"].tzinfo is None:
+            record["timestamp"] = record["timestamp"].replace(tzinfo=timezone.utc)
+        self.next(**record)
+
+class MicroNodeConnector(pw.io.python.ConnectorSubject):
+    """Simulated micro-sensor fleet (AREE_MICRO_NODES), merged into aqi_table."""
+
+    def __init__(self, count, seed=MICRO_NODE_SEED):
+        super().__init__()
+        self._fleet = MicroNodeFleet(count, seed=seed)
 
-class FireConnector(pw.io.python.ConnectorSubject):
     def run(self):
-        while True:
-            record = fetch_fire_count()
-            if record:
-                if record["timestamp"].tzinfo is None:
-                    record["timestamp"] = record["timestamp"].replace(tzinfo=timezone.utc)
-                self.next(**record)
-            time.sleep(FIRE_POLL_INTERVAL)
+        run_fleet(self._fleet, lambda record: self.next(**record), MICRO_NODE_INTERVAL)
+
+
+class MicroPushConnector(pw.io.python.ConnectorSubject):
+    """Readings POSTed by field micro-nodes (AREE_MICRO_PUSH_PORT), one commit per micro-batch."""
+
+    def __init__(self, ingest):
+        super().__init__()
+        self.ingest = ingest
+
+    def run(self):
+        serve_push(self.ingest, MICRO_PUSH_HOST, MICRO_PUSH_PORT)
+        run_push(self.ingest, lambda record: self.next(**record), self.commit)
+
+
+# --- Replay (offline runs from a recorded segment log) ---
+
+class ReplayConnector(pw.io.python.ConnectorSubject):
+    """
+    Feeds recorded payloads back through the ingestion parsers, paced by
+    their recorded arrival times (REPLAY_SPEED: 1 = real time, N = N×,
+    0 = as fast as possible). Records keep the recorded arrival as their
+    timestamp, so windows are identical whatever the speed. on_finish()
+    runs once the log is exhausted (or the replay fails).
+    """
+
+    def __init__(self, directory, handlers, speed=REPLAY_SPEED, on_finish=None):
+        super().__init__()
+        self._directory = directory
+        self._handlers = handlers
+        self._speed = speed
+        self._on_finish = on_finish
+
+    def run(self):
+        entries = iter_segments(self._directory, sources=set(self._handlers))
+        replayed = 0
+        for entry in paced(entries, self._speed):
+            arrival = datetime.fromtimestamp(entry["t"], tz=timezone.utc)
+            try:
+                for record in self._handlers[entry["src"]](entry, arrival):
+                    self.next(**record)
+            except Exception as e:
+                print(f"[REPLAY] {entry['src']}/{entry['key']} err: {e}")
+            replayed += 1
+        print(f"[REPLAY] {sorted(self._handlers)}: {replayed} payloads replayed")
+
+    def on_stop(self):
+        if self._on_finish:
+            self._on_finish()
+
+
+def _replay_waqi(entry, arrival):
+    body = entry["payload"]
+    record = parse_feed_payload(entry["key"], body["feed_id"], body["body"], arrival=arrival)
+    if record is None:
+        forget_station(entry["key"])
+    out = [record] if record and should_emit(record) else []
+    restate_unchanged(out.append, now=arrival)
+    return out
+
+
+def _replay_bounds(entry, arrival):
+    from station_loader import register_stations
+    records, stations = parse_bounds_payload(entry["key"], entry["payload"]["body"], arrival=arrival)
+    register_stations(stations)
+    return [r for r in records if should_emit(r)]
+
+
+def _replay_firms(entry, arrival):
+    body = entry["payload"]
+    ingest_firms_csv(entry["key"], body["bbox"], body["status"], body["text"], now=entry["t"])
+    evict_detections(now=entry["t"])
+    return []
+
+
+def _replay_firms_region(entry, arrival):
+    body = entry["payload"]
+    ingest_firms_region(entry["key"], body["stations"], body["status"], body["text"], now=entry["t"])
+    evict_detections(now=entry["t"])
+    return []
 
 
 # --- Pathway DAG ---
 
-aqi_table = pw.io.python.read(AQIConnector(), schema=AQISchema)
-fire_table = pw.io.python.read(FireConnector(), schema=FireSchema)
+if REPLAY_DIR:
+    _aqi_subject = ReplayConnector(REPLAY_DIR, {
+        "waqi": _replay_waqi, "waqi_bounds": _replay_bounds,
+        "firms": _replay_firms, "firms_region": _replay_firms_region,
+    }, on_finish=detections.close)  # the FIRMS connectors end with the log, so on_end runs
+else:
+    _aqi_subject = AQIConnector()
+
+aqi_table = pw.io.python.read(_aqi_subject, schema=AQISchema)
+
+if MICRO_NODE_COUNT > 0:
+    micro_table = pw.io.python.read(MicroNodeConnector(MICRO_NODE_COUNT), schema=AQISchema)
+    aqi_table = aqi_table.concat_reindex(micro_table)
+
+if MICRO_PUSH_PORT > 0:
+    # max_backlog_size makes next() block while the engine lags, which
+    # fills the ingest queue and turns into 503s for the pushing nodes
+    push_table = pw.io.python.read(
+        MicroPushConnector(PushIngest()), schema=AQISchema,
+        max_backlog_size=MICRO_PUSH_BACKLOG,
+    )
+    aqi_table = aqi_table.concat_reindex(push_table)
 
-# sliding window: max AQI per city per window
+# sliding window: max AQI per city per window; WINDOW_EMIT_MODE decides
+# whether open windows stream updates and when a window's state is dropped
 windowed = (
     aqi_table
     .windowby(
@@ -195,24 +283,144 @@ windowed = (
             duration=pw.Duration(minutes=WINDOW_DURATION_MINUTES),
             hop=pw.Duration(minutes=WINDOW_HOP_MINUTES),
         ),
+        behavior=window_behavior(),
         instance=pw.this.city,
     )
     .reduce(
         timestamp=pw.reducers.max(pw.this.timestamp),
+        event_time=pw.reducers.max(pw.this.event_time),
         city=pw.reducers.any(pw.this.city),
         aqi=pw.reducers.max(pw.this.aqi),
+        pollutants=pw.reducers.max(pw.this.pollutants),
+        window_start=pw.this._pw_window_start,
+        window_end=pw.this._pw_window_end,
     )
 )
 
+# FIRMS detections joined to station sites; transport is reduced per
+# station in the dataflow and attached to each window as it is computed
+fire_detections = pw.io.python.read(FireDetectionConnector(detections), schema=FireDetectionSchema)
+fire_sites = pw.io.python.read(FireSiteConnector(detections), schema=FireSiteSchema)
+transport = transport_table(station_fires(fire_sites, fire_detections), station_winds(aqi_table))
+
+# deterministic enrichment (band, stage, persistence, forecast, VPPE,
+# confidence, ERI): UDF stages, or the Observer's WindowAssessor (ENRICH_MODE)
+if ENRICH_MODE == "dataflow":
+    enriched_windows = enrich_windows(with_transport(assess_windows(window_history(windowed)), transport))
+else:
+    enriched_windows = with_transport(windowed, transport)
+
+
+# --- Background enrichment: RAG advisory + Gemini analysis ---
+
+# shown until a station's first enrichment job lands
+_ENRICHMENT_DEFAULTS = {
+    "advisory_text": "Advisory pending...",
+    "rag_policy_file": "N/A",
+    "rag_similarity_score": 0.0,
+    "rag_last_updated": "N/A",
+    "rag_index_type": "Embedded Vector Index",
+    "rag_docs_indexed": 0,
+    "rag_embed_model": "all-MiniLM-L6-v2",
+    "governance_rule": "",
+    "llm_analysis": {"summary": "Initializing...", "model": "gemini-2.5-flash-lite",
+                     "cached": False, "timestamp": None, "risk_trajectory": "unknown",
+                     "regulatory_escalation_likelihood": "unknown",
+                     "public_health_risk": "unknown", "anomaly_flag": False},
+    "enriched_version": 0,
+    "enrichment_lag_s": None,
+}
+
+
+def _enrich(city, version, job):
+    """Advisory + LLM text for one published state; patches latest_state[city]."""
+    forecast = job["forecast"]
+    aqi, band, effective_stage = job["aqi"], job["band"], job["stage"]
+    transport_score = job["transport_score"]
+
+    advisory_result = generate_grounded_advisory(
+        aqi=aqi, level=effective_stage, grap_description=job["grap_desc"],
+        band=band, fire_count=job["fire_count"],
+        high_count=job["consec"], remaining_windows=job["remaining"],
+        projected_time=job["projected"],
+        transport_score=transport_score, transport_label=job["transport_label"],
+        wind_speed=job["wind_speed"], wind_dir=job["wind_dir"],
+    )
+
+    # gemini analysis (explanation only)
+    llm_result = dict(_ENRICHMENT_DEFAULTS["llm_analysis"])
+    try:
+        trend_dir = forecast["direction"] if forecast else "insufficient_data"
+        proj_5 = forecast["projected_5min"] if forecast else aqi
+        proj_30 = forecast["projected_30min"] if forecast else aqi
+        anom = forecast["anomaly"] if forecast else False
+        llm_result = generate_llm_analysis(
+            station=city, aqi=aqi, trend_direction=trend_dir,
+            projected_5min=proj_5, transport_score=transport_score,
+            policy_context=advisory_result.get("advisory", "")[:500],
+            band=band, grap_stage=effective_stage, anomaly=anom,
+            projected_30min=proj_30, vulnerability_max=job["vulnerability_max"],
+        )
+    except Exception as e:
+        llm_result["summary"] = f"LLM unavailable: {str(e)[:80]}"
+
+    now = datetime.now(timezone.utc).timestamp()
+    patch_enrichment(city, version, {
+        "advisory_text": advisory_result["advisory"],
+        "rag_policy_file": advisory_result["policy_file"],
+        "rag_similarity_score": advisory_result["similarity_score"],
+        "rag_last_updated": advisory_result["policy_last_updated"],
+        "rag_index_type": advisory_result.get("index_type", "Embedded Vector Index"),
+        "rag_docs_indexed": advisory_result.get("docs_indexed", 0),
+        "rag_embed_model": advisory_result.get("embed_model", "all-MiniLM-L6-v2"),
+        "governance_rule": advisory_result.get("governance_rule", ""),
+        "llm_analysis": llm_result,
+        "enrichment_lag_s": round(now - job["published"], 3),  # state publish -> text patched
+    })
+
+
+enrichment = EnrichmentQueue(_enrich)
+
 
 # --- Observer: cross-window state tracking ---
 
+def _preview_window(row):
+    """Dashboard preview of a station's open window; escalation waits for it to close."""
+    preview = {
+        "window_start": row["window_start"],
+        "window_end": row["window_end"],
+        "aqi": row["aqi"],
+        "cpcb_band": cpcb_band(row["aqi"]),
+        "grap_stage": get_grap_stage(row["aqi"])[0],
+    }
+    with _state_lock:
+        state = latest_state.get(row["city"])
+        if state is None or row["window_end"] <= (state.get("window_end") or row["window_end"]):
+            return  # no closed window published yet, or an update to one already evaluated
+        state["window_preview"] = preview
+
+
+# one evaluation per station window, when it closes (streaming/window_gate.py)
+window_gate = WindowGate(closed_upstream=WINDOW_EMIT_MODE == "close")
+window_assessor = WindowAssessor()
+
+
 class Observer(pw.io.python.ConnectorObserver):
     def on_change(self, key, row, time, is_addition):
-        global _last_carbon_flush
+        window_gate.offer(row, is_addition)
+        if is_addition and WINDOW_EMIT_MODE != "close":
+            _preview_window(row)
 
-        if not is_addition:
-            return
+    def on_time_end(self, time):
+        for row in window_gate.release():
+            self._evaluate(row)
+
+    def on_end(self):
+        for row in window_gate.release(flush=True):
+            self._evaluate(row)
+
+    def _evaluate(self, row):
+        global _last_carbon_flush
 
         city = row["city"]
         aqi = row["aqi"]
@@ -224,34 +432,25 @@ class Observer(pw.io.python.ConnectorObserver):
         except (ValueError, TypeError):
             aqi = -1
         if aqi < 0 or window_ts is None:
-            latest_state[city] = {
+            publish(city, lambda previous: {
                 "status": "DATA_INVALID",
                 "reason": "Bad payload",
                 "aqi": 0, "timestamp": window_ts,
-            }
+            })
             return
 
-        # consecutive window tracking
-        if aqi >= HIGH_AQI_THRESHOLD:
-            _consecutive_high[city] = _consecutive_high.get(city, 0) + 1
-        else:
-            _consecutive_high[city] = 0
-
-        consec = _consecutive_high[city]
-        remaining = max(0, PERSISTENCE_THRESHOLD - consec)
-
-        # projected trigger time
-        if consec >= PERSISTENCE_THRESHOLD:
-            projected = "ACTIVE NOW"
-        else:
-            mins = remaining * WINDOW_HOP_MINUTES
-            if isinstance(window_ts, datetime):
-                projected = (window_ts + timedelta(minutes=mins)).strftime("%H:%M:%S")
-            else:
-                projected = "Calculating..."
-
-        band = cpcb_band(aqi)
-        grap_stage, grap_desc = get_grap_stage(aqi)
+        # band / stage / persistence / forecast / VPPE (streaming/risk_engine.py)
+        if ENRICH_MODE != "dataflow":
+            row = {**row, **window_assessor.assess(row, aqi)}
+        consec = row["consecutive_windows"]
+        remaining = row["remaining_windows"]
+        projected = row["projected_trigger_time"]
+        band = row["cpcb_band"]
+        grap_stage, grap_desc = row["grap_stage"], row["grap_description"]
+        forecast = row["forecast"].value
+        vulnerable_risk = row["vulnerable_risk"].value
+        vulnerability_max = row["vulnerability_max"]
+        preemptive_advisory = list(row["preemptive_advisory"])
 
         previous_stage = _hysteresis_tracker.get(city, {}).get("stage", "None")
         transitioned, effective_stage = check_hysteresis(city, grap_stage)
@@ -265,194 +464,87 @@ class Observer(pw.io.python.ConnectorObserver):
                 "band": band,
             })
 
-        # satellite transport scoring
+        # satellite transport scoring (computed in the dataflow, see streaming/fire_transport.py)
         debug = _debug_data.get(city, {})
-        wind_speed = debug.get("wind_speed")
-        wind_dir = debug.get("wind_direction")
-        transport_score, aligned_fires, transport_label = compute_transport_score(
-            city, wind_dir, wind_speed
-        )
-        firms = get_firms_data(city)
-
-        # advisory
-        advisory_result = generate_grounded_advisory(
-            aqi=aqi, level=effective_stage, grap_description=grap_desc,
-            band=band, fire_count=firms["fire_count"],
-            high_count=consec, remaining_windows=remaining,
-            projected_time=projected,
-            transport_score=transport_score, transport_label=transport_label,
-            wind_speed=wind_speed, wind_dir=wind_dir,
-        )
-
-        # trend prediction
-        if city not in aqi_history:
-            aqi_history[city] = deque(maxlen=10)
-        aqi_history[city].append({"timestamp": window_ts, "aqi": aqi})
-        forecast = compute_short_term_forecast(aqi_history[city])
-
-        # vulnerable population risk
-        vulnerable_risk = {}
-        preemptive_advisory = []
-        vulnerability_max = "low"
-        if forecast:
-            proj_30 = forecast["projected_30min"]
-            for group, multiplier in VULNERABILITY_MULTIPLIERS.items():
-                risk_score = int(proj_30 * multiplier)
-                if risk_score >= 300:
-                    level = "severe"
-                elif risk_score >= 200:
-                    level = "high"
-                elif risk_score >= 100:
-                    level = "moderate"
-                else:
-                    level = "low"
-                vulnerable_risk[group] = {
-                    "score": risk_score, "level": level, "multiplier": multiplier,
-                }
+        wind_speed = row.get("wind_speed")
+        wind_dir = row.get("wind_direction")
+        wind_source = row.get("wind_source") or "none"
+        transport_score = row.get("transport_score") or 0
+        aligned_fires = row.get("aligned_fires") or 0
+        transport_label = row.get("transport_label") or "none"
+        fire_count = row.get("fire_count") or 0
+        firms = get_firms_data(city)  # sync status / bbox only
+
+        # build state; advisory / LLM fields carry over until the queued job patches them
+        def build(previous):
+            preview = previous.get("window_preview")
+            return {
+                **{k: previous.get(k, v) for k, v in _ENRICHMENT_DEFAULTS.items()},
+                "aqi": aqi,
+                "timestamp": window_ts,
+                "event_time": row.get("event_time"),
+                "window_start": row["window_start"],
+                "window_end": row["window_end"],
+                "window_preview": preview if preview and preview["window_end"] > row["window_end"] else None,
+                "cpcb_band": band,
+                "grap_stage": effective_stage,
+                "grap_description": grap_desc,
+                "consecutive_windows": consec,
+                "remaining_windows": remaining,
+                "projected_trigger_time": projected,
+                "raw_pm25": debug.get("raw_pm25"),
+                "raw_pm10": debug.get("raw_pm10"),
+                "raw_no2": debug.get("raw_no2"),
+                "raw_so2": debug.get("raw_so2"),
+                "raw_o3": debug.get("raw_o3"),
+                "raw_co": debug.get("raw_co"),
+                "dominant_pollutant": debug.get("dominant_pollutant", "pm25"),
+                "pollutants_available": debug.get("pollutants_available", 0),
+                "wind_speed": wind_speed,
+                "wind_direction": wind_dir,
+                "wind_source": wind_source,
+                "waqi_aqi": debug.get("waqi_aqi"),
+                "waqi_timestamp": debug.get("waqi_timestamp", ""),
+                "station_name_api": debug.get("station_name_api", ""),
+                "stale_seconds": debug.get("stale_seconds"),
+                "ingestion_status": debug.get("status", "ok"),
+                "ingestion_error": debug.get("error"),
+                "feed_id": debug.get("feed_id", ""),
+                "api_time": debug.get("api_time", ""),
+                "fire_count": fire_count,
+                "high_conf_fires": row.get("high_conf_fires") or 0,
+                "fire_bbox": firms["bbox"],
+                "firms_sync": firms["last_sync"],
+                "firms_status": firms["status"],
+                "firms_error": firms.get("error"),
+                "firms_dataset": firms["dataset"],
+                "transport_score": transport_score,
+                "aligned_fires": aligned_fires,
+                "transport_label": transport_label,
+                "fires_seen": row.get("last_seen"),
+                "transport_latency": previous.get("transport_latency"),
+                "confidence_score": row["confidence_score"],
+                "forecast": forecast,
+                "vulnerable_risk": vulnerable_risk,
+                "vulnerability_max": vulnerability_max,
+                "preemptive_advisory": preemptive_advisory,
+                # ERI (advisory only, does not affect GRAP)
+                "eri_score": row["eri_score"],
+                "eri_category": row["eri_category"],
+                "eri_factors": list(row["eri_factors"]),
+            }
 
-            risk_levels = [v["level"] for v in vulnerable_risk.values()]
-            if "severe" in risk_levels:
-                vulnerability_max = "severe"
-            elif "high" in risk_levels:
-                vulnerability_max = "high"
-            elif "moderate" in risk_levels:
-                vulnerability_max = "moderate"
-
-            # pre-emptive advisory triggers
-            if forecast["direction"] == "rising" and proj_30 >= 200 and transport_score >= 40:
-                preemptive_advisory = [
-                    "Advise suspension of outdoor school activities",
-                    "Increase dust suppression enforcement",
-                    "Public health SMS advisory recommended",
-                    "Traffic enforcement readiness advised",
-                ]
-            elif forecast["direction"] == "rising" and proj_30 >= 200:
-                preemptive_advisory = [
-                    "Outdoor activity caution advisory recommended",
-                    "Construction dust suppression measures advised",
-                ]
-            elif forecast["direction"] == "rising" and proj_30 >= 150:
-                preemptive_advisory = [
-                    "Sensitive groups should reduce outdoor exposure",
-                ]
-
-        # gemini analysis (explanation only)
-        llm_result = {"summary": "Initializing...", "model": "gemini-2.5-flash-lite",
-                      "cached": False, "timestamp": None, "risk_trajectory": "unknown",
-                      "regulatory_escalation_likelihood": "unknown",
-                      "public_health_risk": "unknown", "anomaly_flag": False}
-        try:
-            trend_dir = forecast["direction"] if forecast else "insufficient_data"
-            proj_5 = forecast["projected_5min"] if forecast else aqi
-            proj_30 = forecast["projected_30min"] if forecast else aqi
-            anom = forecast["anomaly"] if forecast else False
-            llm_result = generate_llm_analysis(
-                station=city, aqi=aqi, trend_direction=trend_dir,
-                projected_5min=proj_5, transport_score=transport_score,
-                policy_context=advisory_result.get("advisory", "")[:500],
-                band=band, grap_stage=effective_stage, anomaly=anom,
-                projected_30min=proj_30, vulnerability_max=vulnerability_max,
-            )
-        except Exception as e:
-            llm_result["summary"] = f"LLM unavailable: {str(e)[:80]}"
-
-        # confidence score (deterministic, min 50%)
-        confidence_score = 50
-        if debug.get("api_time"):
-            confidence_score += 20
-        if debug.get("pollutants_available", 0) >= 2:
-            confidence_score += 10
-        if firms["fire_count"] > 0 and wind_speed is not None:
-            confidence_score += 20
-        confidence_score = min(max(confidence_score, 50), 100)
-
-        # build state
-        latest_state[city] = {
-            "aqi": aqi,
-            "timestamp": window_ts,
-            "cpcb_band": band,
-            "grap_stage": effective_stage,
-            "grap_description": grap_desc,
-            "consecutive_windows": consec,
-            "remaining_windows": remaining,
-            "projected_trigger_time": projected,
-            "advisory_text": advisory_result["advisory"],
-            "rag_policy_file": advisory_result["policy_file"],
-            "rag_similarity_score": advisory_result["similarity_score"],
-            "rag_last_updated": advisory_result["policy_last_updated"],
-            "rag_index_type": advisory_result.get("index_type", "Embedded Vector Index"),
-            "rag_docs_indexed": advisory_result.get("docs_indexed", 0),
-            "rag_embed_model": advisory_result.get("embed_model", "all-MiniLM-L6-v2"),
-            "governance_rule": advisory_result.get("governance_rule", ""),
-            "raw_pm25": debug.get("raw_pm25"),
-            "raw_pm10": debug.get("raw_pm10"),
-            "raw_no2": debug.get("raw_no2"),
-            "raw_so2": debug.get("raw_so2"),
-            "raw_o3": debug.get("raw_o3"),
-            "raw_co": debug.get("raw_co"),
-            "dominant_pollutant": debug.get("dominant_pollutant", "pm25"),
-            "pollutants_available": debug.get("pollutants_available", 0),
-            "wind_speed": wind_speed,
-            "wind_direction": wind_dir,
-            "waqi_aqi": debug.get("waqi_aqi"),
-            "waqi_timestamp": debug.get("waqi_timestamp", ""),
-            "station_name_api": debug.get("station_name_api", ""),
-            "stale_seconds": debug.get("stale_seconds"),
-            "ingestion_status": debug.get("status", "ok"),
-            "ingestion_error": debug.get("error"),
-            "feed_id": debug.get("feed_id", ""),
-            "api_time": debug.get("api_time", ""),
-            "fire_count": firms["fire_count"],
-            "high_conf_fires": firms["high_confidence"],
-            "fire_bbox": firms["bbox"],
-            "firms_sync": firms["last_sync"],
-            "firms_status": firms["status"],
-            "firms_error": firms.get("error"),
-            "firms_dataset": firms["dataset"],
-            "transport_score": transport_score,
-            "aligned_fires": aligned_fires,
-            "transport_label": transport_label,
-            "confidence_score": confidence_score,
-            "forecast": forecast,
-            "vulnerable_risk": vulnerable_risk,
-            "vulnerability_max": vulnerability_max,
-            "preemptive_advisory": preemptive_advisory,
-            "llm_analysis": llm_result,
-        }
-
-        # ERI (advisory only, does not affect GRAP)
-        eri_score = 0
-        eri_factors = []
-        if aqi >= 200:
-            eri_score += 40
-            eri_factors.append(f"AQI >= 200 (+40)")
-        if forecast and forecast.get("rate_per_min", 0) > 0.5:
-            eri_score += 20
-            eri_factors.append(f"Slope > 0.5 AQI/min (+20)")
-        if consec >= 1:
-            eri_score += 20
-            eri_factors.append(f"Persistence >= 1 window (+20)")
-        if transport_score > 50:
-            eri_score += 10
-            eri_factors.append(f"Transport score > 50 (+10)")
-        exp_score = forecast.get("exposure_score_30min", 0) if forecast else 0
-        if exp_score > 150:
-            eri_score += 10
-            eri_factors.append(f"Exposure score > 150 (+10)")
-        eri_score = min(100, max(0, eri_score))
-
-        if eri_score >= 76:
-            eri_category = "HIGH READINESS"
-        elif eri_score >= 51:
-            eri_category = "PRE-ESCALATION"
-        elif eri_score >= 26:
-            eri_category = "MONITOR"
-        else:
-            eri_category = "LOW READINESS"
+        version = publish(city, build)
 
-        latest_state[city]["eri_score"] = eri_score
-        latest_state[city]["eri_category"] = eri_category
-        latest_state[city]["eri_factors"] = eri_factors
+        # RAG + Gemini off the publish path, newest window per station wins
+        enrichment.submit(city, version, {
+            "aqi": aqi, "band": band, "stage": effective_stage, "grap_desc": grap_desc,
+            "fire_count": fire_count, "consec": consec, "remaining": remaining,
+            "projected": projected, "transport_score": transport_score,
+            "transport_label": transport_label, "wind_speed": wind_speed, "wind_dir": wind_dir,
+            "forecast": forecast, "vulnerability_max": vulnerability_max,
+            "published": datetime.now(timezone.utc).timestamp(),
+        })
 
         # carbon flush (periodic)
         carbon_state["decision_count"] += 1
@@ -471,10 +563,95 @@ class Observer(pw.io.python.ConnectorObserver):
             pass
 
 
-pw.io.python.write(windowed, Observer())
+# --- Transport observer: patch latest_state as soon as a fire batch lands ---
+
+class TransportObserver(pw.io.python.ConnectorObserver):
+    """
+    The transport table only changes for stations a fire batch (or a
+    wind change) touches. Patch their attribution, pre-emptive advisory,
+    confidence and ERI in latest_state without waiting for the next window, and record
+    how long the fires took to reach the published attribution.
+    """
+
+    def on_change(self, key, row, time, is_addition):
+        if not is_addition:
+            return
+        city = row["city"]
+        with _state_lock:  # the Observer may replace the state meanwhile
+            state = latest_state.get(city)
+            if state is None or "transport_score" not in state:
+                return  # no window observed yet; the Observer builds the state
+
+            transport_refresh["rescored"] += 1
+            patch = {
+                "transport_score": row["transport_score"],
+                "aligned_fires": row["aligned_fires"],
+                "transport_label": row["transport_label"],
+                "fire_count": row["fire_count"],
+                "high_conf_fires": row["high_conf_fires"],
+                "wind_speed": row["wind_speed"],
+                "wind_direction": row["wind_direction"],
+                "wind_source": row["wind_source"],
+            }
+            if all(state.get(k) == v for k, v in patch.items()):
+                return
+
+            now = datetime.now(timezone.utc).timestamp()
+            patch["confidence_score"] = compute_confidence(
+                state.get("api_time"), state.get("pollutants_available", 0),
+                row["fire_count"], row["wind_speed"],
+            )
+            patch["preemptive_advisory"] = preemptive_advisory(state.get("forecast"), row["transport_score"])
+            patch["eri_score"], patch["eri_category"], patch["eri_factors"] = compute_eri(
+                state["aqi"], state.get("forecast"), state.get("consecutive_windows", 0),
+                row["transport_score"],
+            )
+            patch["transport_updated_at"] = now
+
+            # fires newer than what the state last published: time their trip
+            seen = row.get("last_seen")
+            if seen is not None and seen > (state.get("fires_seen") or 0):
+                latency = {
+                    "city": city,
+                    "ingest_to_publish_s": round(now - seen, 3),
+                    "acquired_to_publish_s": round(now - row["latest_acquired"], 1),
+                }
+                transport_refresh["latencies"].append(latency)
+                patch["fires_seen"] = seen
+                patch["transport_latency"] = latency
+
+            state.update(patch)
+            transport_refresh["patches"] += 1
+
+
+def window_gate_stats():
+    """Window updates offered vs windows evaluated by the Observer."""
+    return window_gate.snapshot()
+
+
+def transport_refresh_stats():
+    """
+    Patch counts and latency percentiles (seconds): "acquired" from the
+    satellite acquisition to publish, "ingest" from the fires reaching
+    the detection store to publish.
+    """
+    stats = {"patches": transport_refresh["patches"], "rescored": transport_refresh["rescored"]}
+    for name in ("acquired", "ingest"):
+        lat = sorted(l[f"{name}_to_publish_s"] for l in transport_refresh["latencies"])
+        pick = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] if lat else None
+        stats[name] = {"p50_s": pick(0.5), "p95_s": pick(0.95), "max_s": lat[-1] if lat else None}
+    return stats
+
+
+pw.io.python.write(enriched_windows, Observer())
+pw.io.python.write(transport, TransportObserver())
 
 
 def _run():
     pw.run(monitoring_level=pw.MonitoringLevel.NONE)
 
-threading.Thread(target=_run, daemon=True).start()
\ No newline at end of file
+threading.Thread(target=_run, daemon=True).start()
+
+# replay feeds firms_cache from the log instead
+if not REPLAY_DIR:
+    start_firms_poller()
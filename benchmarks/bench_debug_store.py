@@ -0,0 +1,101 @@
+# bench_debug_store.py — per-station debug telemetry: dicts vs slotted store
+# Memory and update cost at 10k stations, old dict-per-station layout
+# against ingestion.debug_store.StationDebugStore.
+#
+#   python -m benchmarks.bench_debug_store [stations]
+
+import sys
+import time
+import tracemalloc
+
+from ingestion.debug_store import DEBUG_DEFAULTS, StationDebugStore
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+ROUNDS = 5
+
+OBSERVER_FIELDS = (
+    "raw_pm25", "raw_pm10", "raw_no2", "raw_so2", "raw_o3", "raw_co",
+    "dominant_pollutant", "pollutants_available", "wind_speed", "wind_direction",
+    "waqi_aqi", "waqi_timestamp", "station_name_api", "stale_seconds", "status",
+)
+
+
+def _ok_fields(i):
+    return dict(
+        DEBUG_DEFAULTS,
+        waqi_aqi=100 + i % 400, waqi_timestamp="2024-10-27 14:00:00",
+        waqi_timestamp_iso="2024-10-27T14:00:00+05:30",
+        station_name_api=f"Station {i}", feed_id=f"@{i}",
+        raw_pm25=80.0, raw_pm10=120.0, pollutants_available=2,
+        dominant_pollutant="pm10", wind_speed=2.5, wind_direction=270.0,
+        api_time="14:05:00", stale_seconds=300.0,
+    )
+
+
+def _err_fields():
+    return dict(DEBUG_DEFAULTS, status="error", error="HTTP 503", api_time="14:05:00")
+
+
+def bench_dicts(payloads):
+    store = {}
+    t0 = time.perf_counter()
+    for _ in range(ROUNDS):
+        for key, fields in payloads:
+            store[key] = dict(fields)            # fetch_aqi: fresh dict
+        for key, _ in payloads:
+            store[key] = _err_fields()           # _set_error: rebuilt dict
+    update = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for key, _ in payloads:
+        d = store.get(key, {})
+        {f: d.get(f) for f in OBSERVER_FIELDS}
+    read = time.perf_counter() - t0
+    return store, update, read
+
+
+def bench_store(payloads):
+    store = StationDebugStore()
+    t0 = time.perf_counter()
+    for _ in range(ROUNDS):
+        for key, fields in payloads:
+            store.record(key).reset(**fields)
+        for key, _ in payloads:
+            store.set_error(key, "HTTP 503", api_time="14:05:00")
+    update = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for key, _ in payloads:
+        d = store.get(key, {})
+        {f: d.get(f) for f in OBSERVER_FIELDS}
+    read = time.perf_counter() - t0
+    return store, update, read
+
+
+def _measure(fn, payloads):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store, update, read = fn(payloads)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # timings without tracemalloc overhead
+    _, update, read = fn(payloads)
+    return after - before, update, read, store
+
+
+def main():
+    payloads = [(f"Station {i} — @{i}", _ok_fields(i)) for i in range(N)]
+    updates = 2 * ROUNDS * N
+    print(f"{N} stations, {updates} updates")
+    print(f"{'layout':<14}{'memory':>12}{'per update':>14}{'observer read':>16}")
+    for name, fn in (("dict/station", bench_dicts), ("slotted store", bench_store)):
+        mem, update, read, _ = _measure(fn, payloads)
+        print(
+            f"{name:<14}{mem / 1e6:>10.2f}MB"
+            f"{update / updates * 1e6:>12.2f}us"
+            f"{read * 1e3:>14.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# bench_enrichment.py — per-window enrichment: Observer callback vs dataflow UDFs
+# Drives the same sliding-window reduce and transport join app.py runs
+# with synthetic readings (one commit per 30 s poll tick, all stations)
+# through app.py's WindowGate, and reports window updates/sec into the
+# sink and closed windows/sec out of it. The two ENRICH_MODEs:
+# "observer" enriches each released window with WindowAssessor;
+# "dataflow" runs window_history, assess_windows and enrich_windows on
+# every update and the sink only copies the row out. RAG, the LLM call
+# and hysteresis are left out of both. Set PATHWAY_THREADS to spread the
+# dataflow stages over several workers.
+#
+#   python -m benchmarks.bench_enrichment [stations] [ticks] [observer|dataflow|both]
+
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pathway as pw
+
+from config import WINDOW_DURATION_MINUTES, WINDOW_HOP_MINUTES, AQI_POLL_INTERVAL
+from streaming.fire_transport import with_transport
+from streaming.risk_engine import assess_windows, enrich_windows, WindowAssessor
+from streaming.state_machine import window_history
+from streaming.window_gate import WindowGate
+
+STATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+TICKS = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+MODE = sys.argv[3] if len(sys.argv) > 3 else "both"
+
+
+class AQISchema(pw.Schema):  # as in app.py
+    timestamp: pw.DateTimeUtc
+    event_time: pw.DateTimeUtc
+    aqi: int
+    city: str
+    wind_speed: float | None = pw.column_definition(default_value=None)
+    wind_direction: float | None = pw.column_definition(default_value=None)
+    wind_source: str = pw.column_definition(default_value="none")
+    pollutants: int = pw.column_definition(default_value=0)
+
+
+class TransportSchema(pw.Schema):  # transport_table's output columns
+    city: str
+    wind_speed: float | None
+    wind_direction: float | None
+    wind_source: str
+    fire_count: int
+    high_conf_fires: int
+    last_seen: float | None
+    transport_score: int
+    aligned_fires: int
+    transport_label: str
+
+
+class _Readings(pw.io.python.ConnectorSubject):
+    """Random-walk AQI for every station, one commit per poll tick."""
+
+    def run(self):
+        rng = np.random.default_rng(0)
+        aqi = rng.integers(50, 400, STATIONS)
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for tick in range(TICKS):
+            ts = start + timedelta(seconds=AQI_POLL_INTERVAL * tick)
+            aqi = np.clip(aqi + rng.integers(-25, 30, STATIONS), 0, 500)
+            for i, a in enumerate(aqi.tolist()):
+                self.next(
+                    timestamp=ts, event_time=ts, aqi=a, city=f"S{i}",
+                    wind_speed=3.0, wind_direction=90.0, wind_source="station", pollutants=2,
+                )
+            self.commit()
+
+
+def _windows(table):
+    return table.windowby(
+        pw.this.timestamp,
+        window=pw.temporal.sliding(
+            duration=pw.Duration(minutes=WINDOW_DURATION_MINUTES),
+            hop=pw.Duration(minutes=WINDOW_HOP_MINUTES),
+        ),
+        instance=pw.this.city,
+    ).reduce(
+        timestamp=pw.reducers.max(pw.this.timestamp),
+        event_time=pw.reducers.max(pw.this.event_time),
+        city=pw.reducers.any(pw.this.city),
+        aqi=pw.reducers.max(pw.this.aqi),
+        pollutants=pw.reducers.max(pw.this.pollutants),
+        window_end=pw.this._pw_window_end,
+    )
+
+
+def _transport():
+    rows = [
+        (f"S{i}", 3.0, 90.0, "station", 4, 1, None, 60 if i % 3 else 0, 2, "moderate")
+        for i in range(STATIONS)
+    ]
+    return pw.debug.table_from_rows(TransportSchema, rows)
+
+
+class _GatedSink(pw.io.python.ConnectorObserver):
+    """app.py's Observer minus hysteresis, RAG / LLM and publishing: gate, then evaluate."""
+
+    def __init__(self, assessor=None):
+        self.gate = WindowGate()
+        self.assessor = assessor
+        self.windows = 0
+        self.state = {}
+
+    def on_change(self, key, row, time, is_addition):
+        self.gate.offer(row, is_addition)
+
+    def on_time_end(self, time):
+        for row in self.gate.release():
+            self._evaluate(row)
+
+    def on_end(self):
+        for row in self.gate.release(flush=True):
+            self._evaluate(row)
+
+    def _evaluate(self, row):
+        if self.assessor is not None:
+            row = {**row, **self.assessor.assess(row, row["aqi"])}
+        self.state[row["city"]] = {
+            **row,
+            "forecast": row["forecast"].value,
+            "vulnerable_risk": row["vulnerable_risk"].value,
+        }
+        self.windows += 1
+
+
+def run(mode):
+    windowed = _windows(pw.io.python.read(_Readings(), schema=AQISchema))
+    if mode == "observer":
+        sink, table = _GatedSink(WindowAssessor()), with_transport(windowed, _transport())
+    else:
+        sink, table = _GatedSink(), enrich_windows(with_transport(assess_windows(window_history(windowed)), _transport()))
+    pw.io.python.write(table, sink)
+    t0 = time.perf_counter()
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+    elapsed = time.perf_counter() - t0
+    threads = os.environ.get("PATHWAY_THREADS", "1")
+    updates = sink.gate.stats["updates"]
+    print(f"{mode:<10}{threads:>8}{updates:>10}{sink.windows:>10}{elapsed:>9.2f}s"
+          f"{updates / elapsed:>12,.0f}{sink.windows / elapsed:>12,.0f}")
+
+
+def main():
+    if MODE != "both":
+        run(MODE)
+        return
+    print(f"{STATIONS} stations x {TICKS} ticks ({STATIONS * TICKS:,} readings)")
+    print(f"{'path':<10}{'threads':>8}{'updates':>10}{'windows':>10}{'wall':>10}{'updates/s':>12}{'windows/s':>12}")
+    sys.stdout.flush()
+    # one pw.run per process: each path gets a fresh interpreter
+    for mode in ("observer", "dataflow"):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_enrichment", str(STATIONS), str(TICKS), mode],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# bench_fire_storage.py — FIRMS fires: list of dicts vs FIRE_DTYPE arrays
+# Memory held per station and the cost of handing fires to a reader,
+# for a burning-season sized bbox (default 5000 detections).
+#
+#   python -m benchmarks.bench_fire_storage [fires]
+
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from ingestion.detection_store import FIRE_DTYPE, fire_dicts, readonly
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+READS = 1_000
+
+
+def _make_structured(rng):
+    fires = np.zeros(N, dtype=FIRE_DTYPE)
+    fires["lat"] = rng.uniform(28, 31, N)
+    fires["lon"] = rng.uniform(74, 78, N)
+    fires["frp"] = rng.uniform(0.5, 40, N)
+    fires["acquired"] = 1_730_016_000 + rng.integers(0, 86_400, N)
+    fires["confidence"] = rng.integers(1, 3, N)
+    return fires
+
+
+def _held(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def main():
+    structured = _make_structured(np.random.default_rng(0))
+    as_dicts = fire_dicts(structured)
+
+    dicts, dict_bytes = _held(lambda: [dict(f) for f in as_dicts])
+    arr, arr_bytes = _held(lambda: structured.copy())
+
+    # reader hand-off: the old path copied the list for latest_state / UI
+    t0 = time.perf_counter()
+    for _ in range(READS):
+        list(dicts)
+    dict_read = (time.perf_counter() - t0) / READS
+
+    t0 = time.perf_counter()
+    for _ in range(READS):
+        readonly(arr)
+    arr_read = (time.perf_counter() - t0) / READS
+
+    print(f"{N} fires")
+    print(f"{'layout':<18}{'held':>12}{'per fire':>12}{'reader hand-off':>18}")
+    print(f"{'list of dicts':<18}{dict_bytes / 1e6:>10.2f}MB{dict_bytes / N:>10.0f} B{dict_read * 1e6:>15.1f}us")
+    print(f"{'FIRE_DTYPE array':<18}{arr_bytes / 1e6:>10.2f}MB{arr_bytes / N:>10.0f} B{arr_read * 1e6:>15.1f}us")
+    print(f"memory ratio {dict_bytes / arr_bytes:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
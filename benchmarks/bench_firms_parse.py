@@ -0,0 +1,139 @@
+# bench_firms_parse.py — whole-body vs streaming FIRMS CSV parsing
+# "before" reads the body into one string (as response.text did) and
+# runs csv.reader over it; "streaming" feeds the file to FirmsCsvParser
+# in CHUNK_BYTES chunks, as iter_content() does. Also compares the
+# fire-count path (text.split vs count_csv_rows). Peak memory is traced
+# in a separate run from the timings.
+#
+#   python -m benchmarks.bench_firms_parse [recorded.csv | rows]
+
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from config import FIRMS_CONFIDENCE_FILTER
+from ingestion.detection_store import CONFIDENCE_CODES, FIRE_DTYPE
+from ingestion.firms_csv import CHUNK_BYTES, count_csv_rows, parse_firms_chunks
+
+HEADER = ("latitude,longitude,bright_ti4,scan,track,acq_date,acq_time,satellite,"
+          "instrument,confidence,version,bright_ti5,frp,daynight")
+
+
+def whole_body_parse(text):
+    """parse_firms_csv as it was: csv.reader over the full text, tuples, then one array."""
+    rows = csv.reader(io.StringIO(text))
+    header = next(rows, None)
+    col = {name: i for i, name in enumerate(header)}
+    i_lat, i_lon, i_conf, i_frp = col["latitude"], col["longitude"], col["confidence"], col["frp"]
+    i_date, i_time = col["acq_date"], col["acq_time"]
+    days, fires = {}, []
+    for row in rows:
+        if len(row) < len(header):
+            continue
+        conf = row[i_conf].strip().lower()
+        if conf not in FIRMS_CONFIDENCE_FILTER:
+            continue
+        try:
+            day = days.get(row[i_date])
+            if day is None:
+                day = days[row[i_date]] = int(datetime.strptime(row[i_date], "%Y-%m-%d")
+                                              .replace(tzinfo=timezone.utc).timestamp())
+            hhmm = int(row[i_time] or 0)
+            fires.append((float(row[i_lat]), float(row[i_lon]), float(row[i_frp] or 0),
+                          day + (hhmm // 100) * 3600 + (hhmm % 100) * 60,
+                          CONFIDENCE_CODES.get(conf, 0)))
+        except ValueError:
+            continue
+    return np.array(fires, dtype=FIRE_DTYPE)
+
+
+def synthesize(path, n):
+    rng = random.Random(0)
+    with open(path, "w") as f:
+        f.write(HEADER + "\n")
+        for _ in range(n):
+            f.write(
+                f"{rng.uniform(8, 35):.5f},{rng.uniform(68, 97):.5f},{rng.uniform(300, 367):.2f},"
+                f"0.39,0.36,2024-11-0{rng.randint(1, 2)},{rng.randint(0, 23):02d}{rng.randint(0, 59):02d},"
+                f"N,VIIRS,{rng.choice(['nominal', 'nominal', 'low', 'high'])},2.0NRT,"
+                f"{rng.uniform(270, 300):.2f},{rng.uniform(0.5, 40):.2f},{rng.choice('DN')}\n"
+            )
+
+
+def _chunks(path):
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_BYTES):
+            yield chunk
+
+
+def _before(path):
+    with open(path, encoding="utf-8") as f:
+        return whole_body_parse(f.read())
+
+
+def _streaming(path):
+    return parse_firms_chunks(_chunks(path))[0]
+
+
+def _count_before(path):
+    with open(path, encoding="utf-8") as f:
+        return max(len(f.read().strip().split("\n")) - 1, 0)
+
+
+def _count_streaming(path):
+    return count_csv_rows(_chunks(path))
+
+
+def _measure(fn, path):
+    t0 = time.perf_counter()
+    out = fn(path)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def main():
+    arg = sys.argv[1] if len(sys.argv) > 1 else "300000"
+    tmp = None
+    if os.path.exists(arg):
+        path = arg
+    else:
+        tmp = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+        path = tmp.name
+        synthesize(path, int(arg))
+    try:
+        size = os.path.getsize(path)
+        print(f"{path}: {size / 1e6:.1f} MB")
+        print(f"{'path':<22}{'time':>10}{'peak mem':>12}{'result':>12}")
+        results = {}
+        for name, fn in [
+            ("parse whole body", _before), ("parse streaming", _streaming),
+            ("count whole body", _count_before), ("count streaming", _count_streaming),
+        ]:
+            out, elapsed, peak = _measure(fn, path)
+            results[name] = out
+            shown = len(out) if isinstance(out, np.ndarray) else out
+            print(f"{name:<22}{elapsed:>9.2f}s{peak / 1e6:>10.1f}MB{shown:>12,}")
+
+        a, b = results["parse whole body"], results["parse streaming"]
+        same = len(a) == len(b) and all((a[f] == b[f]).all() for f in FIRE_DTYPE.names)
+        print(f"identical fires: {same}, counts equal: "
+              f"{results['count whole body'] == results['count streaming']}")
+    finally:
+        if tmp is not None:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
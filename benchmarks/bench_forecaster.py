@@ -0,0 +1,84 @@
+# bench_forecaster.py — per-window forecast: np.polyfit vs running sums
+# Every station gets one new window AQI per tick (random walk) and a
+# forecast over its last FORECAST_HISTORY_WINDOWS windows:
+#   polyfit      deque of dicts + compute_short_term_forecast (the old path)
+#   history      forecast_history(tuple), as the _assess_window UDF calls it
+#   incremental  one SlidingForecast per station, push() + forecast()
+# Reports µs per window forecast and how often the dicts differ from
+# polyfit's (only where polyfit's rounding error crosses an exact
+# integer / threshold boundary).
+#
+#   python -m benchmarks.bench_forecaster [stations] [ticks]
+
+import random
+import sys
+import time
+from collections import deque
+
+from config import FORECAST_HISTORY_WINDOWS
+from streaming.forecaster import SlidingForecast, forecast_history
+from streaming.risk_engine import compute_short_term_forecast
+
+STATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+TICKS = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+
+def readings():
+    """ticks x stations AQIs, generated up front so no path pays for the RNG."""
+    rng = random.Random(0)
+    aqi = [rng.randint(50, 400) for _ in range(STATIONS)]
+    out = []
+    for _ in range(TICKS):
+        aqi = [max(0, min(500, a + rng.randint(-25, 30))) for a in aqi]
+        out.append(aqi)
+    return out
+
+
+def run_polyfit(ticks):
+    hist = [deque(maxlen=FORECAST_HISTORY_WINDOWS) for _ in range(STATIONS)]
+    results = []
+    for tick in ticks:
+        for h, a in zip(hist, tick):
+            h.append({"aqi": a})
+            results.append(compute_short_term_forecast(h))
+    return results
+
+
+def run_history(ticks):
+    hist = [() for _ in range(STATIONS)]
+    results = []
+    for tick in ticks:
+        for i, a in enumerate(tick):
+            h = hist[i] = (hist[i] + (a,))[-FORECAST_HISTORY_WINDOWS:]
+            results.append(forecast_history(h))
+    return results
+
+
+def run_incremental(ticks):
+    state = [SlidingForecast() for _ in range(STATIONS)]
+    results = []
+    for tick in ticks:
+        for f, a in zip(state, tick):
+            f.push(a)
+            results.append(f.forecast())
+    return results
+
+
+def main():
+    ticks = readings()
+    n = STATIONS * TICKS
+    print(f"{STATIONS} stations x {TICKS} ticks ({n:,} window forecasts, depth {FORECAST_HISTORY_WINDOWS})")
+    print(f"{'path':<13}{'wall':>9}{'us/window':>11}{'speedup':>9}{'differ':>9}")
+    base = reference = None
+    for name, fn in [("polyfit", run_polyfit), ("history", run_history), ("incremental", run_incremental)]:
+        t0 = time.perf_counter()
+        results = fn(ticks)
+        elapsed = time.perf_counter() - t0
+        if reference is None:
+            base, reference = elapsed, results
+        differ = sum(a != b for a, b in zip(reference, results))
+        print(f"{name:<13}{elapsed:>8.2f}s{elapsed / n * 1e6:>11.2f}{base / elapsed:>8.1f}x{differ / n:>9.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# bench_micro_push.py — push ingest throughput into the windowed stage
+# Starts the micro-node push endpoint in front of the same sliding-window
+# reduce app.py runs, drives it with a local load generator (N client
+# threads POSTing binary frames or JSON lines) and reports readings/sec
+# that reached `windowed`, plus 503 backpressure responses.
+#
+#   python -m benchmarks.bench_micro_push [seconds] [clients] [batch] [frame|ndjson]
+
+import http.client
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+import pathway as pw
+
+from config import (
+    WINDOW_DURATION_MINUTES, WINDOW_HOP_MINUTES, MICRO_PUSH_BACKLOG,
+)
+from ingestion.micro_nodes import PushIngest, encode_frame, run_push, serve_push
+
+SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+CLIENTS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+BATCH = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+FORMAT = sys.argv[4] if len(sys.argv) > 4 else "frame"
+NODES = 10_000
+
+
+class AQISchema(pw.Schema):  # as in app.py
+    timestamp: pw.DateTimeUtc
+    event_time: pw.DateTimeUtc
+    aqi: int
+    city: str
+    wind_speed: float | None = pw.column_definition(default_value=None)
+    wind_direction: float | None = pw.column_definition(default_value=None)
+    wind_source: str = pw.column_definition(default_value="none")
+    pollutants: int = pw.column_definition(default_value=0)
+
+
+class _Subject(pw.io.python.ConnectorSubject):
+    def __init__(self, ingest, stop):
+        super().__init__()
+        self.ingest = ingest
+        self.stop = stop
+
+    def run(self):
+        run_push(self.ingest, lambda record: self.next(**record), self.commit, stop=self.stop)
+
+
+def _body(rng):
+    ids = rng.integers(0, NODES, BATCH)
+    aqi = rng.integers(20, 480, BATCH)
+    ts = np.full(BATCH, time.time())
+    if FORMAT == "frame":
+        return encode_frame(ids, ts, aqi, pm25=aqi * 0.6), "application/octet-stream"
+    lines = (
+        json.dumps({"id": int(i), "ts": float(t), "aqi": int(a)})
+        for i, t, a in zip(ids, ts, aqi)
+    )
+    return "\n".join(lines).encode("utf-8"), "application/x-ndjson"
+
+
+def _client(port, client, deadline, out):
+    rng = np.random.default_rng(client)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    sent = throttled = 0
+    while time.monotonic() < deadline:
+        body, ctype = _body(rng)
+        conn.request("POST", "/ingest", body, {"Content-Type": ctype})
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status == 503:
+            throttled += 1
+            time.sleep(float(resp.getheader("Retry-After", "1")) / 10)
+        else:
+            sent += BATCH
+    conn.close()
+    out[client] = (sent, throttled)
+
+
+def main():
+    ingest = PushIngest()
+    stop = threading.Event()
+    server = serve_push(ingest, "127.0.0.1", 0)
+    port = server.server_address[1]
+
+    table = pw.io.python.read(_Subject(ingest, stop), schema=AQISchema, max_backlog_size=MICRO_PUSH_BACKLOG)
+    windowed = table.windowby(
+        pw.this.timestamp,
+        window=pw.temporal.sliding(
+            duration=pw.Duration(minutes=WINDOW_DURATION_MINUTES),
+            hop=pw.Duration(minutes=WINDOW_HOP_MINUTES),
+        ),
+        instance=pw.this.city,
+    ).reduce(
+        timestamp=pw.reducers.max(pw.this.timestamp),
+        city=pw.reducers.any(pw.this.city),
+        aqi=pw.reducers.max(pw.this.aqi),
+    )
+
+    counts = {"rows": 0, "windows": 0, "last": None}
+    clock = time.monotonic  # subscribe passes `time=` to callbacks
+
+    def _row(key, row, time, is_addition):
+        if is_addition:
+            counts["rows"] += 1
+            counts["last"] = clock()
+
+    def _window(key, row, time, is_addition):
+        if is_addition:
+            counts["windows"] += 1
+
+    pw.io.subscribe(table, on_change=_row)
+    pw.io.subscribe(windowed, on_change=_window)
+
+    results = {}
+
+    def _load():
+        time.sleep(1.0)  # let the engine start
+        deadline = time.monotonic() + SECONDS
+        threads = [
+            threading.Thread(target=_client, args=(port, c, deadline, results))
+            for c in range(CLIENTS)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stop.set()
+
+    loader = threading.Thread(target=_load)
+    loader.start()
+    started = time.monotonic() + 1.0
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+    loader.join()
+    server.shutdown()
+
+    sent = sum(s for s, _ in results.values())
+    throttled = sum(t for _, t in results.values())
+    elapsed = (counts["last"] or time.monotonic()) - started
+    st = ingest.snapshot()
+    print(f"{CLIENTS} clients x {BATCH}-reading {FORMAT} POSTs for {SECONDS:.0f}s, {NODES} nodes")
+    print(f"accepted          {st['accepted']:>10}  ({sent} acknowledged to clients)")
+    print(f"503 backpressure  {throttled:>10}")
+    print(f"into windowed     {counts['rows']:>10}  {counts['rows'] / elapsed:,.0f} readings/s")
+    print(f"window updates    {counts['windows']:>10}")
+    print(f"micro-batches     {st['batches']:>10}  avg {st['handed'] / max(st['batches'], 1):.0f} readings")
+
+
+if __name__ == "__main__":
+    main()
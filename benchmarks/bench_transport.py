@@ -0,0 +1,217 @@
+# bench_transport.py — per-pair scalar vs per-station NumPy transport scoring
+# dense:  every station holds all FIRES detections (stations × fires pairs)
+# sparse: the FIRES detections are split across the stations (~10 each),
+#         the usual shape after region assignment
+# Scoring: the scalar loop (one compute_wind_alignment per pair, as the
+# dataflow used to) is timed on a sample of stations and extrapolated;
+# station_transport runs over all of them. Dataflow: transport_table
+# against the per-pair join it replaced, over DF_STATIONS × DF_FIRES
+# pairs and DF_ROUNDS wind changes per station (each re-aligns every
+# fire of the station); input time is reported apart, since it is
+# common to both. The scoring part also times a memoized repeat (same
+# fires and winds). Both parts check for identical results.
+#
+#   python -m benchmarks.bench_transport [stations] [fires] [scalar_sample] [df_stations] [df_fires] [df_rounds]
+
+import sys
+import time
+
+import numpy as np
+import pathway as pw
+
+from ingestion.detection_store import CONFIDENCE_CODES
+from streaming import fire_transport as ft
+
+STATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+FIRES = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+SAMPLE = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+DF_STATIONS = int(sys.argv[4]) if len(sys.argv) > 4 else 100
+DF_FIRES = int(sys.argv[5]) if len(sys.argv) > 5 else 1_000
+DF_ROUNDS = int(sys.argv[6]) if len(sys.argv) > 6 else 5
+
+
+def scalar_transport(fire_lat, fire_lon, station_lat, station_lon, wind_dir, wind_speed):
+    """Per-pair scoring as the dataflow did it: one _alignment_units per fire."""
+    units = [
+        ft._alignment_units(lat, lon, station_lat, station_lon, wind_dir)
+        for lat, lon in zip(fire_lat, fire_lon)
+    ]
+    aligned = sum(1 for u in units if u > 0)
+    return ft.transport_result(len(units), aligned, sum(units) / ft._UNITS, wind_speed)
+
+
+def _stations(fire_sets, seed=1):
+    rng = np.random.default_rng(seed)
+    return [
+        # whole degrees and 0.1 m/s, as WAQI / the wind grid report them
+        (tuple(lat for lat, _ in fires), tuple(lon for _, lon in fires),
+         rng.uniform(20, 32), rng.uniform(70, 90),
+         float(rng.integers(0, 360)), round(float(rng.uniform(2, 12)), 1))
+        for fires in fire_sets
+    ]
+
+
+def run_scoring(name, fire_sets):
+    stations = _stations(fire_sets)
+    sample = stations[:SAMPLE] if name == "dense" else stations
+
+    t0 = time.perf_counter()
+    reference = [scalar_transport(*s) for s in sample]
+    scalar = (time.perf_counter() - t0) / len(sample) * len(stations)
+
+    t0 = time.perf_counter()
+    batched = [ft.station_transport(*s) for s in stations]
+    vectorized = time.perf_counter() - t0
+
+    # memoized: first pass fills the cache, the repeat (same fires and winds) hits it
+    versions = [sum(ft.fire_fingerprint(a, b, 0) for a, b in zip(s[0], s[1])) for s in stations]
+    ft.clear_transport_cache()
+    filled = [ft.station_transport(*s, fire_set=f) for s, f in zip(stations, versions)]
+    before = ft.transport_cache_stats()
+    t0 = time.perf_counter()
+    memo = [ft.station_transport(*s, fire_set=f) for s, f in zip(stations, versions)]
+    memoized = time.perf_counter() - t0
+    after = ft.transport_cache_stats()
+
+    mismatches = sum(r != b for r, b in zip(reference, batched))
+    mismatches += sum(b != f or b != m for b, f, m in zip(batched, filled, memo))
+    pairs = sum(len(f) for f in fire_sets)
+    print(f"{name}: {len(stations)} stations, {pairs:,} station-fire pairs")
+    print(f"  scalar per pair    {scalar:>8.3f}s" + (f"  (extrapolated from {len(sample)} stations)" if len(sample) < len(stations) else ""))
+    print(f"  numpy per station  {vectorized:>8.3f}s  {scalar / vectorized:>6.1f}x")
+    print(f"  memoized repeat    {memoized:>8.3f}s  {scalar / memoized:>6.1f}x"
+          f"  ({after['hits'] - before['hits']} hits, {after['misses'] - before['misses']} misses)")
+    print(f"  result mismatches  {mismatches:>8}")
+
+
+def per_pair_transport_table(pairs, winds):
+    """transport_table as it was: every pair joined to its wind and aligned by a scalar UDF."""
+    aligned = pairs.join(winds, pw.left.station == pw.right.city).select(
+        station=pw.left.station,
+        acquired=pw.left.acquired,
+        seen=pw.left.seen,
+        high=pw.if_else(pw.left.confidence == CONFIDENCE_CODES["high"], 1, 0),
+        alignment=pw.apply_with_type(
+            ft._alignment_units, int,
+            pw.left.fire_lat, pw.left.fire_lon,
+            pw.left.station_lat, pw.left.station_lon, pw.right.wind_direction,
+        ),
+    )
+    per_station = aligned.groupby(pw.this.station).reduce(
+        pw.this.station,
+        fire_count=pw.reducers.count(),
+        high_conf_fires=pw.reducers.sum(pw.this.high),
+        aligned=pw.reducers.sum(pw.if_else(pw.this.alignment > 0, 1, 0)),
+        total=pw.reducers.sum(pw.this.alignment),
+        latest_acquired=pw.reducers.max(pw.this.acquired),
+        last_seen=pw.reducers.max(pw.this.seen),
+    )
+    return winds.join_left(per_station, pw.left.city == pw.right.station).select(
+        pw.left.city,
+        pw.left.wind_speed,
+        pw.left.wind_direction,
+        pw.left.wind_source,
+        fire_count=pw.coalesce(pw.right.fire_count, 0),
+        high_conf_fires=pw.coalesce(pw.right.high_conf_fires, 0),
+        latest_acquired=pw.right.latest_acquired,
+        last_seen=pw.right.last_seen,
+        result=pw.apply_with_type(
+            lambda n, a, t, v: ft.transport_result(n, a, t / ft._UNITS, v), tuple[int, int, str],
+            pw.coalesce(pw.right.fire_count, 0), pw.coalesce(pw.right.aligned, 0),
+            pw.coalesce(pw.right.total, 0), pw.left.wind_speed,
+        ),
+    )
+
+
+class PairSchema(pw.Schema):
+    station: str
+    station_lat: float
+    station_lon: float
+    fire_lat: float
+    fire_lon: float
+    confidence: int
+    acquired: int
+    seen: float
+    fingerprint: int
+
+
+class WindSchema(pw.Schema):
+    city: str = pw.column_definition(primary_key=True)
+    wind_speed: float
+    wind_direction: float
+    wind_source: str
+
+
+def _timed(build, runs=3):
+    """Best wall time of `runs` full runs of the graph, and its final {city: result}."""
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        _, columns = pw.debug.table_to_dicts(build())
+        best = min(best, time.perf_counter() - t0)
+    return best, dict(zip(columns["city"].values(), columns["result"].values()))
+
+
+def run_dataflow():
+    """Fires loaded once, then DF_ROUNDS wind changes per station, as AQI readings bring them."""
+    rng = np.random.default_rng(2)
+    stations = _stations([
+        list(zip(rng.uniform(20, 32, DF_FIRES).tolist(), rng.uniform(70, 90, DF_FIRES).tolist()))
+        for _ in range(DF_STATIONS)
+    ])
+    pair_rows = [
+        (f"Station {i}", slat, slon, lat, lon, CONFIDENCE_CODES["high"], 1_730_016_000, 0.0,
+         ft.fire_fingerprint(lat, lon, 1_730_016_000), 0, 1)
+        for i, (lats, lons, slat, slon, _, _) in enumerate(stations) for lat, lon in zip(lats, lons)
+    ]
+    wind_rows = []
+    for i, (*_, wd, speed) in enumerate(stations):
+        previous = None
+        for r in range(DF_ROUNDS):
+            row = (f"Station {i}", speed, float((wd + 7 * r) % 360), "waqi")
+            if previous:
+                wind_rows.append(previous + (2 * r + 2, -1))
+            wind_rows.append(row + (2 * r + 2, 1))
+            previous = row
+
+    def tables():
+        return (pw.debug.table_from_rows(PairSchema, pair_rows, is_stream=True),
+                pw.debug.table_from_rows(WindSchema, wind_rows, is_stream=True))
+
+    def loaded():
+        pairs, winds = tables()
+        return winds.join_left(
+            pairs.groupby(pw.this.station).reduce(pw.this.station), pw.left.city == pw.right.station,
+        ).select(pw.left.city, result=pw.left.wind_direction)
+
+    def batched():
+        return ft.transport_table(*tables()).select(
+            pw.this.city,
+            result=pw.make_tuple(pw.this.transport_score, pw.this.aligned_fires, pw.this.transport_label),
+        )
+
+    loading, _ = _timed(loaded)
+    per_pair, reference = _timed(lambda: per_pair_transport_table(*tables()))
+    ft.clear_transport_cache()  # the rounds are distinct winds: time the scoring, not the memo
+    station, results = _timed(batched)
+    mismatches = sum(tuple(results[c]) != tuple(reference[c]) for c in reference)
+    # reading the input streams costs the same in both; compare what comes after
+    print(f"dataflow: {DF_STATIONS} stations, {len(pair_rows):,} station-fire pairs, "
+          f"{DF_ROUNDS} winds per station (best of 3)")
+    print(f"  input streams only {loading:>8.3f}s")
+    print(f"  per-pair UDF       {per_pair:>8.3f}s  (+{per_pair - loading:.3f}s)")
+    print(f"  per-station UDF    {station:>8.3f}s  (+{station - loading:.3f}s)"
+          f"  {(per_pair - loading) / max(station - loading, 1e-9):>6.1f}x")
+    print(f"  result mismatches  {mismatches:>8}")
+
+
+def main():
+    rng = np.random.default_rng(0)
+    fires = list(zip(rng.uniform(20, 32, FIRES).tolist(), rng.uniform(70, 90, FIRES).tolist()))
+    run_scoring("dense", [fires] * STATIONS)
+    run_scoring("sparse", [fires[i::STATIONS] for i in range(STATIONS)])
+    run_dataflow()
+
+
+if __name__ == "__main__":
+    main()
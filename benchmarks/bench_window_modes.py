@@ -0,0 +1,104 @@
+# bench_window_modes.py — windowed reduce under each WINDOW_EMIT_MODE
+# Drives app.py's sliding reduce with synthetic readings (one commit per
+# 30 s poll tick, all stations) through a WindowGate and reports the
+# window rows the reduce emits, the windows the gate hands on, wall time
+# and peak RSS. Each mode runs in its own interpreter so RSS is its own.
+#
+#   python -m benchmarks.bench_window_modes [stations] [ticks] [stream|preview|close|all]
+
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pathway as pw
+
+from config import WINDOW_DURATION_MINUTES, WINDOW_HOP_MINUTES, AQI_POLL_INTERVAL
+from streaming.window_gate import WindowGate, window_behavior
+
+STATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+TICKS = int(sys.argv[2]) if len(sys.argv) > 2 else 120
+MODE = sys.argv[3] if len(sys.argv) > 3 else "all"
+
+
+class AQISchema(pw.Schema):
+    timestamp: pw.DateTimeUtc
+    aqi: int
+    city: str
+
+
+class _Readings(pw.io.python.ConnectorSubject):
+    def run(self):
+        rng = np.random.default_rng(0)
+        aqi = rng.integers(50, 400, STATIONS)
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for tick in range(TICKS):
+            ts = start + timedelta(seconds=AQI_POLL_INTERVAL * tick)
+            aqi = np.clip(aqi + rng.integers(-25, 30, STATIONS), 0, 500)
+            for i, a in enumerate(aqi.tolist()):
+                self.next(timestamp=ts, aqi=a, city=f"S{i}")
+            self.commit()
+
+
+class _GateSink(pw.io.python.ConnectorObserver):
+    def __init__(self, gate):
+        self.gate = gate
+        self.rows = 0
+        self.windows = 0
+
+    def on_change(self, key, row, time, is_addition):
+        self.rows += is_addition
+        self.gate.offer(row, is_addition)
+
+    def on_time_end(self, time):
+        self.windows += len(self.gate.release())
+
+    def on_end(self):
+        self.windows += len(self.gate.release(flush=True))
+
+
+def run(mode):
+    readings = pw.io.python.read(_Readings(), schema=AQISchema)
+    windowed = readings.windowby(
+        pw.this.timestamp,
+        window=pw.temporal.sliding(
+            duration=pw.Duration(minutes=WINDOW_DURATION_MINUTES),
+            hop=pw.Duration(minutes=WINDOW_HOP_MINUTES),
+        ),
+        behavior=window_behavior(mode),
+        instance=pw.this.city,
+    ).reduce(
+        timestamp=pw.reducers.max(pw.this.timestamp),
+        city=pw.reducers.any(pw.this.city),
+        aqi=pw.reducers.max(pw.this.aqi),
+        window_start=pw.this._pw_window_start,
+        window_end=pw.this._pw_window_end,
+    )
+    sink = _GateSink(WindowGate(closed_upstream=mode == "close"))
+    pw.io.python.write(windowed, sink)
+    t0 = time.perf_counter()
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+    elapsed = time.perf_counter() - t0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    print(f"{mode:<9}{sink.rows:>12,}{sink.windows:>10,}{sink.rows / max(sink.windows, 1):>10.2f}"
+          f"{elapsed:>9.2f}s{rss:>10.0f}MB")
+
+
+def main():
+    if MODE != "all":
+        run(MODE)
+        return
+    print(f"{STATIONS} stations x {TICKS} ticks ({STATIONS * TICKS:,} readings)")
+    print(f"{'mode':<9}{'rows out':>12}{'windows':>10}{'rows/win':>10}{'wall':>10}{'peak RSS':>10}")
+    sys.stdout.flush()
+    for mode in ("stream", "preview", "close"):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_window_modes", str(STATIONS), str(TICKS), mode],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
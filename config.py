@@ -10,6 +10,9 @@ WAQI_TOKEN = os.getenv("WAQI_TOKEN", "")
 FIRMS_API_KEY = os.getenv("FIRMS_API_KEY", "")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 
+# WAQI endpoint root (override to point at a local stand-in server)
+WAQI_API_ROOT = os.getenv("WAQI_API_ROOT", "https://api.waqi.info").rstrip("/")
+
 # verified WAQI feed IDs
 STATIONS = {
     "SIDCO Kurichi (Coimbatore) — @11847": {
@@ -48,7 +51,29 @@ CITY_NAMES = list(STATIONS.keys())
 
 # polling intervals (seconds)
 AQI_POLL_INTERVAL = 30
-FIRE_POLL_INTERVAL = 60
+
+# concurrent WAQI fetches per poll cycle
+AQI_POLL_CONCURRENCY = 8
+
+# per-cycle deadline: stations that cannot answer inside it are marked
+# stale and retried next cycle instead of holding the cycle up
+AQI_CYCLE_BUDGET_SECONDS = 20
+AQI_FETCH_TIMEOUT = 25
+
+# ingestion mode: "feed" polls each station feed, "bounds" pulls every
+# station inside AQI_BULK_BOUNDS with one map-bounds query per box
+AQI_INGEST_MODE = os.getenv("AQI_INGEST_MODE", "feed")
+AQI_BULK_BOUNDS = [
+    # (lat1, lon1, lat2, lon2)
+    (6.5, 68.0, 35.5, 97.5),  # India
+]
+
+# adaptive poll scheduler (ingestion/poll_scheduler.py)
+AQI_POLL_GRACE_SECONDS = 60      # poll this long after the expected WAQI update
+AQI_POLL_MAX_INTERVAL = 900      # never wait longer than this between polls
+AQI_POLL_MAX_BACKOFF = 1800      # failing feeds back off up to this
+AQI_POLL_HOT_MARGIN = 50         # AQI >= HIGH_AQI_THRESHOLD - margin polls at AQI_POLL_INTERVAL
+AQI_SCHEDULER_TICK_SECONDS = 5
 
 # persistence / escalation
 PERSISTENCE_THRESHOLD = 3
@@ -56,6 +81,29 @@ HIGH_AQI_THRESHOLD = 300
 WINDOW_DURATION_MINUTES = 3
 WINDOW_HOP_MINUTES = 1
 HYSTERESIS_CONFIRMATIONS = 2
+FORECAST_HISTORY_WINDOWS = 10     # windows per station the forecast / persistence look back over
+
+# how `windowed` emits: "stream" re-emits an open window on every reading
+# (shown on the dashboard as an open-window preview) and keeps every
+# window's state; "preview" streams the same updates but drops a window's
+# state WINDOW_LATENESS_SECONDS after it ends; "close" emits each window
+# once, WINDOW_LATENESS_SECONDS after it ends. In the bounded modes,
+# readings later than that are dropped.
+WINDOW_EMIT_MODE = os.getenv("AREE_WINDOW_EMIT", "stream")
+WINDOW_LATENESS_SECONDS = 30
+
+# where band / stage / persistence / forecast / VPPE / confidence / ERI
+# are computed: "observer" once per released window in the sink, or
+# "dataflow" as UDF stages on every window update, spread over
+# PATHWAY_THREADS workers. On one worker the dataflow is ~2x slower
+# (python -m benchmarks.bench_enrichment).
+ENRICH_MODE = os.getenv("AREE_ENRICH", "observer")
+
+# WAQI feeds update ~hourly: an unchanged reading (same time.iso + AQI)
+# is re-stated once per (duration - hop) so every sliding window still
+# holds a row for the station despite poll jitter; repeats in between
+# are suppressed.
+AQI_RESTATE_SECONDS = (WINDOW_DURATION_MINUTES - WINDOW_HOP_MINUTES) * 60
 
 # CPCB bands
 CPCB_BANDS = [
@@ -79,13 +127,76 @@ GRAP_STAGES = [
 # NASA FIRMS
 FIRMS_DATASET = "VIIRS_SNPP_NRT"
 FIRMS_POLL_MINUTES = 5
+FIRMS_POLL_CONCURRENCY = 4        # region queries in flight; starts are spread over the poll interval
 FIRMS_BBOX_DELTA = 0.15
 FIRMS_LOOKBACK_DAYS = 1
 FIRMS_CONFIDENCE_FILTER = ["high", "nominal"]
+FIRMS_MERGE_MAX_WASTE = 1.25      # merge station bboxes while union area <= 1.25x their sum
+FIRMS_DETECTION_MAX_AGE_HOURS = 24 * FIRMS_LOOKBACK_DAYS  # detections older than this are evicted
 WIND_ALIGNMENT_THRESHOLD = 45
 WIND_SPEED_MIN = 2.0
 FIRE_TRANSPORT_THRESHOLD = 3
 
+# transport memo (streaming/fire_transport.py): results keyed on (site,
+# fire-set version, wind bucket). Steps match what WAQI and the micro-nodes
+# report; interpolated grid winds are scored at the nearest step
+TRANSPORT_CACHE_SIZE = 4096
+TRANSPORT_WIND_DIR_STEP = 1       # degrees
+TRANSPORT_WIND_SPEED_STEP = 0.1   # m/s
+
+# gridded wind field (ingestion/weather_stream.py): inverse-distance
+# weighted from every station that reports w / wd
+WIND_GRID_BOUNDS = (6.5, 68.0, 35.5, 97.5)  # (lat1, lon1, lat2, lon2)
+WIND_GRID_RESOLUTION = 0.25       # degrees per cell
+WIND_IDW_POWER = 2
+WIND_IDW_RADIUS_KM = 300          # stations further away do not contribute
+WIND_MAX_AGE_SECONDS = 3 * 3600   # older station reports drop out of the field
+
+# record / replay of raw upstream payloads (ingestion/replay.py)
+RECORD_DIR = os.getenv("AREE_RECORD_DIR", "")
+REPLAY_DIR = os.getenv("AREE_REPLAY_DIR", "")
+REPLAY_SPEED = float(os.getenv("AREE_REPLAY_SPEED", "1"))  # N× real time, 0 = flat out
+RECORD_SEGMENT_RECORDS = 5000
+
+# simulated micro-sensor fleet (ingestion/micro_nodes.py), off when 0
+MICRO_NODE_COUNT = int(os.getenv("AREE_MICRO_NODES", "0"))
+MICRO_NODE_SEED = int(os.getenv("AREE_MICRO_NODE_SEED", "7"))
+MICRO_NODE_INTERVAL = 60          # seconds between fleet readings
+MICRO_NODE_BOUNDS = (8.0, 70.0, 32.0, 92.0)  # (lat1, lon1, lat2, lon2)
+MICRO_NODE_DROPOUT_PROB = 0.002   # per node per reading: goes offline
+MICRO_NODE_RECOVER_PROB = 0.1     # per node per reading: comes back
+MICRO_NODE_SPIKE_PROB = 0.001     # per node per reading: local spike starts
+MICRO_NODE_SPIKE_HALFLIFE = 600   # seconds for a spike to decay by half
+
+# push ingest endpoint for field micro-nodes (POST /ingest), off when 0
+MICRO_PUSH_PORT = int(os.getenv("AREE_MICRO_PUSH_PORT", "0"))
+MICRO_PUSH_HOST = os.getenv("AREE_MICRO_PUSH_HOST", "127.0.0.1")
+MICRO_PUSH_MAX_BODY_BYTES = 4 * 1024 * 1024
+MICRO_PUSH_QUEUE_RECORDS = 50000  # accepted-not-yet-handed readings; full -> 503
+MICRO_PUSH_BATCH_RECORDS = 2000   # readings per Pathway micro-batch (commit)
+MICRO_PUSH_LINGER_MS = 50         # wait this long to fill a micro-batch
+MICRO_PUSH_BACKLOG = 20000        # Pathway max_backlog_size: engine lag blocks the drain
+MICRO_PUSH_MAX_SKEW_SECONDS = 300 # readings further in the future are rejected
+
+# shared HTTP transport (ingestion/transport.py), per upstream host
+HTTP_HOST_DEFAULTS = {
+    "rate": 5.0,              # token-bucket refill, requests/sec
+    "burst": 10,
+    "pool": 16,               # keep-alive connections kept per host
+    "retries": 0,
+    "backoff": 0.5,
+    "breaker_failures": 5,    # consecutive failures before the circuit opens
+    "breaker_reset": 60,      # seconds before a half-open probe
+}
+HTTP_HOSTS = {
+    "api.waqi.info": {"rate": 10.0, "burst": 20, "pool": AQI_POLL_CONCURRENCY},
+    "firms.modaps.eosdis.nasa.gov": {"rate": 1.0, "burst": 5, "pool": FIRMS_POLL_CONCURRENCY},
+}
+
+# background RAG / Gemini enrichment (rag/enrichment_queue.py): stations
+# enriched at once; each keeps only its newest pending job
+ENRICHMENT_CONCURRENCY = 2
+
 # stale data
 STALE_DATA_THRESHOLD_SECONDS = 1200  # 20 min
 
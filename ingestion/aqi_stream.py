@@ -2,13 +2,20 @@
 # Uses WAQI AQI directly for escalation. PM2.5 for transparency only.
 # Extracts WAQI timestamp, station name, all pollutants from payload.
 
-import requests
 import os
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from config import (
+    WAQI_API_ROOT, AQI_POLL_CONCURRENCY, AQI_RESTATE_SECONDS,
+    AQI_CYCLE_BUDGET_SECONDS, AQI_FETCH_TIMEOUT, STALE_DATA_THRESHOLD_SECONDS, STATIONS,
+)
+from ingestion import transport
+from ingestion.debug_store import StationDebugStore
+from ingestion.replay import record_payload
+from ingestion.weather_stream import locate_station, report_wind, wind_with_fallback
 
 load_dotenv()
 
@@ -16,136 +23,445 @@ WAQI_TOKEN = os.getenv("WAQI_TOKEN")
 if not WAQI_TOKEN:
     raise ValueError("WAQI_TOKEN not found in .env")
 
-BASE_URL = "https://api.waqi.info/feed/{feed_id}/?token={token}"
+BASE_URL = WAQI_API_ROOT + "/feed/{feed_id}/?token={token}"
+BOUNDS_URL = WAQI_API_ROOT + "/map/bounds/?latlng={bounds}&token={token}"
 
-session = requests.Session()
-retry_strategy = Retry(
-    total=5, backoff_factor=2,
-    status_forcelist=[429, 500, 502, 503, 504],
-    allowed_methods=["GET"],
-)
-adapter = HTTPAdapter(max_retries=retry_strategy)
-session.mount("https://", adapter)
-session.headers.update({"User-Agent": "UrbanLive-AI/2.1", "Accept": "application/json"})
+_JSON_HEADERS = {"Accept": "application/json"}
 
+# bounds rows for configured stations keep the keys the feed path uses
+_KNOWN_FEEDS = {info["feed_id"]: name for name, info in STATIONS.items()}
 
-# ── Debug data (side-channel for UI transparency) ──
-_debug_data = {}
 
+# ── Debug data (side-channel for UI transparency), one slotted record per station ──
+_debug_data = StationDebugStore()
 
-def fetch_aqi(station_key, feed_id):
+# ── Poll cycle telemetry (side-channel for UI / logs) ──
+_poll_stats = {
+    "cycle": 0,
+    "stations": 0,
+    "emitted": 0,
+    "suppressed": 0,
+    "failed": 0,
+    "wall_seconds": None,
+    "budget_seconds": AQI_CYCLE_BUDGET_SECONDS,
+    "budget_used": None,
+    "overran": [],
+    "last_cycle": None,
+}
+
+# ── Event-time dedup: last emitted (record, emitted_at) per station ──
+_last_emitted = {}
+_last_fetched = {}  # station -> when its last real (fetched) reading arrived, epoch seconds
+_dedup_stats = {"emitted": 0, "restated": 0, "suppressed": 0, "expired": 0}
+
+_poll_pool = ThreadPoolExecutor(
+    max_workers=AQI_POLL_CONCURRENCY, thread_name_prefix="aqi-poll",
+)
+
+# fetches that overran their cycle and are still running (station -> future)
+_inflight = {}
+
+
+def fetch_aqi(station_key, feed_id, timeout=AQI_FETCH_TIMEOUT):
     """
     Fetch AQI from WAQI. Returns WAQI AQI directly (not computed).
     Stores full payload metadata in _debug_data for transparency.
+    Failures return None at once; the next cycle retries.
     """
     try:
         url = BASE_URL.format(feed_id=feed_id, token=WAQI_TOKEN)
-        response = session.get(url, timeout=25)
+        response = transport.get(url, timeout=timeout, headers=_JSON_HEADERS)
 
         if response.status_code != 200:
             _set_error(station_key, f"HTTP {response.status_code}")
             return None
 
         data = response.json()
-        if data.get("status") != "ok":
-            _set_error(station_key, f"API status: {data.get('status')}")
-            return None
+        record_payload("waqi", station_key, {"feed_id": feed_id, "body": data})
+        return parse_feed_payload(station_key, feed_id, data)
 
-        payload = data.get("data", {})
+    except Exception as e:
+        _set_error(station_key, str(e))
+        return None
 
-        # ── WAQI AQI (direct from API, used for escalation) ──
-        waqi_aqi = payload.get("aqi")
-        if waqi_aqi is None or waqi_aqi == "-":
-            _set_error(station_key, "No AQI in payload")
-            return None
-        waqi_aqi = int(waqi_aqi)
-
-        # ── WAQI timestamp (from payload, not datetime.now) ──
-        waqi_time_str = payload.get("time", {}).get("s", "")
-        waqi_time_iso = payload.get("time", {}).get("iso", "")
-
-        # ── Station name (from API) ──
-        station_name = payload.get("city", {}).get("name", "Unknown")
-
-        # ── Pollutant concentrations (transparency only) ──
-        iaqi = payload.get("iaqi", {})
-        pollutants = {}
-        for key in ["pm25", "pm10", "no2", "so2", "o3", "co"]:
-            val = iaqi.get(key, {}).get("v")
-            if val is not None:
-                pollutants[key] = val
-
-        # ── Wind data (for satellite transport) ──
-        wind_speed = iaqi.get("w", {}).get("v")
-        wind_dir = iaqi.get("wd", {}).get("v")
-
-        # ── Compute staleness ──
-        api_response_time = datetime.now(timezone.utc).strftime("%H:%M:%S")
-        stale_seconds = None
-        if waqi_time_iso:
-            try:
-                waqi_dt = datetime.fromisoformat(waqi_time_iso.replace("Z", "+00:00"))
-                stale_seconds = (datetime.now(timezone.utc) - waqi_dt).total_seconds()
-            except Exception:
-                pass
-
-        # ── Store debug metadata ──
-        _debug_data[station_key] = {
-            "waqi_aqi": waqi_aqi,
-            "waqi_timestamp": waqi_time_str,
-            "waqi_timestamp_iso": waqi_time_iso,
-            "station_name_api": station_name,
-            "feed_id": feed_id,
-            "raw_pm25": pollutants.get("pm25"),
-            "raw_pm10": pollutants.get("pm10"),
-            "raw_no2": pollutants.get("no2"),
-            "raw_so2": pollutants.get("so2"),
-            "raw_o3": pollutants.get("o3"),
-            "raw_co": pollutants.get("co"),
-            "pollutants_available": len(pollutants),
-            "dominant_pollutant": max(pollutants, key=pollutants.get) if pollutants else "—",
-            "wind_speed": wind_speed,
-            "wind_direction": wind_dir,
-            "api_time": api_response_time,
-            "stale_seconds": stale_seconds,
-            "status": "ok",
-            "error": None,
-        }
-
-        # ── Return WAQI AQI directly for Pathway ──
-        return {
-            "timestamp": datetime.now(timezone.utc),
+
+def parse_feed_payload(station_key, feed_id, data, arrival=None):
+    """
+    Turn a WAQI /feed response body into a Pathway record and _debug_data
+    entry. arrival defaults to now; replay passes the recorded arrival.
+    """
+    if data.get("status") != "ok":
+        _set_error(station_key, f"API status: {data.get('status')}")
+        return None
+
+    payload = data.get("data", {})
+
+    # ── WAQI AQI (direct from API, used for escalation) ──
+    waqi_aqi = payload.get("aqi")
+    if waqi_aqi is None or waqi_aqi == "-":
+        _set_error(station_key, "No AQI in payload")
+        return None
+    waqi_aqi = int(waqi_aqi)
+
+    # ── WAQI timestamp (from payload, not datetime.now) ──
+    waqi_time_str = payload.get("time", {}).get("s", "")
+    waqi_time_iso = payload.get("time", {}).get("iso", "")
+
+    # ── Station name (from API) ──
+    station_name = payload.get("city", {}).get("name", "Unknown")
+
+    # ── Pollutant concentrations (transparency only) ──
+    iaqi = payload.get("iaqi", {})
+    pollutants = {}
+    for key in ["pm25", "pm10", "no2", "so2", "o3", "co"]:
+        val = iaqi.get(key, {}).get("v")
+        if val is not None:
+            pollutants[key] = val
+
+    # ── Wind data (for satellite transport) ──
+    wind_speed = iaqi.get("w", {}).get("v")
+    wind_dir = iaqi.get("wd", {}).get("v")
+
+    # ── Compute staleness ──
+    now = arrival or datetime.now(timezone.utc)
+    api_response_time = now.strftime("%H:%M:%S")
+    waqi_dt = _parse_waqi_time(waqi_time_iso)
+    stale_seconds = None
+    if waqi_dt:
+        stale_seconds = (now - waqi_dt).total_seconds()
+
+    # ── Store debug metadata ──
+    _debug_data.record(station_key).reset(
+        waqi_aqi=waqi_aqi,
+        waqi_timestamp=waqi_time_str,
+        waqi_timestamp_iso=waqi_time_iso,
+        station_name_api=station_name,
+        feed_id=feed_id,
+        raw_pm25=pollutants.get("pm25"),
+        raw_pm10=pollutants.get("pm10"),
+        raw_no2=pollutants.get("no2"),
+        raw_so2=pollutants.get("so2"),
+        raw_o3=pollutants.get("o3"),
+        raw_co=pollutants.get("co"),
+        pollutants_available=len(pollutants),
+        dominant_pollutant=max(pollutants, key=pollutants.get) if pollutants else "—",
+        wind_speed=wind_speed,
+        wind_direction=wind_dir,
+        api_time=api_response_time,
+        stale_seconds=stale_seconds,
+        status="ok",
+        error=None,
+    )
+
+    # ── Feed the gridded wind field (and locate the station in it) ──
+    geo = payload.get("city", {}).get("geo") or []
+    if len(geo) >= 2:
+        report_wind(
+            station_key, float(geo[0]), float(geo[1]), wind_speed, wind_dir,
+            ts=(waqi_dt or now).timestamp(),
+        )
+    # feed without w / wd: interpolate from nearby reporting stations
+    wind_speed, wind_dir, wind_source = wind_with_fallback(station_key, wind_speed, wind_dir)
+
+    # ── Return WAQI AQI directly for Pathway ──
+    # timestamp = arrival (drives windows), event_time = WAQI measurement time
+    return {
+        "timestamp": now,
+        "event_time": waqi_dt or now,
+        "aqi": waqi_aqi,
+        "city": station_key,
+        "wind_speed": wind_speed,
+        "wind_direction": wind_dir,
+        "wind_source": wind_source,
+        "pollutants": len(pollutants),
+    }
+
+
+def fetch_aqi_bounds(bounds):
+    """
+    Bulk mode: one WAQI map-bounds query per (lat1, lon1, lat2, lon2) box.
+    Returns (records, stations) for every station in the box with a
+    numeric AQI. Configured STATIONS keep their own keys (matched by
+    feed uid) and are not in `stations`, which lists only new ones. The
+    map endpoint carries no pollutant or wind detail, so _debug_data
+    entries hold AQI, time and name only.
+    """
+    bbox = ",".join(f"{v:.4f}" for v in bounds)
+    url = BOUNDS_URL.format(bounds=bbox, token=WAQI_TOKEN)
+    response = transport.get(url, timeout=AQI_FETCH_TIMEOUT, headers=_JSON_HEADERS)
+    if response.status_code != 200:
+        raise RuntimeError(f"bounds {bbox}: HTTP {response.status_code}")
+
+    data = response.json()
+    record_payload("waqi_bounds", bbox, {"body": data})
+    return parse_bounds_payload(bbox, data)
+
+
+def parse_bounds_payload(bbox, data, arrival=None):
+    """Parse a /map/bounds body into (records, stations); see fetch_aqi_bounds."""
+    if data.get("status") != "ok":
+        raise RuntimeError(f"bounds {bbox}: API status {data.get('status')}")
+
+    now = arrival or datetime.now(timezone.utc)
+    records, stations = [], {}
+    for item in data.get("data", []):
+        uid = item.get("uid")
+        try:
+            waqi_aqi = int(item.get("aqi"))
+            lat, lon = float(item["lat"]), float(item["lon"])
+        except (TypeError, ValueError, KeyError):
+            continue  # "-" or malformed entry
+        if not uid:
+            continue
+
+        stn = item.get("station", {})
+        name = stn.get("name", f"Station {uid}")
+        parts = [p.strip() for p in name.split(",")]
+        station_key = _KNOWN_FEEDS.get(f"@{uid}")
+        waqi_time_iso = stn.get("time", "")
+        waqi_dt = _parse_waqi_time(waqi_time_iso)
+
+        if station_key is None:
+            station_key = f"{parts[0]} — @{uid}"
+            stations[station_key] = {
+                "feed_id": f"@{uid}",
+                "lat": lat, "lon": lon,
+                "city": parts[0],
+                "state": parts[-1] if len(parts) > 1 else "India",
+                "api_name": name,
+            }
+        locate_station(station_key, lat, lon)
+        _debug_data.record(station_key).reset(
+            waqi_aqi=waqi_aqi,
+            waqi_timestamp=waqi_dt.strftime("%Y-%m-%d %H:%M:%S") if waqi_dt else "",
+            waqi_timestamp_iso=waqi_time_iso,
+            station_name_api=name,
+            feed_id=f"@{uid}",
+            api_time=now.strftime("%H:%M:%S"),
+            stale_seconds=(now - waqi_dt).total_seconds() if waqi_dt else None,
+        )
+        wind_speed, wind_dir, wind_source = wind_with_fallback(station_key, None, None)
+        records.append({
+            "timestamp": now,
+            "event_time": waqi_dt or now,
             "aqi": waqi_aqi,
             "city": station_key,
-        }
+            "wind_speed": wind_speed,
+            "wind_direction": wind_dir,
+            "wind_source": wind_source,
+        })
 
-    except Exception as e:
-        _set_error(station_key, str(e))
-        time.sleep(5)
+    return records, stations
+
+
+def poll_bounds(bounds_list, emit):
+    """
+    Bulk counterpart of poll_stations: a few map-bounds requests per cycle
+    cover every station inside the boxes. New stations are registered with
+    station_loader so the UI can place them. Returns the cycle stats.
+    """
+    from station_loader import register_stations
+
+    started = time.monotonic()
+    futures = {_poll_pool.submit(fetch_aqi_bounds, b): b for b in bounds_list}
+
+    seen = emitted = suppressed = failed = 0
+    for fut in as_completed(futures):
+        try:
+            records, stations = fut.result()
+        except Exception as e:
+            failed += 1
+            print(f"[AQI] bulk {futures[fut]} error: {e}")
+            continue
+        register_stations(stations)
+        seen += len(records)
+        for record in records:
+            if should_emit(record):
+                emit(record)
+                emitted += 1
+            else:
+                suppressed += 1
+
+    _poll_stats.update({
+        "cycle": _poll_stats["cycle"] + 1,
+        "stations": seen,
+        "emitted": emitted,
+        "suppressed": suppressed,
+        "failed": failed,
+        "wall_seconds": round(time.monotonic() - started, 2),
+        "last_cycle": datetime.now(timezone.utc).strftime("%H:%M:%S"),
+    })
+    return dict(_poll_stats)
+
+
+def _parse_waqi_time(iso):
+    """WAQI time.iso (local offset) -> aware UTC datetime, or None."""
+    if not iso:
+        return None
+    try:
+        return datetime.fromisoformat(iso.replace("Z", "+00:00")).astimezone(timezone.utc)
+    except Exception:
         return None
 
 
 def _set_error(station_key, msg):
-    """Record error state for UI display."""
-    _debug_data[station_key] = {
-        "waqi_aqi": None,
-        "waqi_timestamp": "",
-        "waqi_timestamp_iso": "",
-        "station_name_api": "",
-        "feed_id": "",
-        "raw_pm25": None,
-        "raw_pm10": None,
-        "raw_no2": None,
-        "raw_so2": None,
-        "raw_o3": None,
-        "raw_co": None,
-        "pollutants_available": 0,
-        "dominant_pollutant": "—",
-        "wind_speed": None,
-        "wind_direction": None,
-        "api_time": datetime.now(timezone.utc).strftime("%H:%M:%S"),
-        "stale_seconds": None,
-        "status": "error",
-        "error": msg,
-    }
-    print(f"[AQI] {station_key} error: {msg}")
\ No newline at end of file
+    """Record error state for UI display (resets the station's record in place)."""
+    _debug_data.set_error(
+        station_key, msg, api_time=datetime.now(timezone.utc).strftime("%H:%M:%S"),
+    )
+    print(f"[AQI] {station_key} error: {msg}")
+
+
+def should_emit(record):
+    """
+    Event-time dedup. A reading is emitted when its WAQI event time or AQI
+    differs from the last one emitted for the station. An unchanged reading
+    is re-stated once AQI_RESTATE_SECONDS have passed since it was last
+    emitted (so each sliding window keeps a row); otherwise it is suppressed.
+    """
+    station = record["city"]
+    now = record["timestamp"].timestamp()
+    last = _last_emitted.get(station)
+    _last_fetched[station] = now  # a real reading, even if it is suppressed below
+
+    if last is not None:
+        prev, emitted_at = last
+        if (prev["event_time"], prev["aqi"]) == (record["event_time"], record["aqi"]):
+            if now - emitted_at < AQI_RESTATE_SECONDS:
+                _dedup_stats["suppressed"] += 1
+                return False
+            _dedup_stats["restated"] += 1
+
+    _last_emitted[station] = (dict(record), now)
+    _dedup_stats["emitted"] += 1
+    return True
+
+
+def forget_station(station):
+    """Stop re-stating a station (its fetch failed): no reading stands in for a dead feed."""
+    _last_emitted.pop(station, None)
+    _last_fetched.pop(station, None)
+
+
+def restate_unchanged(emit, stations=None, now=None):
+    """
+    Re-state the last reading of every station not emitted for
+    AQI_RESTATE_SECONDS, without an API call. Keeps windows populated
+    for stations the scheduler is deliberately polling less often. A
+    station whose last real reading is older than
+    STALE_DATA_THRESHOLD_SECONDS is dropped instead of re-stated.
+    now (aware datetime) defaults to the wall clock; replay passes its own.
+    """
+    now = now or datetime.now(timezone.utc)
+    restated = 0
+    for station, (prev, emitted_at) in list(_last_emitted.items()):
+        if stations is not None and station not in stations:
+            continue
+        if now.timestamp() - emitted_at < AQI_RESTATE_SECONDS:
+            continue
+        if now.timestamp() - _last_fetched.get(station, emitted_at) > STALE_DATA_THRESHOLD_SECONDS:
+            forget_station(station)
+            _dedup_stats["expired"] += 1
+            continue
+        record = dict(prev, timestamp=now)
+        _last_emitted[station] = (record, now.timestamp())
+        _dedup_stats["restated"] += 1
+        emit(record)
+        restated += 1
+    return restated
+
+
+# a pool task that was still queued at its cycle's deadline: not a failure
+SKIPPED = object()
+
+
+def _fetch_before(deadline, station_key, feed_id):
+    """Pool task: fetch with whatever is left of the cycle budget as timeout."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0.5:
+        return SKIPPED  # queued past the deadline; retried next cycle without backoff
+    return fetch_aqi(station_key, feed_id, timeout=min(AQI_FETCH_TIMEOUT, remaining))
+
+
+def poll_stations(stations, emit, on_result=None, budget=AQI_CYCLE_BUDGET_SECONDS):
+    """
+    Fetch every station concurrently (bounded by AQI_POLL_CONCURRENCY)
+    within a deadline budget. Each record is handed to emit() as soon as
+    its request completes, so a cycle costs roughly the slowest request,
+    not the sum of all. on_result(station, record_or_None) sees every
+    real outcome (None is a failed fetch).
+
+    Stations unanswered at the deadline, or whose task never started
+    before it, are marked stale and listed in stats["overran"] (the
+    caller retries them without backoff); the cycle returns without
+    them. Next cycle a fetch that is still running is reused, one still
+    queued is resubmitted with the new deadline, and one that finished
+    late has its result used instead of fetching again. Returns the
+    cycle stats.
+    """
+    started = time.monotonic()
+    deadline = started + budget
+    emitted = suppressed = failed = 0
+    overran = []
+
+    def handle(name, record):
+        nonlocal emitted, suppressed, failed
+        if record is SKIPPED:
+            overran.append(name)
+            return
+        if on_result:
+            on_result(name, record)
+        if not record:
+            failed += 1
+            forget_station(name)
+        elif should_emit(record):
+            emit(record)
+            emitted += 1
+        else:
+            suppressed += 1
+
+    futures = {}
+    for name, info in stations.items():
+        fut = _inflight.pop(name, None)
+        if fut is not None and fut.done():
+            late = fut.result()
+            if late is not SKIPPED:
+                handle(name, late)  # landed after its own cycle's deadline
+                continue
+            fut = None
+        elif fut is not None and fut.cancel():
+            fut = None  # never started: resubmit against this cycle's deadline
+        if fut is None:
+            fut = _poll_pool.submit(_fetch_before, deadline, name, info["feed_id"])
+        futures[fut] = name
+
+    pending = set(futures)
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for fut in done:
+            handle(futures[fut], fut.result())
+
+    for fut in pending:
+        _inflight[futures[fut]] = fut
+        overran.append(futures[fut])
+    for name in overran:
+        forget_station(name)
+        _set_error(name, f"no response within {budget}s cycle budget (stale)")
+
+    wall = time.monotonic() - started
+    _poll_stats.update({
+        "cycle": _poll_stats["cycle"] + 1,
+        "stations": len(stations),
+        "emitted": emitted,
+        "suppressed": suppressed,
+        "failed": failed + len(overran),
+        "wall_seconds": round(wall, 2),
+        "budget_seconds": budget,
+        "budget_used": round(min(wall / budget, 1.0), 2),
+        "overran": sorted(overran),
+        "last_cycle": datetime.now(timezone.utc).strftime("%H:%M:%S"),
+    })
+    return dict(_poll_stats)
@@ -0,0 +1,121 @@
+# debug_store.py — compact per-station ingestion telemetry
+# One __slots__ record per station, updated in place. Records are
+# read-only Mapping views, so readers keep using .get() / [] as with
+# the old per-station dicts. A reader racing a writer may see a mix of
+# the old and new reading for that one station.
+
+import threading
+from collections.abc import Mapping
+
+# field -> value when a station has no (valid) reading
+DEBUG_DEFAULTS = {
+    "waqi_aqi": None,
+    "waqi_timestamp": "",
+    "waqi_timestamp_iso": "",
+    "station_name_api": "",
+    "feed_id": "",
+    "raw_pm25": None,
+    "raw_pm10": None,
+    "raw_no2": None,
+    "raw_so2": None,
+    "raw_o3": None,
+    "raw_co": None,
+    "pollutants_available": 0,
+    "dominant_pollutant": "—",
+    "wind_speed": None,
+    "wind_direction": None,
+    "api_time": "",
+    "stale_seconds": None,
+    "status": "ok",
+    "error": None,
+}
+DEBUG_FIELDS = tuple(DEBUG_DEFAULTS)
+_FIELD_SET = frozenset(DEBUG_FIELDS)
+
+
+class StationDebug(Mapping):
+    """Slotted telemetry record for one station; a live dict-like view."""
+
+    __slots__ = DEBUG_FIELDS
+
+    def __init__(self):
+        self.reset()
+
+    def reset(
+        self, waqi_aqi=None, waqi_timestamp="", waqi_timestamp_iso="",
+        station_name_api="", feed_id="",
+        raw_pm25=None, raw_pm10=None, raw_no2=None, raw_so2=None, raw_o3=None, raw_co=None,
+        pollutants_available=0, dominant_pollutant="—",
+        wind_speed=None, wind_direction=None,
+        api_time="", stale_seconds=None, status="ok", error=None,
+    ):
+        """Overwrite every field in place; unspecified ones take their default."""
+        self.waqi_aqi = waqi_aqi
+        self.waqi_timestamp = waqi_timestamp
+        self.waqi_timestamp_iso = waqi_timestamp_iso
+        self.station_name_api = station_name_api
+        self.feed_id = feed_id
+        self.raw_pm25 = raw_pm25
+        self.raw_pm10 = raw_pm10
+        self.raw_no2 = raw_no2
+        self.raw_so2 = raw_so2
+        self.raw_o3 = raw_o3
+        self.raw_co = raw_co
+        self.pollutants_available = pollutants_available
+        self.dominant_pollutant = dominant_pollutant
+        self.wind_speed = wind_speed
+        self.wind_direction = wind_direction
+        self.api_time = api_time
+        self.stale_seconds = stale_seconds
+        self.status = status
+        self.error = error
+
+    def get(self, name, default=None):
+        if name in _FIELD_SET:
+            return getattr(self, name)
+        return default
+
+    def __getitem__(self, name):
+        if name not in _FIELD_SET:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __contains__(self, name):
+        return name in _FIELD_SET
+
+    def __iter__(self):
+        return iter(DEBUG_FIELDS)
+
+    def __len__(self):
+        return len(DEBUG_FIELDS)
+
+    def __repr__(self):
+        return f"StationDebug({dict(self)!r})"
+
+
+class StationDebugStore(Mapping):
+    """Station-indexed StationDebug records; writes update records in place."""
+
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def record(self, station):
+        """The station's record, created on first use. Write with .reset(...)."""
+        rec = self._records.get(station)
+        if rec is None:
+            with self._lock:
+                rec = self._records.setdefault(station, StationDebug())
+        return rec
+
+    def set_error(self, station, msg, api_time):
+        self.record(station).reset(api_time=api_time, status="error", error=msg)
+
+    def __getitem__(self, station):
+        return self._records[station]
+
+    def __iter__(self):
+        return iter(list(self._records))
+
+    def __len__(self):
+        return len(self._records)
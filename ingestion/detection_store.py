@@ -0,0 +1,183 @@
+# detection_store.py — rolling FIRMS detection store
+# Detections are keyed by (lat, lon, acquisition time), so the same fire
+# re-downloaded by every poll (or by two overlapping stations) is stored
+# once. Stations hold key sets plus a version that only moves when a
+# detection is added to or evicted from their set. Fires travel as
+# FIRE_DTYPE structured arrays (17 bytes a detection), not dicts.
+# watch() / watch_sites() feed the Pathway fire tables in app.py.
+
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from config import FIRMS_DETECTION_MAX_AGE_HOURS
+
+# one packed row per detection
+FIRE_DTYPE = np.dtype([
+    ("lat", "<f4"),
+    ("lon", "<f4"),
+    ("frp", "<f4"),
+    ("acquired", "<u4"),     # acquisition time, epoch seconds (UTC)
+    ("confidence", "u1"),    # CONFIDENCE_CODES
+])
+CONFIDENCE_CODES = {"low": 0, "nominal": 1, "high": 2}
+CONFIDENCE_NAMES = {code: name for name, code in CONFIDENCE_CODES.items()}
+
+
+def readonly(fires):
+    """Zero-copy read-only view handed to readers."""
+    view = fires.view()
+    view.flags.writeable = False
+    return view
+
+
+EMPTY_FIRES = readonly(np.empty(0, dtype=FIRE_DTYPE))
+
+
+def fire_dicts(fires):
+    """Structured fires -> the old list-of-dicts shape (for JSON / debugging)."""
+    out = []
+    for lat, lon, frp, acquired, conf in fires.tolist():
+        at = datetime.fromtimestamp(acquired, tz=timezone.utc)
+        out.append({
+            "lat": lat, "lon": lon, "frp": frp,
+            "confidence": CONFIDENCE_NAMES.get(conf, "unknown"),
+            "acq_date": at.strftime("%Y-%m-%d"), "acq_time": at.strftime("%H%M"),
+        })
+    return out
+
+
+class DetectionStore:
+    """
+    Insert-only per cycle, evict by acquisition age. merge() returns
+    whether the station's fire set changed; version(station) lets
+    consumers skip work when it did not.
+    """
+
+    def __init__(self, max_age=FIRMS_DETECTION_MAX_AGE_HOURS * 3600):
+        self.max_age = max_age
+        self._detections = {}   # (lat, lon, acquired) -> FIRE_DTYPE row tuple
+        self._stations = {}     # station -> set of keys
+        self._versions = {}     # station -> int
+        self._sites = {}        # station -> (lat, lon)
+        self._watchers = []     # queues of (added rows, removed rows)
+        self._site_watchers = []  # queues of (station, lat, lon)
+        self._closed = False
+        self._lock = threading.Lock()
+        self.stats = {"inserted": 0, "duplicates": 0, "evicted": 0}
+
+    def merge(self, station, fires, now=None):
+        """Add new detections (FIRE_DTYPE rows) to the station's set, evict aged ones from it."""
+        now = time.time() if now is None else now
+        cutoff = now - self.max_age
+        with self._lock:
+            keys = self._stations.setdefault(station, set())
+            changed = False
+            added = []
+            for row in fires.tolist():
+                key = (row[0], row[1], row[3])
+                if key in keys:
+                    self.stats["duplicates"] += 1
+                    continue
+                if row[3] < cutoff:
+                    continue  # aged out, even if evict() has not dropped it globally yet
+                if key not in self._detections:
+                    self._detections[key] = row
+                    added.append(row)
+                    self.stats["inserted"] += 1
+                keys.add(key)
+                changed = True
+
+            expired = {k for k in keys if k[2] < cutoff}
+            if expired:
+                keys -= expired
+                changed = True
+            if changed:
+                self._versions[station] = self._versions.get(station, 0) + 1
+            self._publish(added, [])
+            return changed
+
+    def evict(self, now=None):
+        """Drop detections older than max_age everywhere; returns how many."""
+        cutoff = (time.time() if now is None else now) - self.max_age
+        with self._lock:
+            expired = {k for k in self._detections if k[2] < cutoff}
+            if not expired:
+                return 0
+            removed = [self._detections.pop(key) for key in expired]
+            for station, keys in self._stations.items():
+                if not keys.isdisjoint(expired):
+                    keys -= expired
+                    self._versions[station] = self._versions.get(station, 0) + 1
+            self.stats["evicted"] += len(expired)
+            self._publish([], removed)
+            return len(expired)
+
+    def locate(self, station, lat, lon):
+        """Record where a station sits (its ±delta box is what it owns)."""
+        with self._lock:
+            if self._sites.get(station) == (lat, lon):
+                return
+            self._sites[station] = (lat, lon)
+            for q in self._site_watchers:
+                q.put((station, lat, lon))
+
+    # ── change feeds ──
+
+    def watch(self):
+        """
+        Queue of (added, removed) lists of FIRE_DTYPE row tuples, primed
+        with every live detection. Detections leave only through evict().
+        None marks the end of the feed (close()).
+        """
+        q = queue.Queue()
+        with self._lock:
+            q.put((list(self._detections.values()), []))
+            self._subscribe(self._watchers, q)
+        return q
+
+    def watch_sites(self):
+        """Queue of (station, lat, lon) placements, primed with the known ones; None ends it."""
+        q = queue.Queue()
+        with self._lock:
+            for station, (lat, lon) in self._sites.items():
+                q.put((station, lat, lon))
+            self._subscribe(self._site_watchers, q)
+        return q
+
+    def close(self):
+        """End every change feed (replay: no more detections will come)."""
+        with self._lock:
+            self._closed = True
+            for q in self._watchers + self._site_watchers:
+                q.put(None)
+            self._watchers, self._site_watchers = [], []
+
+    def _subscribe(self, watchers, q):
+        if self._closed:
+            q.put(None)
+        else:
+            watchers.append(q)
+
+    def _publish(self, added, removed):
+        # caller holds _lock, so watchers see changes in store order
+        if added or removed:
+            for q in self._watchers:
+                q.put((added, removed))
+
+    def fires(self, station):
+        """The station's live detections as a FIRE_DTYPE array, oldest first."""
+        with self._lock:
+            rows = [self._detections[k] for k in self._stations.get(station, ())
+                    if k in self._detections]
+        rows.sort(key=lambda r: (r[3], r[0], r[1]))
+        return np.array(rows, dtype=FIRE_DTYPE)
+
+    def version(self, station):
+        return self._versions.get(station, 0)
+
+    def __len__(self):
+        return len(self._detections)
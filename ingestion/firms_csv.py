@@ -0,0 +1,168 @@
+# firms_csv.py — streaming FIRMS area-CSV parser
+# The response is fed in chunks; only complete lines are scanned. A regex
+# built from the header matches a row only when its confidence column
+# passes FIRMS_CONFIDENCE_FILTER, so rejected rows never become Python
+# objects. Surviving rows are converted a chunk at a time into NumPy
+# column buffers and packed into a FIRE_DTYPE array at the end.
+
+import re
+from datetime import datetime, timezone
+
+import numpy as np
+
+from config import FIRMS_CONFIDENCE_FILTER
+from ingestion.detection_store import CONFIDENCE_CODES, EMPTY_FIRES, FIRE_DTYPE
+
+CHUNK_BYTES = 64 * 1024
+
+_FIELD = rb"[^,\r\n]*"
+_WANTED = ("latitude", "longitude", "frp", "acq_date", "acq_time")
+
+
+def _row_pattern(header):
+    """
+    Regex for one data row: captures the wanted columns and the
+    confidence, and only matches confidences in the filter.
+    """
+    confidences = b"|".join(re.escape(c.encode()) for c in FIRMS_CONFIDENCE_FILTER)
+    parts, groups = [], []
+    for name in header:
+        if name == "confidence":
+            parts.append(rb"[ \t]*((?i:" + confidences + rb"))[ \t]*")
+            groups.append(name)
+        elif name in _WANTED and name not in groups:
+            parts.append(b"(" + _FIELD + b")")
+            groups.append(name)
+        else:
+            parts.append(_FIELD)
+    # extra trailing columns are ignored, short rows never match
+    pattern = rb"^" + b",".join(parts) + rb"(?:,[^\r\n]*)?\r?$"
+    return re.compile(pattern, re.M), groups
+
+
+class FirmsCsvParser:
+    """feed(chunk) bytes as they arrive, close() -> FIRE_DTYPE array."""
+
+    def __init__(self):
+        self.bytes = 0
+        self.rows = 0          # surviving rows (before malformed-row drops)
+        self._tail = b""
+        self._pattern = None
+        self._groups = None
+        self._columns = []     # per chunk: (lat, lon, frp, acquired, confidence)
+        self._days = {}        # acq_date bytes -> epoch of its midnight
+
+    def feed(self, chunk):
+        self.bytes += len(chunk)
+        data = self._tail + chunk
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            self._tail = data
+            return self
+        self._tail = data[cut + 1:]
+        self._scan(data[:cut + 1])
+        return self
+
+    def close(self):
+        if self._tail:
+            self._scan(self._tail + b"\n")
+            self._tail = b""
+        if not self._columns:
+            return EMPTY_FIRES
+        fires = np.empty(sum(len(c[0]) for c in self._columns), dtype=FIRE_DTYPE)
+        for i, name in enumerate(FIRE_DTYPE.names):
+            fires[name] = np.concatenate([c[i] for c in self._columns])
+        return fires
+
+    # ── internals ──
+
+    def _scan(self, block):
+        if self._pattern is None:
+            end = block.find(b"\n")
+            header = [h.strip() for h in block[:end].decode("utf-8", "replace").split(",")]
+            block = block[end + 1:]
+            if "latitude" not in header or "longitude" not in header:
+                raise ValueError("FIRMS CSV without latitude/longitude columns")
+            if "confidence" not in header or "acq_date" not in header:
+                self._pattern = False   # nothing can pass the filter
+            else:
+                self._pattern, self._groups = _row_pattern(header)
+        if not self._pattern:
+            return
+
+        matches = self._pattern.findall(block)
+        if not matches:
+            return
+        self.rows += len(matches)
+        cols = dict(zip(self._groups, zip(*matches)))
+        try:
+            self._columns.append(self._convert(cols, len(matches)))
+        except ValueError:
+            # a malformed value somewhere in the chunk: convert row by row
+            for row in zip(*(cols[g] for g in self._groups)):
+                try:
+                    self._columns.append(self._convert(
+                        {g: (v,) for g, v in zip(self._groups, row)}, 1,
+                    ))
+                except ValueError:
+                    continue
+
+    def _convert(self, cols, n):
+        lat = np.array(cols["latitude"]).astype(np.float64)
+        lon = np.array(cols["longitude"]).astype(np.float64)
+        frp = _numbers(cols.get("frp"), n, np.float64)
+        hhmm = _numbers(cols.get("acq_time"), n, np.int64)
+
+        dates, inverse = np.unique(np.array(cols["acq_date"]), return_inverse=True)
+        midnight = np.array([self._day(d) for d in dates.tolist()], dtype=np.int64)[inverse]
+        acquired = midnight + (hhmm // 100) * 3600 + (hhmm % 100) * 60
+
+        codes = {c: CONFIDENCE_CODES.get(c.lower().decode(), 0) for c in set(cols["confidence"])}
+        confidence = np.array([codes[c] for c in cols["confidence"]], dtype=np.uint8)
+        return lat, lon, frp, acquired, confidence
+
+    def _day(self, date):
+        day = self._days.get(date)
+        if day is None:
+            day = self._days[date] = int(
+                datetime.strptime(date.decode(), "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+            )
+        return day
+
+
+def _numbers(values, n, dtype):
+    """Column of numeric strings -> array; missing column or empty field is 0."""
+    if values is None:
+        return np.zeros(n, dtype=dtype)
+    arr = np.array(values)
+    arr[arr == b""] = b"0"
+    return arr.astype(dtype)
+
+
+def parse_firms_chunks(chunks, tee=None):
+    """Parse an iterable of byte chunks; tee (a list) collects them for the recorder."""
+    parser = FirmsCsvParser()
+    for chunk in chunks:
+        if tee is not None:
+            tee.append(chunk)
+        parser.feed(chunk)
+    return parser.close(), parser.bytes
+
+
+def parse_firms_csv(text):
+    """FIRMS area CSV text -> FIRE_DTYPE array of fires passing FIRMS_CONFIDENCE_FILTER."""
+    return FirmsCsvParser().feed(text.encode()).close()
+
+
+def count_csv_rows(chunks, tee=None):
+    """Data rows (lines after the header) of a streamed CSV, without keeping it."""
+    lines, last = 0, b"\n"
+    for chunk in chunks:
+        if tee is not None:
+            tee.append(chunk)
+        if chunk:
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    if last != b"\n":
+        lines += 1  # final line without a newline
+    return max(lines - 1, 0)
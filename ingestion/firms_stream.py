@@ -1,27 +1,49 @@
 # firms_stream.py — NASA FIRMS Satellite Fire Detection
 # Polls VIIRS_SNPP_NRT for thermal anomalies near monitoring stations.
-# Decoupled from AQI ingestion. Runs in its own thread.
+# Nearby stations share one region query; fires are assigned back to
+# stations through a grid index. Region CSVs are parsed as they stream
+# in (firms_csv.py). Fires are FIRE_DTYPE structured arrays; readers get
+# read-only views, never copies.
+# Decoupled from AQI ingestion. start_firms_poller() runs it in its own
+# thread over the live station registry (station_loader).
 # Graceful degradation: fire_count = 0 on failure.
 
-import csv
-import io
 import math
 import threading
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 
+import numpy as np
+
 from config import (
-    FIRMS_API_KEY, FIRMS_DATASET, FIRMS_POLL_MINUTES,
-    FIRMS_BBOX_DELTA, FIRMS_LOOKBACK_DAYS, FIRMS_CONFIDENCE_FILTER,
-    STATIONS,
+    FIRMS_API_KEY, FIRMS_DATASET, FIRMS_POLL_MINUTES, FIRMS_POLL_CONCURRENCY,
+    FIRMS_BBOX_DELTA, FIRMS_LOOKBACK_DAYS, FIRMS_MERGE_MAX_WASTE,
+    WIND_SPEED_MIN, FIRE_TRANSPORT_THRESHOLD, STATIONS,
+)
+from ingestion import transport
+from ingestion.detection_store import (
+    CONFIDENCE_CODES, EMPTY_FIRES, DetectionStore, readonly,
 )
+from ingestion.firms_csv import CHUNK_BYTES, parse_firms_chunks, parse_firms_csv
+from ingestion.replay import record_payload, recording
 
 FIRMS_URL = "https://firms.modaps.eosdis.nasa.gov/api/area/csv/{key}/{dataset}/{bbox}/{days}"
 
 # ── Module-level cache (thread-safe via GIL for simple reads) ──
 firms_cache = {}
 _firms_lock = threading.Lock()
+_firms_stats = {"requests": 0, "bytes_parsed": 0, "fires_parsed": 0}
+
+# ── Poller: started by start_firms_poller(), region requests share a bounded pool ──
+_firms_pool = ThreadPoolExecutor(
+    max_workers=FIRMS_POLL_CONCURRENCY, thread_name_prefix="firms-poll",
+)
+_poller_thread = None
+_regions = {"key": None, "regions": []}  # merge_regions memo for the current registry
+
+# rolling, deduplicated detections behind firms_cache
+detections = DetectionStore()
 
 
 def _bbox_str(lat, lon, delta):
@@ -29,60 +51,265 @@ def _bbox_str(lat, lon, delta):
     return f"{lon - delta:.4f},{lat - delta:.4f},{lon + delta:.4f},{lat + delta:.4f}"
 
 
-def _poll_firms():
-    """Background poller: queries NASA FIRMS for each station."""
+def _box_str(box):
+    return ",".join(f"{v:.4f}" for v in box)
+
+
+def _area(box):
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def _union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def merge_regions(stations, delta=FIRMS_BBOX_DELTA, max_waste=FIRMS_MERGE_MAX_WASTE):
+    """
+    Greedily merge the stations' ±delta boxes into region queries: two
+    regions merge while their union covers at most max_waste times their
+    combined area, so clustered stations share one request and spread-out
+    ones keep their own. Returns [(W,S,E,N box, {station: (lat, lon)})].
+    """
+    regions = [
+        ((info["lon"] - delta, info["lat"] - delta, info["lon"] + delta, info["lat"] + delta),
+         {name: (info["lat"], info["lon"])})
+        for name, info in stations.items()
+    ]
+    merged = True
+    while merged:
+        merged = False
+        regions.sort(key=lambda r: r[0][0])
+        out = []
+        for box, members in regions:
+            for k, (other, other_members) in enumerate(out):
+                union = _union(box, other)
+                if _area(union) <= (_area(box) + _area(other)) * max_waste:
+                    out[k] = (union, {**other_members, **members})
+                    merged = True
+                    break
+            else:
+                out.append((box, members))
+        regions = out
+    return regions
+
+
+def _live_stations():
+    """Hard-coded stations plus everything station_loader has discovered."""
+    from station_loader import get_all_stations
+    return get_all_stations(STATIONS, limit=30)
+
+
+def _station_regions(stations):
+    """merge_regions, recomputed only when a station is added or moves."""
+    key = frozenset((name, info["lat"], info["lon"]) for name, info in stations.items())
+    if key != _regions["key"]:
+        _regions.update(key=key, regions=merge_regions(stations))
+    return _regions["regions"]
+
+
+def _fetch_region(box, members):
+    """One region query, parsed as the body streams in; failures degrade its stations."""
+    bbox = _box_str(box)
+    try:
+        url = FIRMS_URL.format(
+            key=FIRMS_API_KEY,
+            dataset=FIRMS_DATASET,
+            bbox=bbox,
+            days=FIRMS_LOOKBACK_DAYS,
+        )
+        with transport.get(url, timeout=30, stream=True) as resp:
+            if resp.status_code != 200:
+                record_payload("firms_region", bbox, {
+                    "stations": members, "status": resp.status_code, "text": resp.text,
+                })
+                ingest_firms_region(bbox, members, resp.status_code, resp.text)
+                return
+            # parse as the body arrives; keep the raw chunks only when recording
+            tee = [] if recording() else None
+            fires, size = parse_firms_chunks(resp.iter_content(CHUNK_BYTES), tee=tee)
+        if tee is not None:
+            record_payload("firms_region", bbox, {
+                "stations": members, "status": 200,
+                "text": b"".join(tee).decode("utf-8", "replace"),
+            })
+        _ingest_region_fires(members, fires, size)
+
+    except Exception as e:
+        for city in members:
+            _set_failure(city, str(e))
+
+
+def _poll_cycle(interval):
+    """
+    One pass over the live registry: region i is submitted at
+    i * interval / len(regions), so requests are spread across the
+    interval instead of bursting, and at most FIRMS_POLL_CONCURRENCY
+    run at once. Returns when every region has answered.
+    """
+    started = time.monotonic()
+    stations = _live_stations()
+    regions = _station_regions(stations)
+    spacing = interval / max(len(regions), 1)
+
+    futures = []
+    for i, (box, members) in enumerate(regions):
+        delay = started + i * spacing - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        futures.append(_firms_pool.submit(_fetch_region, box, members))
+    wait(futures)
+
+    evicted = evict_detections()
+    print(
+        f"[FIRMS] {len(stations)} stations in {len(regions)} region queries "
+        f"({spacing:.1f}s apart, {time.monotonic() - started:.0f}s), "
+        f"{_firms_stats['bytes_parsed'] / 1024:.1f} KB parsed so far, "
+        f"{len(detections)} detections held "
+        f"(+{detections.stats['inserted']} new total, {evicted} aged out)"
+    )
+    return started
+
+
+def _poll_firms(interval):
+    """Background poller: every interval, one FIRMS query per merged region."""
     while True:
-        for city, info in STATIONS.items():
-            lat, lon = info["lat"], info["lon"]
-            bbox = _bbox_str(lat, lon, FIRMS_BBOX_DELTA)
-            try:
-                url = FIRMS_URL.format(
-                    key=FIRMS_API_KEY,
-                    dataset=FIRMS_DATASET,
-                    bbox=bbox,
-                    days=FIRMS_LOOKBACK_DAYS,
-                )
-                resp = requests.get(url, timeout=30)
-
-                if resp.status_code != 200 or not resp.text.strip():
-                    _set_failure(city, f"HTTP {resp.status_code}")
-                    continue
-
-                # Parse CSV
-                reader = csv.DictReader(io.StringIO(resp.text))
-                fires = []
-                for row in reader:
-                    conf = row.get("confidence", "").strip().lower()
-                    if conf in FIRMS_CONFIDENCE_FILTER:
-                        fires.append({
-                            "lat": float(row.get("latitude", 0)),
-                            "lon": float(row.get("longitude", 0)),
-                            "confidence": conf,
-                            "frp": float(row.get("frp", 0)),
-                            "acq_date": row.get("acq_date", ""),
-                            "acq_time": row.get("acq_time", ""),
-                        })
-
-                high_conf = sum(1 for f in fires if f["confidence"] == "high")
-
-                with _firms_lock:
-                    firms_cache[city] = {
-                        "fire_count": len(fires),
-                        "high_confidence": high_conf,
-                        "nominal": len(fires) - high_conf,
-                        "fires": fires,
-                        "bbox": bbox,
-                        "last_sync": datetime.utcnow().strftime("%H:%M:%S"),
-                        "status": "ok",
-                        "error": None,
-                        "total_raw": len(fires),
-                        "dataset": FIRMS_DATASET,
-                    }
-
-            except Exception as e:
-                _set_failure(city, str(e))
-
-        time.sleep(FIRMS_POLL_MINUTES * 60)
+        started = _poll_cycle(interval)
+        time.sleep(max(0.0, started + interval - time.monotonic()))
+
+
+def start_firms_poller(interval=FIRMS_POLL_MINUTES * 60):
+    """Start the background poller once; replay feeds firms_cache from the log instead."""
+    global _poller_thread
+    with _firms_lock:
+        if _poller_thread is None:
+            _poller_thread = threading.Thread(
+                target=_poll_firms, args=(interval,), daemon=True, name="firms-poller",
+            )
+            _poller_thread.start()
+    return _poller_thread
+
+
+def assign_fires(fires, stations, delta=FIRMS_BBOX_DELTA):
+    """
+    Spatial grid index: bucket fires into cells of size 2*delta, so each
+    station's ±delta box touches at most 4 cells, then test only the
+    fires in those cells. Same result as one bbox query per station.
+    Returns {station: FIRE_DTYPE array}, fires in their original order.
+    """
+    cell = 2 * delta
+    lat = fires["lat"].astype(np.float64)
+    lon = fires["lon"].astype(np.float64)
+    rows = np.floor(lat / cell).astype(np.int64)
+    cols = np.floor(lon / cell).astype(np.int64)
+    order = np.argsort(rows * 1_000_003 + cols, kind="stable")
+    ids = (rows * 1_000_003 + cols)[order]
+    cells, starts = np.unique(ids, return_index=True)
+    ends = np.append(starts[1:], len(ids))
+    index = {cid: order[a:b] for cid, a, b in zip(cells.tolist(), starts.tolist(), ends.tolist())}
+
+    assigned = {}
+    for name, (slat, slon) in stations.items():
+        parts = [
+            index[r * 1_000_003 + c]
+            for r in range(math.floor((slat - delta) / cell), math.floor((slat + delta) / cell) + 1)
+            for c in range(math.floor((slon - delta) / cell), math.floor((slon + delta) / cell) + 1)
+            if r * 1_000_003 + c in index
+        ]
+        if not parts:
+            assigned[name] = EMPTY_FIRES
+            continue
+        idx = np.sort(np.concatenate(parts))
+        inside = (np.abs(lat[idx] - slat) <= delta) & (np.abs(lon[idx] - slon) <= delta)
+        assigned[name] = fires[idx[inside]]
+    return assigned
+
+
+def _store(city, fires, bbox, station_lat, station_lon, version=0):
+    fires = readonly(fires)
+    high_conf = int((fires["confidence"] == CONFIDENCE_CODES["high"]).sum())
+    with _firms_lock:
+        firms_cache[city] = {
+            "fire_count": len(fires),
+            "high_confidence": high_conf,
+            "nominal": len(fires) - high_conf,
+            "fires": fires,
+            "station_lat": station_lat,
+            "station_lon": station_lon,
+            "version": version,
+            "bbox": bbox,
+            "last_sync": datetime.utcnow().strftime("%H:%M:%S"),
+            "status": "ok",
+            "error": None,
+            "total_raw": len(fires),
+            "dataset": FIRMS_DATASET,
+        }
+
+
+def _refresh(city, fires, bbox, lat, lon, now):
+    """Merge into the detection store; rebuild firms_cache[city] only if its version moved."""
+    detections.merge(city, fires, now)
+    version = detections.version(city)
+    with _firms_lock:
+        cached = firms_cache.get(city)
+        # compare versions, not merge()'s result: evict() can move a set between polls
+        if cached and cached["status"] == "ok" and cached["version"] == version:
+            cached["last_sync"] = datetime.utcnow().strftime("%H:%M:%S")
+            return
+    _store(city, detections.fires(city), bbox, lat, lon, version)
+
+
+def evict_detections(now=None):
+    """Age detections out of the store and rebuild the cache entries that held them."""
+    evicted = detections.evict(now)
+    if evicted:
+        with _firms_lock:
+            stale = [
+                (city, cached["bbox"], cached["station_lat"], cached["station_lon"])
+                for city, cached in firms_cache.items()
+                if cached["status"] == "ok" and cached["version"] != detections.version(city)
+            ]
+        for city, bbox, lat, lon in stale:
+            _store(city, detections.fires(city), bbox, lat, lon, detections.version(city))
+    return evicted
+
+
+def ingest_firms_region(region_bbox, stations, status_code, text, now=None):
+    """
+    Parse one region CSV once and merge every station's share into the
+    detection store (now: eviction clock, replay passes the arrival).
+    """
+    if status_code != 200 or not text.strip():
+        for city in stations:
+            _set_failure(city, f"HTTP {status_code}")
+        return
+    _ingest_region_fires(stations, parse_firms_csv(text), len(text), now)
+
+
+def _ingest_region_fires(stations, fires, size, now=None):
+    """Assign a parsed region's fires to its stations and merge them in."""
+    if size == 0:
+        for city in stations:
+            _set_failure(city, "HTTP 200 (empty body)")
+        return
+    with _firms_lock:
+        _firms_stats["requests"] += 1
+        _firms_stats["bytes_parsed"] += size
+        _firms_stats["fires_parsed"] += len(fires)
+    for city, own in assign_fires(fires, stations).items():
+        lat, lon = stations[city]
+        detections.locate(city, lat, lon)
+        _refresh(city, own, _bbox_str(lat, lon, FIRMS_BBOX_DELTA), lat, lon, now)
+
+
+def ingest_firms_csv(city, bbox, status_code, text, now=None):
+    """Parse one per-station FIRMS CSV (older recordings) into firms_cache[city]."""
+    if status_code != 200 or not text.strip():
+        _set_failure(city, f"HTTP {status_code}")
+        return
+    station = STATIONS.get(city, {})
+    if station:
+        detections.locate(city, station["lat"], station["lon"])
+    _refresh(city, parse_firms_csv(text), bbox, station.get("lat", 0), station.get("lon", 0), now)
 
 
 def _set_failure(city, error_msg):
@@ -92,7 +319,7 @@ def _set_failure(city, error_msg):
             "fire_count": 0,
             "high_confidence": 0,
             "nominal": 0,
-            "fires": [],
+            "fires": EMPTY_FIRES,
             "bbox": "",
             "last_sync": datetime.utcnow().strftime("%H:%M:%S"),
             "status": "error",
@@ -108,7 +335,7 @@ def get_firms_data(city):
     with _firms_lock:
         return firms_cache.get(city, {
             "fire_count": 0, "high_confidence": 0, "nominal": 0,
-            "fires": [], "bbox": "", "last_sync": "—",
+            "fires": EMPTY_FIRES, "bbox": "", "last_sync": "—",
             "status": "awaiting", "error": None,
             "total_raw": 0, "dataset": FIRMS_DATASET,
         })
@@ -142,37 +369,76 @@ def compute_wind_alignment(fire_lat, fire_lon, station_lat, station_lon, wind_di
     return 0.0
 
 
-def compute_transport_score(city, wind_dir, wind_speed):
-    """
-    Deterministic transport score (0-100).
-    Combines fire count with wind alignment.
-    """
-    from config import WIND_SPEED_MIN, FIRE_TRANSPORT_THRESHOLD
+_PREFILTER_COS2 = math.cos(math.radians(45.5)) ** 2  # a little wider than the 45° cut
 
-    data = get_firms_data(city)
-    if data["fire_count"] == 0 or wind_speed is None:
-        return 0, 0, "none"
 
-    if wind_speed < WIND_SPEED_MIN:
-        return 0, 0, "calm"
+def _trig(lat, lon):
+    """(sin lat, cos lat, sin lon, cos lon) of degree arrays."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.sin(lat), np.cos(lat), np.sin(lon), np.cos(lon)
 
-    station = STATIONS.get(city, {})
-    slat, slon = station.get("lat", 0), station.get("lon", 0)
 
-    aligned_count = 0
-    total_alignment = 0.0
+def _exact_alignment(fire_lat, fire_lon, station_lat, station_lon, wind_dir):
+    """compute_wind_alignment, element-wise, with the same operations."""
+    dlon = np.radians(fire_lon - station_lon)
+    lat1 = np.radians(station_lat)
+    lat2 = np.radians(fire_lat)
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    bearing = (np.degrees(np.arctan2(x, y)) + 360) % 360
+    diff = np.abs(bearing - wind_dir)
+    diff = np.where(diff > 180, 360 - diff, diff)
+    return np.where(diff <= 45, 1.0 - (diff / 45.0) * 0.5, 0.0)
 
-    for fire in data["fires"]:
-        a = compute_wind_alignment(fire["lat"], fire["lon"], slat, slon, wind_dir)
-        if a > 0:
-            aligned_count += 1
-            total_alignment += a
 
+def _alignment(fire_lat, fire_lon, fire_trig, station_lat, station_lon, station_trig,
+               wind_dir, wind_trig):
+    """
+    Per-pair alignment from precomputed trig. A dot product of the
+    bearing vector with the wind picks the fires within ~45.5° of it;
+    only those get the exact bearing, so results match the scalar code
+    while most pairs cost a few multiplies.
+    """
+    sin_f, cos_f, sinl_f, cosl_f = fire_trig
+    sin_s, cos_s, sinl_s, cosl_s = station_trig
+    sin_dlon = sinl_f * cosl_s - cosl_f * sinl_s
+    cos_dlon = cosl_f * cosl_s + sinl_f * sinl_s
+    x = sin_dlon * cos_f
+    y = cos_s * sin_f - sin_s * cos_f * cos_dlon
+    dot = x * wind_trig[0] + y * wind_trig[1]
+    with np.errstate(invalid="ignore"):
+        near = np.flatnonzero((dot > 0) & (dot * dot >= _PREFILTER_COS2 * (x * x + y * y)))
+
+    out = np.zeros(len(x))
+    out[near] = _exact_alignment(
+        fire_lat[near], fire_lon[near], station_lat[near], station_lon[near], wind_dir[near]
+    )
+    return out
+
+
+def wind_alignment_array(fire_lat, fire_lon, station_lat, station_lon, wind_dir):
+    """
+    compute_wind_alignment for every fire of one station in one call.
+    A NaN wind_dir gives 0 alignment, like None in the scalar version.
+    """
+    fire_lat = np.asarray(fire_lat, dtype=float)
+    fire_lon = np.asarray(fire_lon, dtype=float)
+    n = len(fire_lat)
+    w = math.radians(wind_dir)
+    return _alignment(
+        fire_lat, fire_lon, _trig(fire_lat, fire_lon),
+        np.full(n, float(station_lat)), np.full(n, float(station_lon)),
+        _trig(station_lat, station_lon), np.full(n, float(wind_dir)),
+        (math.sin(w), math.cos(w)),
+    )
+
+
+def _score_label(fire_count, aligned_count, total_alignment, wind_speed):
     if aligned_count == 0:
         return 0, aligned_count, "none"
 
     # Score: weighted fire count * alignment * wind factor
-    fire_factor = min(1.0, data["fire_count"] / 10.0)
+    fire_factor = min(1.0, fire_count / 10.0)
     alignment_factor = total_alignment / max(aligned_count, 1)
     wind_factor = min(1.0, wind_speed / 10.0)
 
@@ -189,6 +455,16 @@ def compute_transport_score(city, wind_dir, wind_speed):
     return score, aligned_count, label
 
 
-# ── Start background poller ──
-_poller_thread = threading.Thread(target=_poll_firms, daemon=True)
-_poller_thread.start()
+def _precheck(data, wind_speed):
+    """Shortcut result when no alignment is needed, else None."""
+    if data["fire_count"] == 0 or wind_speed is None:
+        return 0, 0, "none"
+    if wind_speed < WIND_SPEED_MIN:
+        return 0, 0, "calm"
+    return None
+
+
+def transport_result(fire_count, aligned_count, total_alignment, wind_speed):
+    """(score, aligned, label) from per-station alignment totals, as reduced in the dataflow."""
+    early = _precheck({"fire_count": fire_count}, wind_speed)
+    return early or _score_label(fire_count, aligned_count, total_alignment, wind_speed)
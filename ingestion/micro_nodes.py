@@ -0,0 +1,515 @@
+# micro_nodes.py — simulated low-cost sensor fleet
+# N virtual micro-nodes with diurnal AQI curves, local spikes, dropouts
+# and regional wind. Emits AQISchema records and fills _debug_data just
+# like the WAQI pollers, so the whole pipeline can be load-tested with
+# 1k–50k stations. State is numpy arrays, one step updates every node.
+# Also hosts the push endpoint real field nodes POST their readings to.
+
+import json
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from config import (
+    MICRO_NODE_BOUNDS, MICRO_NODE_DROPOUT_PROB, MICRO_NODE_RECOVER_PROB,
+    MICRO_NODE_SPIKE_PROB, MICRO_NODE_SPIKE_HALFLIFE,
+    MICRO_PUSH_MAX_BODY_BYTES, MICRO_PUSH_QUEUE_RECORDS, MICRO_PUSH_BATCH_RECORDS,
+    MICRO_PUSH_LINGER_MS, MICRO_PUSH_MAX_SKEW_SECONDS, STALE_DATA_THRESHOLD_SECONDS,
+)
+from ingestion.aqi_stream import _debug_data
+from ingestion.weather_stream import locate_station, wind_with_fallback
+
+_IST = timedelta(hours=5, minutes=30)
+
+# coarse wind regimes: the fleet box is split into a grid of cells that
+# share a prevailing direction/speed, each node jitters around its cell
+_WIND_CELLS = 4
+
+
+def node_name(node_id):
+    """Station key for a numeric micro-node id (simulated and pushed alike)."""
+    return f"Micro-{node_id:05d} — #mn{node_id}"
+
+
+def _aqi_to_pm25(aqi):
+    """Rough inverse of the PM2.5 sub-index, for the raw_pm25 debug field."""
+    return np.where(aqi <= 100, aqi * 0.6, 60 + (aqi - 100) * 0.9)
+
+
+class MicroNodeFleet:
+    """
+    Deterministic (seeded) simulated fleet. step() advances every node to
+    `now` and returns one record per node that is online.
+
+    - diurnal curve: evening/night peak plus a smaller morning rush peak
+    - spikes: start at random, decay with MICRO_NODE_SPIKE_HALFLIFE
+    - dropouts: nodes go offline / come back at random (marked in _debug_data)
+    - wind: slowly veering prevailing wind per region cell
+    """
+
+    def __init__(self, count, seed=7, bounds=MICRO_NODE_BOUNDS):
+        rng = np.random.default_rng(seed)
+        self.count = count
+        self._rng = rng
+
+        lat1, lon1, lat2, lon2 = bounds
+        self.lat = rng.uniform(min(lat1, lat2), max(lat1, lat2), count)
+        self.lon = rng.uniform(min(lon1, lon2), max(lon1, lon2), count)
+        self.names = [node_name(i) for i in range(count)]
+        self.feed_ids = [f"#mn{i}" for i in range(count)]
+
+        # per-node climate: skewed base level, diurnal swing, sensor noise
+        self.base = np.clip(rng.lognormal(math.log(110), 0.5, count), 20, 380)
+        self.amplitude = self.base * rng.uniform(0.15, 0.45, count)
+        self.peak_hour = rng.normal(22.0, 1.5, count)
+        self.noise = rng.uniform(3, 12, count)
+
+        self.spike = np.zeros(count)
+        self.online = np.ones(count, dtype=bool)
+
+        # wind: one prevailing vector per cell, per-node offset
+        cell_lat = np.minimum((self.lat - self.lat.min()) / max(np.ptp(self.lat), 1e-9) * _WIND_CELLS,
+                              _WIND_CELLS - 1).astype(int)
+        cell_lon = np.minimum((self.lon - self.lon.min()) / max(np.ptp(self.lon), 1e-9) * _WIND_CELLS,
+                              _WIND_CELLS - 1).astype(int)
+        self._cell = cell_lat * _WIND_CELLS + cell_lon
+        self._cell_dir = rng.uniform(0, 360, _WIND_CELLS * _WIND_CELLS)
+        self._cell_speed = rng.uniform(1.0, 6.0, _WIND_CELLS * _WIND_CELLS)
+        self._dir_offset = rng.normal(0, 15, count)
+
+        for name, lat, lon in zip(self.names, self.lat.tolist(), self.lon.tolist()):
+            locate_station(name, lat, lon)
+
+        self._last = None
+        self.steps = 0
+
+    def stations(self):
+        """Fleet as a STATIONS-style dict (name -> feed_id / lat / lon / city)."""
+        return {
+            name: {"feed_id": fid, "lat": float(lat), "lon": float(lon), "city": name}
+            for name, fid, lat, lon in zip(self.names, self.feed_ids, self.lat, self.lon)
+        }
+
+    def step(self, now=None):
+        """Advance the fleet to `now` and return records for online nodes."""
+        now = now or datetime.now(timezone.utc)
+        rng = self._rng
+        dt = 0.0 if self._last is None else max(0.0, (now - self._last).total_seconds())
+        self._last = now
+        self.steps += 1
+
+        # dropouts / recoveries
+        went_down = self.online & (rng.random(self.count) < MICRO_NODE_DROPOUT_PROB)
+        came_back = ~self.online & (rng.random(self.count) < MICRO_NODE_RECOVER_PROB)
+        self.online = (self.online & ~went_down) | came_back
+
+        # spikes decay, new ones start
+        if dt:
+            self.spike *= 0.5 ** (dt / MICRO_NODE_SPIKE_HALFLIFE)
+        starts = rng.random(self.count) < MICRO_NODE_SPIKE_PROB
+        self.spike[starts] += rng.uniform(80, 250, int(starts.sum()))
+
+        # diurnal curve in local (IST) hours
+        local = now + _IST
+        hour = local.hour + local.minute / 60 + local.second / 3600
+        phase = 2 * np.pi * (hour - self.peak_hour) / 24
+        diurnal = 0.7 * np.cos(phase) + 0.3 * np.cos(2 * np.pi * (hour - 9.0) / 12)
+        aqi = self.base + self.amplitude * diurnal + self.spike + rng.normal(0, 1, self.count) * self.noise
+        aqi = np.clip(np.rint(aqi), 0, 500).astype(int)
+
+        # wind veers slowly per cell
+        self._cell_dir = (self._cell_dir + rng.normal(0, 2, self._cell_dir.size)) % 360
+        self._cell_speed = np.clip(self._cell_speed + rng.normal(0, 0.2, self._cell_speed.size), 0.3, 12)
+        wind_dir = np.rint((self._cell_dir[self._cell] + self._dir_offset) % 360).astype(int)
+        wind_speed = np.round(self._cell_speed[self._cell] * rng.uniform(0.8, 1.2, self.count), 1)
+        pm25 = np.round(_aqi_to_pm25(aqi), 1)
+        pm10 = np.round(pm25 * rng.uniform(1.4, 2.0, self.count), 1)
+
+        api_time = now.strftime("%H:%M:%S")
+        waqi_time = local.strftime("%Y-%m-%d %H:%M:%S")
+        waqi_iso = now.isoformat()
+        names = self.names
+
+        for i in np.flatnonzero(went_down):
+            _debug_data.set_error(names[i], "Simulated node offline", api_time)
+
+        records = []
+        for i in np.flatnonzero(self.online).tolist():
+            a = int(aqi[i])
+            _debug_data.record(names[i]).reset(
+                waqi_aqi=a,
+                waqi_timestamp=waqi_time,
+                waqi_timestamp_iso=waqi_iso,
+                station_name_api=names[i],
+                feed_id=self.feed_ids[i],
+                raw_pm25=float(pm25[i]),
+                raw_pm10=float(pm10[i]),
+                pollutants_available=2,
+                dominant_pollutant="pm25",
+                wind_speed=float(wind_speed[i]),
+                wind_direction=int(wind_dir[i]),
+                api_time=api_time,
+                stale_seconds=0.0,
+            )
+            records.append({
+                "timestamp": now, "event_time": now, "aqi": a, "city": names[i],
+                "wind_speed": float(wind_speed[i]), "wind_direction": float(wind_dir[i]),
+                "wind_source": "station", "pollutants": 2,
+            })
+        return records
+
+    def stats(self):
+        return {
+            "nodes": self.count,
+            "online": int(self.online.sum()),
+            "spiking": int((self.spike > 20).sum()),
+            "steps": self.steps,
+        }
+
+
+def run_fleet(fleet, emit, interval, steps=None):
+    """Step the fleet every `interval` seconds, passing each record to emit."""
+    n = 0
+    while steps is None or n < steps:
+        started = time.monotonic()
+        records = fleet.step()
+        for record in records:
+            emit(record)
+        elapsed = time.monotonic() - started
+        st = fleet.stats()
+        print(
+            f"[MICRO] step {st['steps']}: {st['online']}/{st['nodes']} nodes reporting, "
+            f"{st['spiking']} spiking, {elapsed:.2f}s"
+        )
+        n += 1
+        time.sleep(max(0.0, interval - elapsed))
+
+
+# ── Push ingest (field nodes POST readings) ──
+#
+# POST /ingest with either
+#   application/x-ndjson      one reading per line:
+#                             {"id": 17 | "node": "<station key>", "ts": epoch,
+#                              "aqi": 0-500, "pm25"?, "wind_speed"?, "wind_direction"?}
+#   application/octet-stream  FRAME_MAGIC, uint32 count, then `count`
+#                             packed FRAME_DTYPE records (little endian;
+#                             NaN / 0xFFFF mark missing optional values)
+# Answers 200 {"accepted", "rejected", "errors"}, 400 for an undecodable
+# body, 503 + Retry-After when the queue is full because Pathway lags.
+# GET /stats returns the ingest counters.
+
+FRAME_MAGIC = b"AQB1"
+FRAME_DTYPE = np.dtype([
+    ("id", "<u4"), ("ts", "<f8"), ("aqi", "<u2"),
+    ("pm25", "<f4"), ("wind_speed", "<f4"), ("wind_dir", "<u2"),
+])
+_FRAME_HEADER = 8
+_NO_WIND_DIR = 0xFFFF
+
+
+def encode_frame(ids, ts, aqi, pm25=None, wind_speed=None, wind_dir=None):
+    """Pack readings (array-likes) into one binary frame."""
+    n = len(ids)
+    frame = np.zeros(n, dtype=FRAME_DTYPE)
+    frame["id"], frame["ts"], frame["aqi"] = ids, ts, aqi
+    frame["pm25"] = np.nan if pm25 is None else pm25
+    frame["wind_speed"] = np.nan if wind_speed is None else wind_speed
+    frame["wind_dir"] = _NO_WIND_DIR if wind_dir is None else wind_dir
+    return FRAME_MAGIC + np.uint32(n).tobytes() + frame.tobytes()
+
+
+def _opt(value):
+    return None if value != value else round(float(value), 1)  # NaN -> None
+
+
+def _finite(value):
+    """A real JSON number (not a bool), and not NaN / inf."""
+    return not isinstance(value, bool) and isinstance(value, (int, float)) and math.isfinite(value)
+
+
+def decode_frame(body, now):
+    """Binary frame -> (readings, rejected count, errors). Raises ValueError if malformed."""
+    if len(body) < _FRAME_HEADER or body[:4] != FRAME_MAGIC:
+        raise ValueError("bad frame magic")
+    n = int(np.frombuffer(body, "<u4", 1, 4)[0])
+    if len(body) != _FRAME_HEADER + n * FRAME_DTYPE.itemsize:
+        raise ValueError(f"frame length does not match {n} records")
+    frame = np.frombuffer(body, FRAME_DTYPE, n, _FRAME_HEADER)
+
+    # NaN marks a missing pm25 / wind_speed; inf and negatives are rejected
+    pm25, wind = frame["pm25"], frame["wind_speed"]
+    ok = (
+        (frame["aqi"] <= 500)
+        & np.isfinite(frame["ts"])
+        & (frame["ts"] <= now + MICRO_PUSH_MAX_SKEW_SECONDS)
+        & (frame["ts"] >= now - STALE_DATA_THRESHOLD_SECONDS)
+        & (np.isnan(pm25) | (np.isfinite(pm25) & (pm25 >= 0)))
+        & (np.isnan(wind) | (np.isfinite(wind) & (wind >= 0)))
+        & ((frame["wind_dir"] <= 360) | (frame["wind_dir"] == _NO_WIND_DIR))
+    )
+    rejected = n - int(ok.sum())
+    errors = [f"record {i}: value out of range or stale/future ts" for i in np.flatnonzero(~ok)[:5]]
+
+    good = frame[ok]
+    readings = [
+        (node_name(i), ts, a, _opt(pm), _opt(ws), None if wd == _NO_WIND_DIR else wd)
+        for i, ts, a, pm, ws, wd in zip(
+            good["id"].tolist(), good["ts"].tolist(), good["aqi"].tolist(),
+            good["pm25"].tolist(), good["wind_speed"].tolist(), good["wind_dir"].tolist(),
+        )
+    ]
+    return readings, rejected, errors
+
+
+def validate_reading(obj, now):
+    """One JSON reading -> reading tuple. Raises ValueError with the reason."""
+    if not isinstance(obj, dict):
+        raise ValueError("not an object")
+    if "node" in obj:
+        name = obj["node"]
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError("empty node")
+    elif isinstance(obj.get("id"), int) and obj["id"] >= 0:
+        name = node_name(obj["id"])
+    else:
+        raise ValueError("missing node/id")
+
+    aqi = obj.get("aqi")
+    if isinstance(aqi, bool) or not isinstance(aqi, (int, float)) or not 0 <= aqi <= 500:
+        raise ValueError("aqi out of range")
+    ts = obj.get("ts")
+    if not _finite(ts):
+        raise ValueError("missing ts")
+    if ts > now + MICRO_PUSH_MAX_SKEW_SECONDS or ts < now - STALE_DATA_THRESHOLD_SECONDS:
+        raise ValueError("ts too far from now")
+
+    # optional fields: null / absent, or a finite number in range
+    pm25 = obj.get("pm25")
+    if pm25 is not None and not (_finite(pm25) and pm25 >= 0):
+        raise ValueError("pm25 not a non-negative number")
+    wind_speed = obj.get("wind_speed")
+    if wind_speed is not None and not (_finite(wind_speed) and wind_speed >= 0):
+        raise ValueError("wind_speed not a non-negative number")
+    wind_dir = obj.get("wind_direction")
+    if wind_dir is not None and not (_finite(wind_dir) and 0 <= wind_dir <= 360):
+        raise ValueError("wind_direction out of range")
+    return (
+        name, float(ts), int(aqi),
+        None if pm25 is None else float(pm25),
+        None if wind_speed is None else float(wind_speed),
+        wind_dir,
+    )
+
+
+def parse_json_lines(body, now):
+    """NDJSON body -> (readings, rejected count, errors)."""
+    readings, errors, rejected = [], [], 0
+    for lineno, line in enumerate(body.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            readings.append(validate_reading(json.loads(line), now))
+        except ValueError as e:  # JSONDecodeError is a ValueError
+            rejected += 1
+            if len(errors) < 5:
+                errors.append(f"line {lineno}: {e}")
+    return readings, rejected, errors
+
+
+class PushIngest:
+    """
+    Bounded hand-off between the HTTP handlers and the Pathway connector.
+    Handlers submit() validated batches; the connector drain()s them as
+    micro-batches. While Pathway lags, next() blocks (max_backlog_size),
+    the drain stalls, the queue fills and submit() refuses with 503.
+    """
+
+    def __init__(self, capacity=MICRO_PUSH_QUEUE_RECORDS):
+        self.capacity = capacity
+        self._batches = deque()
+        self._queued = 0
+        self._cond = threading.Condition()
+        self.stats = {
+            "requests": 0,
+            "accepted": 0,
+            "rejected": 0,
+            "throttled": 0,
+            "handed": 0,
+            "dropped": 0,  # validated but failed to convert in the connector
+            "batches": 0,
+            "handoff_seconds": 0.0,
+        }
+
+    def submit(self, readings, rejected=0):
+        """Queue readings arriving now. False (nothing queued) when full."""
+        with self._cond:
+            self.stats["requests"] += 1
+            self.stats["rejected"] += rejected
+            if readings and self._queued + len(readings) > self.capacity:
+                self.stats["throttled"] += 1
+                return False
+            if readings:
+                self._batches.append((datetime.now(timezone.utc), readings))
+                self._queued += len(readings)
+                self.stats["accepted"] += len(readings)
+                self._cond.notify()
+            return True
+
+    def drain(self, max_records=MICRO_PUSH_BATCH_RECORDS, linger=MICRO_PUSH_LINGER_MS / 1000,
+              timeout=None):
+        """
+        Block until readings are queued (or `timeout` passes: returns []),
+        then linger up to `linger` seconds to collect up to `max_records`.
+        Returns [(arrival, readings), ...]. Submitted batches are never split.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._batches, timeout):
+                return []
+            deadline = time.monotonic() + linger
+            while self._queued < max_records:
+                left = deadline - time.monotonic()
+                if left <= 0 or not self._cond.wait(left):
+                    break
+            out, taken = [], 0
+            while self._batches and (not out or taken + len(self._batches[0][1]) <= max_records):
+                arrival, readings = self._batches.popleft()
+                out.append((arrival, readings))
+                taken += len(readings)
+            self._queued -= taken
+            return out
+
+    def queued(self):
+        with self._cond:
+            return self._queued
+
+    def handed(self, count, dropped, seconds):
+        """Connector side: one drained micro-batch went to Pathway."""
+        with self._cond:
+            self.stats["handed"] += count
+            self.stats["dropped"] += dropped
+            self.stats["batches"] += 1
+            self.stats["handoff_seconds"] += seconds
+
+    def snapshot(self):
+        with self._cond:
+            return {**self.stats, "queued": self._queued, "capacity": self.capacity}
+
+
+def push_record(arrival, reading):
+    """Reading tuple -> AQISchema record; refreshes the node's _debug_data."""
+    name, ts, aqi, pm25, wind_speed, wind_dir = reading
+    event_time = datetime.fromtimestamp(ts, tz=timezone.utc)
+    _debug_data.record(name).reset(
+        waqi_aqi=aqi,
+        waqi_timestamp=event_time.strftime("%Y-%m-%d %H:%M:%S"),
+        waqi_timestamp_iso=event_time.isoformat(),
+        station_name_api=name,
+        feed_id=name.rsplit("— ", 1)[-1],
+        raw_pm25=pm25,
+        pollutants_available=int(pm25 is not None),
+        dominant_pollutant="pm25" if pm25 is not None else "—",
+        wind_speed=wind_speed,
+        wind_direction=wind_dir,
+        api_time=arrival.strftime("%H:%M:%S"),
+        stale_seconds=(arrival - event_time).total_seconds(),
+    )
+    wind_speed, wind_dir, wind_source = wind_with_fallback(name, wind_speed, wind_dir)
+    return {
+        "timestamp": arrival, "event_time": event_time, "aqi": aqi, "city": name,
+        "wind_speed": wind_speed, "wind_direction": wind_dir, "wind_source": wind_source,
+        "pollutants": int(pm25 is not None),
+    }
+
+
+def run_push(ingest, emit, commit, stop=None):
+    """
+    Connector loop: drain micro-batches, emit every reading, commit per
+    batch. Runs forever, or until `stop` (an Event) is set and the queue
+    is empty.
+    """
+    while stop is None or not stop.is_set() or ingest.queued():
+        batches = ingest.drain(timeout=None if stop is None else 0.2)
+        if not batches:
+            continue
+        started = time.monotonic()
+        count = dropped = 0
+        for arrival, readings in batches:
+            for reading in readings:
+                # one reading that slipped past validation must not end ingestion
+                try:
+                    record = push_record(arrival, reading)
+                except (ValueError, TypeError, OverflowError, OSError) as e:
+                    dropped += 1
+                    print(f"[PUSH] dropped reading from {reading[0]!r}: {e}")
+                    continue
+                emit(record)
+                count += 1
+        commit()
+        # emit() blocks while Pathway's backlog is full, so a growing
+        # handoff time per reading means the engine is lagging
+        ingest.handed(count, dropped, time.monotonic() - started)
+
+
+class _PushHandler(BaseHTTPRequestHandler):
+    ingest = None  # set per server by serve_push
+
+    def do_POST(self):
+        if self.path.split("?")[0] != "/ingest":
+            return self._reply(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MICRO_PUSH_MAX_BODY_BYTES:
+            return self._reply(413 if length > 0 else 411, {"error": "bad Content-Length"})
+        body = self.rfile.read(length)
+
+        now = time.time()
+        ctype = (self.headers.get("Content-Type") or "").split(";")[0].strip()
+        try:
+            if ctype == "application/octet-stream":
+                readings, rejected, errors = decode_frame(body, now)
+            else:
+                readings, rejected, errors = parse_json_lines(body.decode("utf-8"), now)
+        except (ValueError, UnicodeDecodeError) as e:
+            return self._reply(400, {"error": str(e)})
+
+        if len(readings) > self.ingest.capacity:
+            return self._reply(413, {"error": f"more than {self.ingest.capacity} readings in one request"})
+        if not self.ingest.submit(readings, rejected):
+            return self._reply(
+                503, {"error": "ingest queue full", "queued": self.ingest.queued()},
+                {"Retry-After": "1"},
+            )
+        self._reply(200, {"accepted": len(readings), "rejected": rejected, "errors": errors})
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/stats":
+            return self._reply(404, {"error": "not found"})
+        self._reply(200, self.ingest.snapshot())
+
+    def _reply(self, code, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-Queue-Depth", str(self.ingest.queued()))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        pass  # one line per POST would drown the console
+
+
+def serve_push(ingest, host, port):
+    """Start the push endpoint in a daemon thread; returns the server."""
+    handler = type("PushHandler", (_PushHandler,), {"ingest": ingest})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[MICRO] push ingest on http://{host}:{server.server_address[1]}/ingest")
+    return server
@@ -0,0 +1,140 @@
+# poll_scheduler.py — adaptive per-station WAQI poll scheduling
+# Priority queue keyed by next-due time. Learns each feed's update period
+# from time.iso deltas and polls shortly after the next expected update.
+# Tightens near the escalation threshold, backs off on failing feeds.
+
+import heapq
+import itertools
+import time
+
+from config import (
+    AQI_POLL_INTERVAL, AQI_POLL_GRACE_SECONDS, AQI_POLL_MAX_INTERVAL,
+    AQI_POLL_MAX_BACKOFF, AQI_POLL_HOT_MARGIN, HIGH_AQI_THRESHOLD,
+)
+
+# update-period learning
+_PERIOD_ALPHA = 0.3
+_MIN_PERIOD = 60
+_MAX_PERIOD = 6 * 3600
+
+
+class PollScheduler:
+    """
+    Per-station poll schedule. Single-threaded: owned by the AQI connector.
+
+    - unknown cadence      -> poll every AQI_POLL_INTERVAL until learned
+    - learned cadence      -> poll at last update + period + grace
+    - update overdue       -> retry with growing delay (capped)
+    - near threshold / hot -> never wait longer than AQI_POLL_INTERVAL
+    - failures             -> exponential backoff up to AQI_POLL_MAX_BACKOFF
+    """
+
+    def __init__(self, stations=(), hot_fn=None):
+        self._heap = []
+        self._seq = itertools.count()
+        self._state = {}
+        self._hot_fn = hot_fn
+        for station in stations:
+            self.add(station)
+
+    def add(self, station, due=None):
+        if station in self._state:
+            return
+        self._state[station] = {
+            "due": 0.0,
+            "period": None,
+            "last_event": None,
+            "aqi": None,
+            "failures": 0,
+            "misses": 0,
+        }
+        self._push(station, time.monotonic() if due is None else due)
+
+    def pop_due(self, now=None):
+        """Remove and return every station whose poll is due."""
+        now = time.monotonic() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            at, _, station = heapq.heappop(self._heap)
+            rec = self._state.get(station)
+            if rec is None or rec["due"] != at:
+                continue  # superseded entry
+            rec["due"] = None
+            due.append(station)
+        return due
+
+    def seconds_until_due(self, now=None):
+        now = time.monotonic() if now is None else now
+        while self._heap:
+            at, _, station = self._heap[0]
+            if self._state.get(station, {}).get("due") == at:
+                return max(0.0, at - now)
+            heapq.heappop(self._heap)
+        return float(AQI_POLL_INTERVAL)
+
+    def observe(self, station, record, now=None):
+        """Feed a poll outcome back (record is None on failure) and reschedule."""
+        now = time.monotonic() if now is None else now
+        rec = self._state.get(station)
+        if rec is None:
+            return
+
+        if record is None:
+            rec["failures"] += 1
+            delay = min(AQI_POLL_INTERVAL * 2 ** rec["failures"], AQI_POLL_MAX_BACKOFF)
+            self._push(station, now + delay)
+            return
+
+        rec["failures"] = 0
+        rec["aqi"] = record["aqi"]
+        event = record["event_time"].timestamp()
+        last = rec["last_event"]
+
+        if last is None or event > last:
+            if last is not None:
+                delta = event - last
+                if _MIN_PERIOD <= delta <= _MAX_PERIOD:
+                    rec["period"] = delta if rec["period"] is None else (
+                        _PERIOD_ALPHA * delta + (1 - _PERIOD_ALPHA) * rec["period"]
+                    )
+            rec["last_event"] = event
+            rec["misses"] = 0
+        else:
+            rec["misses"] += 1
+
+        self._push(station, now + self._next_delay(station, rec))
+
+    def retry(self, station, now=None):
+        """Station overran its cycle budget: poll again next cycle, no backoff."""
+        now = time.monotonic() if now is None else now
+        if station in self._state:
+            self._push(station, now + AQI_POLL_INTERVAL)
+
+    def stats(self, station):
+        return dict(self._state.get(station, {}))
+
+    # ── internals ──
+
+    def _next_delay(self, station, rec):
+        if rec["period"] is None:
+            delay = AQI_POLL_INTERVAL
+        else:
+            # wall-clock seconds until the next expected upstream update
+            expected = rec["last_event"] + rec["period"] + AQI_POLL_GRACE_SECONDS
+            delay = expected - time.time()
+            if delay <= 0:
+                delay = AQI_POLL_INTERVAL * 2 ** min(rec["misses"], 5)
+            delay = max(AQI_POLL_INTERVAL, min(delay, AQI_POLL_MAX_INTERVAL))
+
+        if self._is_hot(station, rec):
+            delay = min(delay, AQI_POLL_INTERVAL)
+        return delay
+
+    def _is_hot(self, station, rec):
+        if rec["aqi"] is not None and rec["aqi"] >= HIGH_AQI_THRESHOLD - AQI_POLL_HOT_MARGIN:
+            return True
+        return bool(self._hot_fn and self._hot_fn(station))
+
+    def _push(self, station, at):
+        self._state[station]["due"] = at
+        heapq.heappush(self._heap, (at, next(self._seq), station))
@@ -0,0 +1,112 @@
+# replay.py — record-and-replay for raw upstream payloads
+# Recorder: appends raw WAQI / FIRMS payloads with arrival timestamps to a
+# compressed, append-only segment log (gzip JSON lines, rotated by count).
+# Reader: iterates segments in order, paced at real time, N× or flat out.
+
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+
+from config import RECORD_DIR, RECORD_SEGMENT_RECORDS
+
+_SEGMENT_GLOB = "segment-*.jsonl.gz"
+
+
+class SegmentRecorder:
+    """
+    Thread-safe append-only recorder. Each entry is one JSON line:
+    {"t": arrival_epoch, "src": source, "key": key, "payload": ...}.
+    Every write is sync-flushed, so a crash loses at most the entry in
+    flight; readers tolerate the truncated tail.
+    """
+
+    def __init__(self, directory, max_records=RECORD_SEGMENT_RECORDS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_records = max_records
+        self._lock = threading.Lock()
+        self._fp = None
+        self._count = 0
+        self._seq = 0
+
+    def record(self, source, key, payload, arrival=None):
+        line = json.dumps({
+            "t": time.time() if arrival is None else arrival,
+            "src": source,
+            "key": key,
+            "payload": payload,
+        }, separators=(",", ":"))
+        with self._lock:
+            if self._fp is None or self._count >= self.max_records:
+                self._rotate()
+            self._fp.write(line.encode("utf-8") + b"\n")
+            self._fp.flush(zlib.Z_SYNC_FLUSH)
+            self._count += 1
+
+    def close(self):
+        with self._lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+
+    def _rotate(self):
+        if self._fp is not None:
+            self._fp.close()
+        self._seq += 1
+        name = f"segment-{int(time.time() * 1000):013d}-{self._seq:04d}.jsonl.gz"
+        self._fp = gzip.open(os.path.join(self.directory, name), "ab")
+        self._count = 0
+
+
+def iter_segments(directory, sources=None):
+    """Yield recorded entries in arrival order across all segments."""
+    for path in sorted(glob.glob(os.path.join(directory, _SEGMENT_GLOB))):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as fp:
+                for line in fp:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # truncated tail of an interrupted segment
+                    if sources is None or entry["src"] in sources:
+                        yield entry
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            continue  # segment ended mid-write; entries before it were yielded
+
+
+def paced(entries, speed=1.0):
+    """
+    Re-time entries by their recorded arrival: speed=1 is real time,
+    speed=N is N× faster, speed<=0 replays as fast as possible.
+    """
+    t0 = wall0 = None
+    for entry in entries:
+        if speed > 0:
+            if t0 is None:
+                t0, wall0 = entry["t"], time.monotonic()
+            wait = wall0 + (entry["t"] - t0) / speed - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+        yield entry
+
+
+# ── Process-wide recorder (enabled by AREE_RECORD_DIR) ──
+_recorder = SegmentRecorder(RECORD_DIR) if RECORD_DIR else None
+
+
+def recording():
+    """True when payloads are being recorded (streaming readers keep the raw body)."""
+    return _recorder is not None
+
+
+def record_payload(source, key, payload):
+    """Append a raw payload to the segment log if recording is enabled."""
+    if _recorder is not None:
+        try:
+            _recorder.record(source, key, payload)
+        except Exception as e:
+            print(f"[REPLAY] record err {source}/{key}: {e}")
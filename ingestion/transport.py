@@ -0,0 +1,285 @@
+# transport.py — shared HTTP transport for every ingestion path
+# One keep-alive connection pool per upstream host, gzip, a per-host
+# token-bucket rate limiter and circuit breaker, and per-host counters.
+
+import threading
+import time
+import zlib
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import stream_decode_response_unicode
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+from urllib3.util.retry import Retry
+
+from config import HTTP_HOSTS, HTTP_HOST_DEFAULTS
+
+USER_AGENT = "UrbanLive-AI/2.1"
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling a host whose circuit is open."""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens/sec, at most `burst` stored."""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures.
+    open -> half-open once `reset_after` seconds pass; one probe is let
+    through, success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, threshold, reset_after):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = "closed"
+        self.failures = 0
+        self.opens = 0
+        self.open_seconds = 0.0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_after:
+                    return False
+                self.state = "half-open"
+                return True
+            if self.state == "half-open":
+                return False  # probe already in flight
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._close()
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.opens += 1
+                self._close()
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def current_open_seconds(self):
+        with self._lock:
+            extra = time.monotonic() - self._opened_at if self._opened_at else 0.0
+            return self.open_seconds + extra
+
+    def _close(self):
+        if self._opened_at is not None:
+            self.open_seconds += time.monotonic() - self._opened_at
+            self._opened_at = None
+        self.state = "closed"
+
+
+class _Host:
+    def __init__(self, host):
+        cfg = {**HTTP_HOST_DEFAULTS, **HTTP_HOSTS.get(host, {})}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            max_retries=Retry(
+                total=cfg["retries"], backoff_factor=cfg["backoff"],
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET"], raise_on_status=False,
+            ),
+            pool_connections=1, pool_maxsize=cfg["pool"],
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept-Encoding": "gzip, deflate",
+        })
+        self.bucket = TokenBucket(cfg["rate"], cfg["burst"])
+        self.breaker = CircuitBreaker(cfg["breaker_failures"], cfg["breaker_reset"])
+        self.lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "responses": 0,
+            "failures": 0,
+            "rejected_open": 0,
+            "bytes": 0,        # decoded body bytes
+            "wire_bytes": 0,   # body bytes as received (before gzip decoding)
+            "completed": 0,    # bodies fully read (or closed); latency runs to their last byte
+            "latency_total": 0.0,
+            "latency_max": 0.0,
+            "latency_last": None,
+            "rate_wait_total": 0.0,
+        }
+
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+def _host_for(url):
+    parts = urlparse(url)
+    with _hosts_lock:
+        if parts.netloc not in _hosts:
+            _hosts[parts.netloc] = _Host(parts.hostname or "")
+        return _hosts[parts.netloc]
+
+
+def get(url, timeout, **kwargs):
+    """
+    GET through the shared per-host pool. Raises CircuitOpenError while
+    the host's circuit is open; 5xx/429 and transport errors count as
+    failures towards opening it.
+    """
+    host = _host_for(url)
+    if not host.breaker.allow():
+        with host.lock:
+            host.stats["rejected_open"] += 1
+        raise CircuitOpenError(f"circuit open for {urlparse(url).netloc}")
+
+    stream = kwargs.pop("stream", False)
+    waited = host.bucket.acquire()
+    started = time.monotonic()
+    try:
+        # always streamed underneath, so the body can be metered as it is read
+        resp = host.session.get(url, timeout=timeout, stream=True, **kwargs)
+    except Exception:
+        host.breaker.record_failure()
+        with host.lock:
+            host.stats["requests"] += 1
+            host.stats["failures"] += 1
+            host.stats["rate_wait_total"] += waited
+        raise
+
+    failed = resp.status_code == 429 or resp.status_code >= 500
+    if failed:
+        host.breaker.record_failure()
+    else:
+        host.breaker.record_success()
+
+    with host.lock:
+        st = host.stats
+        st["requests"] += 1
+        st["responses"] += 1
+        st["failures"] += int(failed)
+        st["rate_wait_total"] += waited
+    _meter_body(host, resp, started)
+    if not stream:
+        resp.content  # read now, as requests would have
+        resp.close()
+    return resp
+
+
+def _record_body(host, size, wire, elapsed):
+    with host.lock:
+        st = host.stats
+        st["bytes"] += size
+        st["wire_bytes"] += wire
+        st["completed"] += 1
+        st["latency_total"] += elapsed
+        st["latency_max"] = max(st["latency_max"], elapsed)
+        st["latency_last"] = round(elapsed, 3)
+
+
+def _decoder(encoding):
+    """zlib decompressor for the Content-Encodings we ask for, None for identity."""
+    encoding = (encoding or "").strip().lower()
+    if encoding == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return zlib.decompressobj()
+    return None
+
+
+def _meter_body(host, resp, started):
+    """
+    Count the body as it is consumed. iter_content (which .content and
+    .text use too) reads the undecoded stream, so wire bytes are exact
+    for chunked and gzip bodies without a Content-Length, and decodes it
+    here. Bytes and latency through the last byte are recorded once,
+    when the body ends or the response is closed.
+    """
+    inner_close = resp.close
+    body = {"size": 0, "wire": 0, "done": False}
+
+    def finish():
+        if not body["done"]:
+            body["done"] = True
+            _record_body(host, body["size"], body["wire"], time.monotonic() - started)
+
+    def chunks(chunk_size):
+        decoder = _decoder(resp.headers.get("Content-Encoding"))
+        try:
+            for raw in resp.raw.stream(chunk_size, decode_content=False):
+                body["wire"] += len(raw)
+                data = decoder.decompress(raw) if decoder else raw
+                if data:
+                    body["size"] += len(data)
+                    yield data
+            tail = decoder.flush() if decoder else b""
+            if tail:
+                body["size"] += len(tail)
+                yield tail
+        except ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        except ReadTimeoutError as e:
+            raise requests.exceptions.ConnectionError(e)
+        except zlib.error as e:
+            raise requests.exceptions.ContentDecodingError(e)
+        finally:
+            resp._content_consumed = True
+            finish()
+
+    def iter_content(chunk_size=1, decode_unicode=False):
+        out = chunks(chunk_size)
+        return stream_decode_response_unicode(out, resp) if decode_unicode else out
+
+    def close():
+        finish()
+        inner_close()
+
+    resp.iter_content = iter_content
+    resp.close = close
+
+
+def host_stats():
+    """Snapshot of per-host counters (latency, bytes, circuit state)."""
+    with _hosts_lock:
+        hosts = dict(_hosts)
+    out = {}
+    for name, host in hosts.items():
+        with host.lock:
+            st = dict(host.stats)
+        n = st["completed"]
+        st["latency_avg"] = round(st["latency_total"] / n, 3) if n else None
+        st["circuit"] = host.breaker.state
+        st["circuit_opens"] = host.breaker.opens
+        st["open_seconds"] = round(host.breaker.current_open_seconds(), 1)
+        out[name] = st
+    return out
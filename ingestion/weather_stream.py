@@ -0,0 +1,187 @@
+# weather_stream.py — gridded wind field from station reports
+# Every station whose WAQI payload carries w / wd contributes its wind
+# vector to a regular lat/lon grid by inverse-distance weighting. The
+# grid keeps weighted sums, so one report only touches the cells within
+# WIND_IDW_RADIUS_KM of it; lookups are a single cell read.
+
+import math
+import threading
+import time
+
+import numpy as np
+
+from config import (
+    WIND_GRID_BOUNDS, WIND_GRID_RESOLUTION, WIND_IDW_POWER,
+    WIND_IDW_RADIUS_KM, WIND_MAX_AGE_SECONDS,
+)
+
+_KM_PER_DEG = 111.32
+_MIN_DIST_KM = 1.0  # keeps the weight finite at the station's own cell
+_MIN_WEIGHT = 1e-9  # below any real weight at WIND_IDW_RADIUS_KM; float residue
+
+
+class WindField:
+    """
+    IDW-interpolated wind on a regular grid.
+
+    Wind is stored as (u, v) components of the direction it blows FROM,
+    so averaging 350° and 10° gives 0°, not 180°. Each cell holds
+    sum(w*u), sum(w*v), sum(w*speed), sum(w); a report replaces the
+    station's previous contribution inside its radius patch only.
+    """
+
+    def __init__(self, bounds=WIND_GRID_BOUNDS, resolution=WIND_GRID_RESOLUTION,
+                 power=WIND_IDW_POWER, radius_km=WIND_IDW_RADIUS_KM,
+                 max_age=WIND_MAX_AGE_SECONDS):
+        lat1, lon1, lat2, lon2 = bounds
+        self.lat0, self.lon0 = min(lat1, lat2), min(lon1, lon2)
+        self.res = resolution
+        self.rows = int(math.ceil((max(lat1, lat2) - self.lat0) / resolution)) + 1
+        self.cols = int(math.ceil((max(lon1, lon2) - self.lon0) / resolution)) + 1
+        self.power = power
+        self.radius_km = radius_km
+        self.max_age = max_age
+
+        # per-cell weighted sums (u, v, speed, weight), cell-major for fast reads
+        self._sums = np.zeros((self.rows, self.cols, 4))
+        self._lat = self.lat0 + np.arange(self.rows) * resolution
+        self._lon = self.lon0 + np.arange(self.cols) * resolution
+
+        self._reports = {}   # station -> (lat, lon, r0, r1, c0, c1, weights, contribution, ts)
+        self._cells = {}     # station -> (row, col) for O(1) lookup
+        self._lock = threading.Lock()
+        self._last_prune = None  # event time of the last prune; reports may be replayed
+        self.updates = 0
+
+    # ── lookups ──
+
+    def _cell(self, lat, lon):
+        r = int(round((lat - self.lat0) / self.res))
+        c = int(round((lon - self.lon0) / self.res))
+        if 0 <= r < self.rows and 0 <= c < self.cols:
+            return r, c
+        return None
+
+    def _read(self, r, c):
+        su, sv, ss, sw = self._sums[r, c].tolist()
+        if sw <= _MIN_WEIGHT:
+            return None, None
+        direction = (math.degrees(math.atan2(su, sv)) + 360) % 360
+        return round(ss / sw, 1), round(direction)
+
+    def wind_at(self, lat, lon):
+        """(speed m/s, direction deg) at a coordinate, or (None, None) if uncovered."""
+        cell = self._cell(lat, lon)
+        return self._read(*cell) if cell else (None, None)
+
+    def wind_for(self, station):
+        """Interpolated wind at a located station, or (None, None)."""
+        cell = self._cells.get(station)
+        return self._read(*cell) if cell else (None, None)
+
+    # ── updates ──
+
+    def locate(self, station, lat, lon):
+        """Remember a station's cell so wind_for() works for it."""
+        cell = self._cell(lat, lon)
+        if cell:
+            self._cells[station] = cell
+
+    def report(self, station, lat, lon, speed, direction, ts=None):
+        """Fold one station's wind report into the grid (replacing its last one)."""
+        self.locate(station, lat, lon)
+        if speed is None or direction is None:
+            return
+        ts = time.time() if ts is None else ts
+        rad = math.radians(float(direction))
+        values = np.array([math.sin(rad), math.cos(rad), float(speed), 1.0])
+
+        with self._lock:
+            old = self._reports.get(station)
+            if old and old[-1] > ts:
+                return  # out-of-order report
+            if old and old[:2] == (lat, lon):
+                patch_key = old[2:7]       # same site: reuse the weights
+                self._subtract(old)
+            else:
+                if old:
+                    self._subtract(old)
+                patch_key = self._patch(lat, lon)
+            r0, r1, c0, c1, weights = patch_key
+            contribution = weights[:, :, None] * values
+            self._sums[r0:r1, c0:c1] += contribution
+            self._reports[station] = (lat, lon, r0, r1, c0, c1, weights, contribution, ts)
+            self.updates += 1
+            if self._last_prune is None or ts - self._last_prune > 60:
+                self._prune(ts)
+
+    def stats(self):
+        with self._lock:
+            covered = int((self._sums[:, :, 3] > _MIN_WEIGHT).sum())
+            return {
+                "stations_reporting": len(self._reports),
+                "stations_located": len(self._cells),
+                "cells": self.rows * self.cols,
+                "cells_covered": covered,
+                "updates": self.updates,
+            }
+
+    # ── internals (callers hold _lock) ──
+
+    def _span(self, centre, origin, size, half_deg):
+        lo = max(0, int(math.floor((centre - half_deg - origin) / self.res)))
+        hi = min(size, int(math.ceil((centre + half_deg - origin) / self.res)) + 1)
+        return lo, max(lo, hi)
+
+    def _patch(self, lat, lon):
+        """Grid slice within radius of (lat, lon) and its IDW weights (vectorized)."""
+        coslat = max(math.cos(math.radians(lat)), 0.05)
+        r0, r1 = self._span(lat, self.lat0, self.rows, self.radius_km / _KM_PER_DEG)
+        c0, c1 = self._span(lon, self.lon0, self.cols, self.radius_km / (_KM_PER_DEG * coslat))
+        # equirectangular distance is plenty at a few hundred km
+        dy = (self._lat[r0:r1] - lat)[:, None] * _KM_PER_DEG
+        dx = (self._lon[c0:c1] - lon)[None, :] * _KM_PER_DEG * coslat
+        dist = np.maximum(np.hypot(dy, dx), _MIN_DIST_KM)
+        weights = np.where(dist <= self.radius_km, dist ** -self.power, 0.0)
+        return r0, r1, c0, c1, weights
+
+    def _subtract(self, report):
+        r0, r1, c0, c1, _, contribution, _ = report[2:]
+        self._sums[r0:r1, c0:c1] -= contribution
+
+    def _prune(self, now):
+        self._last_prune = now
+        for station, report in list(self._reports.items()):
+            if now - report[-1] > self.max_age:
+                self._subtract(report)
+                del self._reports[station]
+
+
+# ── Process-wide field (fed by the WAQI parsers) ──
+wind_field = WindField()
+
+
+def report_wind(station, lat, lon, speed, direction, ts=None):
+    try:
+        wind_field.report(station, lat, lon, speed, direction, ts)
+    except (TypeError, ValueError) as e:
+        print(f"[WIND] {station} bad report: {e}")
+
+
+def locate_station(station, lat, lon):
+    wind_field.locate(station, lat, lon)
+
+
+def wind_for(station):
+    return wind_field.wind_for(station)
+
+
+def wind_with_fallback(station, speed, direction):
+    """(speed, direction, source): the station's own wind, else the grid's ("grid"), else "none"."""
+    source = "station"
+    if speed is None or direction is None:
+        speed, direction = wind_field.wind_for(station)
+        source = "grid"
+    if speed is None or direction is None:
+        return None, None, "none"
+    return float(speed), float(direction), source
@@ -0,0 +1,88 @@
+# enrichment_queue.py — background RAG / LLM enrichment, latest wins per station
+# The Observer publishes the deterministic state at once and submits a
+# (station, version, job) here. Only the newest pending job per station
+# is kept: a job superseded before a worker picks it up is dropped, so a
+# slow Gemini call never builds a backlog. Each station has at most one
+# job in flight, so results land in version order; at most `concurrency`
+# stations are enriched at once.
+
+import threading
+import time
+from collections import OrderedDict
+
+from config import ENRICHMENT_CONCURRENCY
+
+
+class EnrichmentQueue:
+    """work(station, version, job) runs on a worker thread for the newest job per station."""
+
+    def __init__(self, work, concurrency=ENRICHMENT_CONCURRENCY):
+        self._work = work
+        self._pending = OrderedDict()  # station -> (version, job, submitted), oldest first
+        self._running = set()
+        self._cond = threading.Condition()
+        self.stats = {
+            "submitted": 0,
+            "coalesced": 0,   # replaced a pending job for the same station
+            "completed": 0,
+            "failed": 0,
+            "wait_seconds": 0.0,
+            "work_seconds": 0.0,
+        }
+        self._workers = [
+            threading.Thread(target=self._run, daemon=True, name=f"enrich-{i}")
+            for i in range(concurrency)
+        ]
+        for t in self._workers:
+            t.start()
+
+    def submit(self, station, version, job):
+        """Queue job for station, replacing any job of its that has not started."""
+        with self._cond:
+            self.stats["submitted"] += 1
+            if station in self._pending:
+                self.stats["coalesced"] += 1
+                # keep the station's place in line; a busy station cannot starve the rest
+                self._pending[station] = (version, job, self._pending[station][2])
+            else:
+                self._pending[station] = (version, job, time.monotonic())
+            self._cond.notify()
+
+    def _next(self):
+        """Oldest pending station with nothing in flight, or None."""
+        for station in self._pending:
+            if station not in self._running:
+                return station
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._next() is not None)
+                station = self._next()
+                version, job, submitted = self._pending.pop(station)
+                self._running.add(station)
+            started = time.monotonic()
+            ok = True
+            try:
+                self._work(station, version, job)
+            except Exception as e:
+                ok = False
+                print(f"[ENRICH] {station} v{version} error: {e}")
+            with self._cond:
+                self._running.discard(station)
+                self.stats["completed" if ok else "failed"] += 1
+                self.stats["wait_seconds"] += started - submitted
+                self.stats["work_seconds"] += time.monotonic() - started
+                self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            done = self.stats["completed"] + self.stats["failed"]
+            return {
+                **self.stats,
+                "pending": len(self._pending),
+                "running": len(self._running),
+                "avg_wait_s": round(self.stats["wait_seconds"] / done, 3) if done else None,
+                "avg_work_s": round(self.stats["work_seconds"] / done, 3) if done else None,
+            }
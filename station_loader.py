@@ -1,14 +1,17 @@
 # Dynamic pan-india station loader
 # Fetches stations from WAQI search API, caches for 1 hour
 
-import requests
 import time
-from config import WAQI_TOKEN
+from config import WAQI_TOKEN, WAQI_API_ROOT
+from ingestion import transport
 
 _cache = None
 _cache_ts = 0
 CACHE_TTL = 3600
 
+# stations discovered at runtime (e.g. bulk map-bounds ingestion)
+_registry = {}
+
 
 def load_stations_from_waqi(keyword="india", limit=30):
     global _cache, _cache_ts
@@ -20,8 +23,8 @@ def load_stations_from_waqi(keyword="india", limit=30):
         return {}
 
     try:
-        url = f"https://api.waqi.info/search/?token={WAQI_TOKEN}&keyword={keyword}"
-        resp = requests.get(url, timeout=15)
+        url = f"{WAQI_API_ROOT}/search/?token={WAQI_TOKEN}&keyword={keyword}"
+        resp = transport.get(url, timeout=15)
         data = resp.json()
 
         if data.get("status") != "ok":
@@ -68,11 +71,17 @@ def load_stations_from_waqi(keyword="india", limit=30):
         return {}
 
 
+def register_stations(stations):
+    """Add runtime-discovered stations so get_all_stations() includes them."""
+    _registry.update(stations)
+
+
 def get_all_stations(hardcoded, limit=30):
     dynamic = load_stations_from_waqi(limit=limit)
     merged = dict(hardcoded)
     existing_feeds = {v["feed_id"] for v in merged.values()}
-    for name, info in dynamic.items():
+    for name, info in list(dynamic.items()) + list(_registry.items()):
         if info["feed_id"] not in existing_feeds:
             merged[name] = info
+            existing_feeds.add(info["feed_id"])
     return merged
@@ -0,0 +1,338 @@
+# fire_transport.py — FIRMS detections as Pathway tables, scored in the dataflow
+# Detections and station sites are bucketed into the same 2*delta grid
+# as assign_fires, joined on cell and filtered to each station's ±delta
+# box. Each station's fire coordinates are reduced to tuples and aligned
+# against its latest wind in one NumPy call (station_transport), so a
+# new fire batch or a wind change only re-scores the stations it touches.
+# Results are memoized on (site, fire-set version, wind bucket), so a
+# wind flapping between a few readings is a dict lookup. The per-station result is
+# attached to AQI windows with an as-of-now join: a window takes the
+# transport state current when it is computed, and later fire batches
+# do not re-emit windows that were already observed.
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pathway as pw
+
+from config import (
+    FIRMS_BBOX_DELTA, WIND_SPEED_MIN,
+    TRANSPORT_CACHE_SIZE, TRANSPORT_WIND_DIR_STEP, TRANSPORT_WIND_SPEED_STEP,
+)
+from ingestion.detection_store import CONFIDENCE_CODES
+from ingestion.firms_stream import compute_wind_alignment, transport_result, wind_alignment_array
+
+_CELL = 2 * FIRMS_BBOX_DELTA
+_ROW_STRIDE = 1_000_003  # same cell ids as assign_fires
+
+# alignments are summed as integer nano-units, so the total does not
+# depend on summation order or on which path aligned the fires
+_UNITS = 10**9
+_VECTOR_MIN_FIRES = 64  # below this the scalar loop beats the array setup
+
+
+class FireDetectionSchema(pw.Schema):
+    lat: float = pw.column_definition(primary_key=True)
+    lon: float = pw.column_definition(primary_key=True)
+    acquired: int = pw.column_definition(primary_key=True)
+    frp: float
+    confidence: int
+    cell: int
+    seen: float  # epoch the pipeline first received it (re-score latency)
+    fingerprint: int  # summed per station into its fire-set version
+
+
+class FireSiteSchema(pw.Schema):
+    station: str = pw.column_definition(primary_key=True)
+    cell: int = pw.column_definition(primary_key=True)
+    lat: float
+    lon: float
+
+
+def _cell_id(row, col):
+    return row * _ROW_STRIDE + col
+
+
+def fire_cell(lat, lon):
+    return _cell_id(math.floor(lat / _CELL), math.floor(lon / _CELL))
+
+
+def site_cells(lat, lon, delta=FIRMS_BBOX_DELTA):
+    """Cells a station's ±delta box touches (at most 4)."""
+    return [
+        _cell_id(r, c)
+        for r in range(math.floor((lat - delta) / _CELL), math.floor((lat + delta) / _CELL) + 1)
+        for c in range(math.floor((lon - delta) / _CELL), math.floor((lon + delta) / _CELL) + 1)
+    ]
+
+
+def _alignment_units(fire_lat, fire_lon, station_lat, station_lon, wind_dir):
+    return round(compute_wind_alignment(fire_lat, fire_lon, station_lat, station_lon, wind_dir) * _UNITS)
+
+
+def station_alignment(fire_lat, fire_lon, station_lat, station_lon, wind_dir):
+    """(aligned count, total alignment units) of one station's fires, in one NumPy call."""
+    if len(fire_lat) < _VECTOR_MIN_FIRES:
+        units = [
+            _alignment_units(lat, lon, station_lat, station_lon, wind_dir)
+            for lat, lon in zip(fire_lat, fire_lon)
+        ]
+        return sum(1 for u in units if u > 0), sum(units)
+    alignment = wind_alignment_array(
+        np.array(fire_lat, dtype=float), np.array(fire_lon, dtype=float),
+        station_lat, station_lon, np.nan if wind_dir is None else wind_dir,
+    )
+    # np.rint rounds half to even, like round() in _alignment_units
+    units = np.rint(alignment * _UNITS).astype(np.int64)
+    return int((units > 0).sum()), int(units.sum())
+
+
+def fire_fingerprint(lat, lon, acquired):
+    """32-bit digest of one detection; their per-station sum versions the fire set."""
+    return hash((lat, lon, acquired)) & 0xFFFFFFFF
+
+
+# ── Transport memo: bounded LRU over (site, fire-set version, wind buckets) ──
+_transport_cache = OrderedDict()
+_transport_lock = threading.Lock()
+_transport_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _quantize(wind_dir, wind_speed):
+    """Wind -> (key buckets, bucket values the score is computed on)."""
+    d = None if wind_dir is None else round(wind_dir / TRANSPORT_WIND_DIR_STEP) % round(360 / TRANSPORT_WIND_DIR_STEP)
+    v = round(wind_speed / TRANSPORT_WIND_SPEED_STEP)
+    return (d, v), (None if d is None else d * TRANSPORT_WIND_DIR_STEP, round(v * TRANSPORT_WIND_SPEED_STEP, 3))
+
+
+def _memo_get(key):
+    with _transport_lock:
+        result = _transport_cache.get(key)
+        if result is None:
+            _transport_stats["misses"] += 1
+            return None
+        _transport_cache.move_to_end(key)
+        _transport_stats["hits"] += 1
+        return result
+
+
+def _memo_put(key, result):
+    with _transport_lock:
+        _transport_cache[key] = result
+        _transport_cache.move_to_end(key)
+        while len(_transport_cache) > TRANSPORT_CACHE_SIZE:
+            _transport_cache.popitem(last=False)
+            _transport_stats["evictions"] += 1
+
+
+def transport_cache_stats():
+    with _transport_lock:
+        st = dict(_transport_stats, size=len(_transport_cache), capacity=TRANSPORT_CACHE_SIZE)
+    lookups = st["hits"] + st["misses"]
+    st["hit_rate"] = round(st["hits"] / lookups, 3) if lookups else None
+    return st
+
+
+def clear_transport_cache():
+    with _transport_lock:
+        _transport_cache.clear()
+
+
+def station_transport(fire_lat, fire_lon, station_lat, station_lon, wind_dir, wind_speed, fire_set=None):
+    """
+    (score, aligned, label) for one station's fire coordinates (None: no
+    fires) and wind. With fire_set (the summed fingerprints) the result
+    is memoized; stations on the same site with the same fires share it.
+    """
+    fire_count = len(fire_lat) if fire_lat else 0
+    if fire_count == 0 or wind_speed is None or wind_speed < WIND_SPEED_MIN:
+        return transport_result(fire_count, 0, 0.0, wind_speed)  # none / calm, no alignment needed
+
+    key = None
+    if fire_set is not None:
+        buckets, (wind_dir, wind_speed) = _quantize(wind_dir, wind_speed)
+        key = (station_lat, station_lon, fire_count, fire_set, buckets)
+        cached = _memo_get(key)
+        if cached is not None:
+            return cached
+    aligned, units = station_alignment(fire_lat, fire_lon, station_lat, station_lon, wind_dir)
+    result = transport_result(fire_count, aligned, units / _UNITS, wind_speed)
+    if key is not None:
+        _memo_put(key, result)
+    return result
+
+
+def detection_row(row, seen):
+    """FIRE_DTYPE row tuple -> FireDetectionSchema values."""
+    lat, lon, frp, acquired, confidence = row
+    return {
+        "lat": lat, "lon": lon, "acquired": acquired,
+        "frp": frp, "confidence": confidence, "cell": fire_cell(lat, lon), "seen": seen,
+        "fingerprint": fire_fingerprint(lat, lon, acquired),
+    }
+
+
+# ── Connectors (fed by the DetectionStore change feeds, until store.close()) ──
+
+class _RetractingSubject(pw.io.python.ConnectorSubject):
+    """
+    ConnectorSubject that can delete rows it inserted. Pathway 0.29 has no
+    public delete: rows are retracted through _remove_inner, and
+    _deletions_enabled is forced on because Pathway's own check only spots
+    direct DELETE puts in run(). Both private hooks are confined to this
+    class; revisit them when upgrading Pathway.
+    """
+
+    def retract(self, row):
+        self._remove_inner(None, row)
+
+    @property
+    def _deletions_enabled(self):
+        return True
+
+
+class FireDetectionConnector(_RetractingSubject):
+    """Live FIRMS detections: inserted once when first seen, deleted when evicted."""
+
+    def __init__(self, store):
+        super().__init__()
+        self._changes = store.watch()
+        self._seen = {}  # (lat, lon, acquired) -> seen, so deletes match the insert
+
+    def run(self):
+        for added, removed in iter(self._changes.get, None):
+            now = time.time()
+            for row in removed:
+                seen = self._seen.pop((row[0], row[1], row[3]), None)
+                if seen is not None:
+                    self.retract(detection_row(row, seen))
+            for row in added:
+                self._seen[(row[0], row[1], row[3])] = now
+                self.next(**detection_row(row, now))
+            self.commit()
+
+
+class FireSiteConnector(_RetractingSubject):
+    """One row per (station, grid cell) its FIRMS box touches; moves replace the old rows."""
+
+    def __init__(self, store):
+        super().__init__()
+        self._changes = store.watch_sites()
+        self._rows = {}  # station -> rows currently in the table
+
+    def run(self):
+        for station, lat, lon in iter(self._changes.get, None):
+            for row in self._rows.pop(station, ()):
+                self.retract(row)
+            rows = [
+                {"station": station, "cell": cell, "lat": lat, "lon": lon}
+                for cell in site_cells(lat, lon)
+            ]
+            for row in rows:
+                self.next(**row)
+            self._rows[station] = rows
+            if self._changes.empty():
+                self.commit()
+        self.commit()
+
+
+# ── Dataflow ──
+
+def station_fires(sites, detections, delta=FIRMS_BBOX_DELTA):
+    """Spatial join: (station, fire) pairs with the fire inside the station's ±delta box."""
+    return (
+        sites.join(detections, pw.left.cell == pw.right.cell)
+        .select(
+            station=pw.left.station,
+            station_lat=pw.left.lat,
+            station_lon=pw.left.lon,
+            fire_lat=pw.right.lat,
+            fire_lon=pw.right.lon,
+            confidence=pw.right.confidence,
+            acquired=pw.right.acquired,
+            seen=pw.right.seen,
+            fingerprint=pw.right.fingerprint,
+        )
+        .filter(
+            (abs(pw.this.fire_lat - pw.this.station_lat) <= delta)
+            & (abs(pw.this.fire_lon - pw.this.station_lon) <= delta)
+        )
+    )
+
+
+def station_winds(aqi_table):
+    """Latest (by reading timestamp) wind per station."""
+    latest = aqi_table.groupby(pw.this.city).reduce(
+        row=pw.reducers.argmax(pw.this.timestamp),
+    )
+    return aqi_table.ix(latest.row).select(
+        pw.this.city, pw.this.wind_speed, pw.this.wind_direction, pw.this.wind_source,
+    )
+
+
+def transport_table(pairs, winds):
+    """
+    Per-station transport from the fire pairs and the latest wind:
+    city, wind_*, fire_count, high_conf_fires, latest_acquired,
+    last_seen, transport_score, aligned_fires, transport_label.
+    Stations without fires score 0.
+    """
+    per_station = pairs.groupby(pw.this.station).reduce(
+        pw.this.station,
+        station_lat=pw.reducers.any(pw.this.station_lat),
+        station_lon=pw.reducers.any(pw.this.station_lon),
+        # tuple reducers keep one order across columns: lat[i] pairs with lon[i]
+        fire_lat=pw.reducers.tuple(pw.this.fire_lat),
+        fire_lon=pw.reducers.tuple(pw.this.fire_lon),
+        fire_count=pw.reducers.count(),
+        fire_set=pw.reducers.sum(pw.this.fingerprint),  # changes whenever a fire joins or leaves
+        high_conf_fires=pw.reducers.sum(
+            pw.if_else(pw.this.confidence == CONFIDENCE_CODES["high"], 1, 0)
+        ),
+        latest_acquired=pw.reducers.max(pw.this.acquired),
+        last_seen=pw.reducers.max(pw.this.seen),
+    )
+    scored = winds.join_left(per_station, pw.left.city == pw.right.station).select(
+        pw.left.city,
+        pw.left.wind_speed,
+        pw.left.wind_direction,
+        pw.left.wind_source,
+        fire_count=pw.coalesce(pw.right.fire_count, 0),
+        high_conf_fires=pw.coalesce(pw.right.high_conf_fires, 0),
+        latest_acquired=pw.right.latest_acquired,
+        last_seen=pw.right.last_seen,
+        result=pw.apply_with_type(
+            station_transport, tuple[int, int, str],
+            pw.right.fire_lat, pw.right.fire_lon, pw.right.station_lat, pw.right.station_lon,
+            pw.left.wind_direction, pw.left.wind_speed, pw.right.fire_set,
+        ),
+    )
+    return scored.select(
+        pw.this.city, pw.this.wind_speed, pw.this.wind_direction, pw.this.wind_source,
+        pw.this.fire_count, pw.this.high_conf_fires,
+        pw.this.latest_acquired, pw.this.last_seen,
+        transport_score=pw.this.result[0],
+        aligned_fires=pw.this.result[1],
+        transport_label=pw.this.result[2],
+    )
+
+
+def with_transport(windowed, transport):
+    """Attach each window's station transport as of the moment the window is computed."""
+    return windowed.asof_now_join(
+        transport, pw.left.city == pw.right.city, how=pw.JoinMode.LEFT,
+    ).select(
+        *pw.left,
+        wind_speed=pw.right.wind_speed,
+        wind_direction=pw.right.wind_direction,
+        wind_source=pw.right.wind_source,
+        fire_count=pw.right.fire_count,
+        high_conf_fires=pw.right.high_conf_fires,
+        last_seen=pw.right.last_seen,
+        transport_score=pw.right.transport_score,
+        aligned_fires=pw.right.aligned_fires,
+        transport_label=pw.right.transport_label,
+    )
@@ -0,0 +1,118 @@
+# forecaster.py — least-squares AQI forecast from exact integer sums
+# The forecast needs only n, Σy, Σy², Σxy over the window AQIs (x = 0..n-1,
+# oldest first). AQIs are ints, so the sums are exact, and slope,
+# projections, direction and the z-score check are decided on exact
+# integers; output matches risk_engine.compute_short_term_forecast.
+# forecast_history() sums a window's `history` in one pass: the dataflow
+# derives each window's history afresh, so there is no per-station state
+# to update. SlidingForecast keeps the sums in a fixed ring for a caller
+# that sees one window at a time: push() and evicting the oldest are O(1),
+# and removal cannot drift the way float running moments do.
+
+from config import WINDOW_HOP_MINUTES, HIGH_AQI_THRESHOLD, GRAP_STAGES, FORECAST_HISTORY_WINDOWS
+
+
+def _grap_for_aqi(a):
+    for lo, hi, stage, _ in GRAP_STAGES:
+        if lo <= a <= hi:
+            return stage
+    return "Stage IV (Severe+)" if a > 500 else "None"
+
+
+# projections are clamped to 0..500, so the stage is a table lookup
+_GRAP_BY_AQI = tuple(_grap_for_aqi(a) for a in range(501))
+
+
+def _projection(num, den, sy, sx, n, ahead):
+    """int(slope * (n + ahead) + intercept) clamped to 0..500, from exact sums."""
+    # slope = num / den, intercept = (sy - slope * sx) / n
+    p = num * n * (n + ahead) + sy * den - num * sx
+    if p <= 0:
+        return 0
+    return min(500, p // (n * den))
+
+
+class SlidingForecast:
+    """Trend, projections and anomaly flag over a station's last `depth` window AQIs."""
+
+    __slots__ = ("depth", "_ring", "_head", "n", "sy", "syy", "sxy")
+
+    def __init__(self, depth=FORECAST_HISTORY_WINDOWS):
+        self.depth = depth
+        self._ring = [0] * depth
+        self._head = 0  # slot of the oldest value
+        self.n = 0
+        self.sy = self.syy = self.sxy = 0
+
+    def push(self, aqi):
+        """Append the newest window's AQI, evicting the oldest once `depth` are held."""
+        if self.n == self.depth:
+            old = self._ring[self._head]
+            self._head = (self._head + 1) % self.depth
+            self.n -= 1
+            self.sy -= old
+            self.syy -= old * old
+            self.sxy -= self.sy  # every remaining x moves down by one (the evicted one had x = 0)
+        self._ring[(self._head + self.n) % self.depth] = aqi
+        self.sxy += self.n * aqi
+        self.sy += aqi
+        self.syy += aqi * aqi
+        self.n += 1
+
+    def forecast(self):
+        """Same dict as compute_short_term_forecast, or None under 3 windows."""
+        current = self._ring[(self._head + self.n - 1) % self.depth] if self.n else 0
+        return _forecast(self.n, self.sy, self.syy, self.sxy, current)
+
+
+def _forecast(n, sy, syy, sxy, current):
+    """Forecast dict from the sums over n windows (current: the newest AQI)."""
+    if n < 3:
+        return None
+    sx = n * (n - 1) // 2
+    den = n * ((n - 1) * n * (2 * n - 1) // 6) - sx * sx
+    num = n * sxy - sx * sy
+    slope = num / den
+
+    p5 = _projection(num, den, sy, sx, n, 5)
+    p30 = _projection(num, den, sy, sx, n, 30)
+
+    if num > 2 * den:
+        direction = "rising"
+    elif num < -2 * den:
+        direction = "falling"
+    else:
+        direction = "stable"
+
+    # x steps one window, i.e. WINDOW_HOP_MINUTES
+    escalation_eta = None
+    if num > 0 and current < HIGH_AQI_THRESHOLD:
+        escalation_eta = round((HIGH_AQI_THRESHOLD - current) / slope * WINDOW_HOP_MINUTES, 1)
+
+    # |current - mean| > 2 * std, scaled by n: (n*current - Σy)² > 4 * (nΣy² - (Σy)²)
+    spread = n * syy - sy * sy
+    anomaly = spread > 0 and (n * current - sy) ** 2 > 4 * spread
+
+    return {
+        "slope": round(slope, 2),
+        "direction": direction,
+        "projected_5min": p5,
+        "projected_30min": p30,
+        "predicted_grap": _GRAP_BY_AQI[p5],
+        "predicted_grap_30min": _GRAP_BY_AQI[p30],
+        "exposure_score_30min": int(p30 * 0.6),
+        "escalation_eta": escalation_eta,
+        "anomaly": anomaly,
+        "rate_per_min": round(slope / WINDOW_HOP_MINUTES, 2),
+        "data_points": n,
+    }
+
+
+def forecast_history(history):
+    """Forecast for an oldest-first AQI sequence (a window's `history`), in one pass."""
+    sy = syy = sxy = 0
+    for x, aqi in enumerate(history):
+        sy += aqi
+        syy += aqi * aqi
+        sxy += x * aqi
+    return _forecast(len(history), sy, syy, sxy, history[-1] if history else 0)
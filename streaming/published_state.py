@@ -0,0 +1,39 @@
+# published_state.py — latest_state: each station's published state, read by streamlit
+# The Observer replaces a station's state once per window; TransportObserver
+# and the enrichment worker patch it from other threads, so every
+# read-check-patch or replacement holds `lock`. Versions come from a
+# per-station counter kept outside the states: replacing one wholesale
+# (a DATA_INVALID window) cannot restart them, so an in-flight
+# enrichment job never looks newer than the states after it.
+
+import threading
+
+latest_state = {}
+lock = threading.Lock()
+_versions = {}  # station -> last published state_version
+
+
+def publish(city, build):
+    """
+    Replace city's state with build(previous_state) under the lock,
+    stamped with the next state_version. Returns that version.
+    """
+    with lock:
+        version = _versions[city] = _versions.get(city, 0) + 1
+        state = build(latest_state.get(city, {}))
+        state["state_version"] = version
+        latest_state[city] = state
+        return version
+
+
+def patch_enrichment(city, version, fields):
+    """
+    Apply an enrichment job's fields unless a job at least as new already
+    landed (latest wins). Returns whether the state was patched.
+    """
+    with lock:
+        state = latest_state.get(city)
+        if state is None or state.get("enriched_version", 0) >= version:
+            return False
+        state.update(fields, enriched_version=version)
+        return True
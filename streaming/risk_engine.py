@@ -0,0 +1,336 @@
+# risk_engine.py — deterministic per-window enrichment, as Pathway UDFs or in the Observer
+# Band, GRAP stage, persistence, forecast, vulnerable-population risk,
+# confidence and ERI are pure functions of a scored window's row (its
+# AQI history comes from state_machine.window_history). ENRICH_MODE picks
+# where they run: as dataflow stages spread over the Pathway workers, or
+# in the Observer (WindowAssessor) once per released window, which is
+# cheaper on a single worker. Both call assess_window / assess_risk.
+
+from collections import deque
+from datetime import timedelta
+
+import numpy as np
+import pathway as pw
+
+from config import (
+    WINDOW_HOP_MINUTES, FORECAST_HISTORY_WINDOWS, HIGH_AQI_THRESHOLD, CPCB_BANDS, GRAP_STAGES,
+    VULNERABILITY_MULTIPLIERS,
+)
+from streaming.forecaster import forecast_history
+from streaming.state_machine import persistence
+
+
+def cpcb_band(aqi):
+    if aqi is None:
+        return "Unknown"
+    for lo, hi, label in CPCB_BANDS:
+        if lo <= aqi <= hi:
+            return label
+    return "Severe"
+
+
+def get_grap_stage(aqi):
+    if aqi is None:
+        return "Unknown", "No data"
+    for lo, hi, stage, desc in GRAP_STAGES:
+        if lo <= aqi <= hi:
+            return stage, desc
+    return "Stage IV (Severe+)", "Emergency actions under GRAP Stage IV"
+
+
+def compute_short_term_forecast(history):
+    """
+    5-min and 30-min AQI projection via np.polyfit over history dicts.
+    The dataflow uses forecaster.SlidingForecast, which gives the same
+    dict from exact running sums; this stays as its reference.
+    """
+    if len(history) < 3:
+        return None
+
+    times = np.arange(len(history))
+    values = np.array([h["aqi"] for h in history])
+
+    slope, intercept = np.polyfit(times, values, 1)
+    projected_5min = max(0, min(500, int(slope * (len(history) + 5) + intercept)))
+    projected_30min = max(0, min(500, int(slope * (len(history) + 30) + intercept)))
+    current_aqi = values[-1]
+
+    if slope > 2:
+        direction = "rising"
+    elif slope < -2:
+        direction = "falling"
+    else:
+        direction = "stable"
+
+    # how long until we hit the threshold (one history point per window hop)
+    escalation_eta = None
+    if slope > 0 and current_aqi < HIGH_AQI_THRESHOLD:
+        windows_to_threshold = (HIGH_AQI_THRESHOLD - current_aqi) / slope
+        escalation_eta = round(float(windows_to_threshold) * WINDOW_HOP_MINUTES, 1)
+
+    # z-score anomaly check
+    mean_aqi = np.mean(values)
+    std_aqi = np.std(values)
+    anomaly = bool(std_aqi > 0 and abs(current_aqi - mean_aqi) > 2 * std_aqi)
+
+    def _grap_for_aqi(a):
+        for lo, hi, stage, _ in GRAP_STAGES:
+            if lo <= a <= hi:
+                return stage
+        return "Stage IV (Severe+)" if a > 500 else "None"
+
+    return {
+        "slope": round(float(slope), 2),
+        "direction": direction,
+        "projected_5min": projected_5min,
+        "projected_30min": projected_30min,
+        "predicted_grap": _grap_for_aqi(projected_5min),
+        "predicted_grap_30min": _grap_for_aqi(projected_30min),
+        "exposure_score_30min": int(projected_30min * 0.6),
+        "escalation_eta": escalation_eta,
+        "anomaly": anomaly,
+        "rate_per_min": round(float(slope) / WINDOW_HOP_MINUTES, 2),
+        "data_points": len(history),
+    }
+
+
+def compute_vulnerability(forecast):
+    """(vulnerable_risk, vulnerability_max) from the 30-min projection."""
+    vulnerable_risk = {}
+    vulnerability_max = "low"
+    if not forecast:
+        return vulnerable_risk, vulnerability_max
+
+    proj_30 = forecast["projected_30min"]
+    for group, multiplier in VULNERABILITY_MULTIPLIERS.items():
+        risk_score = int(proj_30 * multiplier)
+        if risk_score >= 300:
+            level = "severe"
+        elif risk_score >= 200:
+            level = "high"
+        elif risk_score >= 100:
+            level = "moderate"
+        else:
+            level = "low"
+        vulnerable_risk[group] = {
+            "score": risk_score, "level": level, "multiplier": multiplier,
+        }
+
+    risk_levels = [v["level"] for v in vulnerable_risk.values()]
+    if "severe" in risk_levels:
+        vulnerability_max = "severe"
+    elif "high" in risk_levels:
+        vulnerability_max = "high"
+    elif "moderate" in risk_levels:
+        vulnerability_max = "moderate"
+    return vulnerable_risk, vulnerability_max
+
+
+def preemptive_advisory(forecast, transport_score):
+    """Pre-emptive advisory triggers for a rising 30-min projection."""
+    if not forecast or forecast["direction"] != "rising":
+        return []
+    proj_30 = forecast["projected_30min"]
+    if proj_30 >= 200 and transport_score >= 40:
+        return [
+            "Advise suspension of outdoor school activities",
+            "Increase dust suppression enforcement",
+            "Public health SMS advisory recommended",
+            "Traffic enforcement readiness advised",
+        ]
+    if proj_30 >= 200:
+        return [
+            "Outdoor activity caution advisory recommended",
+            "Construction dust suppression measures advised",
+        ]
+    if proj_30 >= 150:
+        return [
+            "Sensitive groups should reduce outdoor exposure",
+        ]
+    return []
+
+
+def compute_confidence(api_time, pollutants_available, fire_count, wind_speed):
+    """Deterministic confidence score, min 50%."""
+    confidence_score = 50
+    if api_time:
+        confidence_score += 20
+    if pollutants_available >= 2:
+        confidence_score += 10
+    if fire_count > 0 and wind_speed is not None:
+        confidence_score += 20
+    return min(max(confidence_score, 50), 100)
+
+
+def compute_eri(aqi, forecast, consec, transport_score):
+    """Escalation Readiness Index (advisory only, does not affect GRAP)."""
+    eri_score = 0
+    eri_factors = []
+    if aqi >= 200:
+        eri_score += 40
+        eri_factors.append("AQI >= 200 (+40)")
+    if forecast and forecast.get("rate_per_min", 0) > 0.5:
+        eri_score += 20
+        eri_factors.append("Slope > 0.5 AQI/min (+20)")
+    if consec >= 1:
+        eri_score += 20
+        eri_factors.append("Persistence >= 1 window (+20)")
+    if transport_score > 50:
+        eri_score += 10
+        eri_factors.append("Transport score > 50 (+10)")
+    exp_score = forecast.get("exposure_score_30min", 0) if forecast else 0
+    if exp_score > 150:
+        eri_score += 10
+        eri_factors.append("Exposure score > 150 (+10)")
+    eri_score = min(100, max(0, eri_score))
+
+    if eri_score >= 76:
+        eri_category = "HIGH READINESS"
+    elif eri_score >= 51:
+        eri_category = "PRE-ESCALATION"
+    elif eri_score >= 26:
+        eri_category = "MONITOR"
+    else:
+        eri_category = "LOW READINESS"
+    return eri_score, eri_category, eri_factors
+
+
+# ── UDFs ──
+# One call per stage: Pathway's per-call overhead dwarfs most of the work
+# in these functions. The window stage runs before the as-of-now
+# transport join and is memoized, so a retraction replays its result;
+# the transport stage runs after it and is deterministic, so windows the
+# join re-inserts on update pass straight through. It gets the few
+# forecast fields it needs as an `outlook` tuple instead of parsing Json.
+
+_OUTLOOK = ("direction", "projected_30min", "rate_per_min", "exposure_score_30min")
+
+_WINDOW = tuple[str, str, str, int, int, str, pw.Json, pw.Json, str, tuple[str, int, float, int] | None]
+_RISK = tuple[tuple[str, ...], int, int, str, tuple[str, ...]]
+
+
+def assess_window(aqi, history, window_ts):
+    """Band, stage, persistence, forecast and VPPE for one window and its AQI history."""
+    stage, desc = get_grap_stage(aqi)
+    consec, remaining, projected = persistence(history, window_ts)
+    forecast = forecast_history(history)
+    risk, worst = compute_vulnerability(forecast)
+    outlook = tuple(forecast[k] for k in _OUTLOOK) if forecast else None
+    return (
+        cpcb_band(aqi), stage, desc, consec, remaining, projected,
+        pw.Json(forecast), pw.Json(risk), worst, outlook,
+    )
+
+
+def assess_risk(aqi, consec, outlook, pollutants, fire_count, wind_speed, transport_score):
+    """Advisory, confidence and ERI for an assessed window with its transport attached."""
+    forecast = dict(zip(_OUTLOOK, outlook)) if outlook else None
+    advisory = preemptive_advisory(forecast, transport_score)
+    # every window holds at least one parsed (api_time stamped) reading
+    confidence = compute_confidence(True, pollutants, fire_count, wind_speed)
+    eri_score, eri_category, eri_factors = compute_eri(aqi, forecast, consec, transport_score)
+    return tuple(advisory), confidence, eri_score, eri_category, tuple(eri_factors)
+
+
+_assess_window = pw.udf(assess_window, return_type=_WINDOW)
+_assess_risk = pw.udf(assess_risk, return_type=_RISK, deterministic=True)
+
+
+# ── Dataflow ──
+
+def assess_windows(history_windows):
+    """
+    Windows with `history` (state_machine.window_history) plus cpcb_band,
+    grap_stage, grap_description, consecutive_windows, remaining_windows,
+    projected_trigger_time, forecast, vulnerable_risk, vulnerability_max
+    and outlook.
+    """
+    assessed = history_windows.select(
+        *pw.this,
+        assessment=_assess_window(pw.this.aqi, pw.this.history, pw.this.timestamp),
+    )
+    a = pw.this.assessment
+    return assessed.select(
+        *pw.this.without(pw.this.assessment),
+        cpcb_band=a[0],
+        grap_stage=a[1],
+        grap_description=a[2],
+        consecutive_windows=a[3],
+        remaining_windows=a[4],
+        projected_trigger_time=a[5],
+        forecast=a[6],
+        vulnerable_risk=a[7],
+        vulnerability_max=a[8],
+        outlook=a[9],
+    )
+
+
+def enrich_windows(scored):
+    """
+    Assessed windows with transport attached (fire_transport.with_transport)
+    plus preemptive_advisory, confidence_score, eri_score, eri_category
+    and eri_factors.
+    """
+    enriched = scored.select(
+        *pw.this,
+        risk=_assess_risk(
+            pw.this.aqi, pw.this.consecutive_windows, pw.this.outlook, pw.this.pollutants,
+            pw.coalesce(pw.this.fire_count, 0), pw.this.wind_speed,
+            pw.coalesce(pw.this.transport_score, 0),
+        ),
+    )
+    r = pw.this.risk
+    return enriched.select(
+        *pw.this.without(pw.this.risk, pw.this.outlook),
+        preemptive_advisory=r[0],
+        confidence_score=r[1],
+        eri_score=r[2],
+        eri_category=r[3],
+        eri_factors=r[4],
+    )
+
+
+# ── Observer ──
+
+class WindowAssessor:
+    """
+    The same fields as assess_windows + enrich_windows, computed one
+    released window at a time (ENRICH_MODE "observer"). Windows must
+    arrive per station in window order, as the WindowGate releases them;
+    each station keeps the AQI of its windows in the history span.
+    """
+
+    def __init__(self, depth=FORECAST_HISTORY_WINDOWS):
+        self._span = timedelta(minutes=WINDOW_HOP_MINUTES * (depth - 1))
+        self._history = {}  # city -> deque of (window_end, aqi), oldest first
+
+    def assess(self, row, aqi):
+        """Enrichment columns for a window row whose (validated) AQI is aqi."""
+        end = row["window_end"]
+        history = self._history.setdefault(row["city"], deque())
+        history.append((end, aqi))
+        while history[0][0] < end - self._span:  # window_history's interval
+            history.popleft()
+
+        window = assess_window(aqi, [a for _, a in history], row["timestamp"])
+        band, stage, desc, consec, remaining, projected, forecast, risk, worst, outlook = window
+        advisory, confidence, eri_score, eri_category, eri_factors = assess_risk(
+            aqi, consec, outlook, row["pollutants"], row.get("fire_count") or 0,
+            row.get("wind_speed"), row.get("transport_score") or 0,
+        )
+        return {
+            "cpcb_band": band,
+            "grap_stage": stage,
+            "grap_description": desc,
+            "consecutive_windows": consec,
+            "remaining_windows": remaining,
+            "projected_trigger_time": projected,
+            "forecast": forecast,
+            "vulnerable_risk": risk,
+            "vulnerability_max": worst,
+            "preemptive_advisory": advisory,
+            "confidence_score": confidence,
+            "eri_score": eri_score,
+            "eri_category": eri_category,
+            "eri_factors": eri_factors,
+        }
@@ -0,0 +1,69 @@
+# state_machine.py — per-station window sequence, expressed in the dataflow
+# Each window is interval-joined to the station's previous windows (by
+# window end, hop-aligned) and reduced to an ordered AQI history, so
+# persistence and the forecast are pure functions of a window's row. A
+# late reading that updates a window re-derives only the windows whose
+# history contains it, on whichever Pathway worker owns them.
+
+from datetime import datetime, timedelta
+
+import pathway as pw
+
+from config import (
+    HIGH_AQI_THRESHOLD, PERSISTENCE_THRESHOLD, WINDOW_HOP_MINUTES, FORECAST_HISTORY_WINDOWS,
+)
+
+
+def window_history(windowed, depth=FORECAST_HISTORY_WINDOWS):
+    """
+    windowed (city, window_end, aqi, ...) plus `history`: the AQI of the
+    station's last `depth` windows up to and including this one, oldest
+    first.
+    """
+    earlier = windowed.copy()
+    pairs = windowed.interval_join(
+        earlier,
+        windowed.window_end,
+        earlier.window_end,
+        pw.temporal.interval(-pw.Duration(minutes=WINDOW_HOP_MINUTES * (depth - 1)), pw.Duration(0)),
+        windowed.city == earlier.city,
+    ).select(
+        window=windowed.id,
+        entry=pw.make_tuple(earlier.window_end, earlier.aqi),
+    )
+    histories = pairs.groupby(pairs.window).reduce(
+        pairs.window,
+        entries=pw.reducers.sorted_tuple(pairs.entry),
+    )
+    return windowed.join(histories, windowed.id == histories.window, id=windowed.id).select(
+        *pw.left,
+        history=_aqis(pw.right.entries),
+    )
+
+
+@pw.udf(return_type=tuple[int, ...], deterministic=True)
+def _aqis(entries):
+    return tuple(aqi for _, aqi in entries)
+
+
+def consecutive_high(history):
+    """Trailing windows at or above HIGH_AQI_THRESHOLD (at most the history depth)."""
+    count = 0
+    for aqi in reversed(history):
+        if aqi < HIGH_AQI_THRESHOLD:
+            break
+        count += 1
+    return count
+
+
+def persistence(history, window_ts):
+    """(consecutive_windows, remaining_windows, projected_trigger_time) for one window."""
+    consec = consecutive_high(history)
+    remaining = max(0, PERSISTENCE_THRESHOLD - consec)
+    if consec >= PERSISTENCE_THRESHOLD:
+        projected = "ACTIVE NOW"
+    elif isinstance(window_ts, datetime):
+        projected = (window_ts + timedelta(minutes=remaining * WINDOW_HOP_MINUTES)).strftime("%H:%M:%S")
+    else:
+        projected = "Calculating..."
+    return consec, remaining, projected
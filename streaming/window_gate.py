@@ -0,0 +1,98 @@
+# window_gate.py — release each station window to the Observer once, when it closes
+# The sliding reduce re-emits a window every time a reading lands in it
+# (duration / hop open windows per station), and the transport join
+# re-inserts it again. The gate keeps only the newest row of each open
+# window and hands it on once the station's readings have moved past the
+# window's end, in window order, so hysteresis and the escalation log
+# advance exactly once per window. Rows within one Pathway batch arrive
+# in no particular order, so windows are released at the batch's end.
+# window_behavior() picks how the reduce itself emits (WINDOW_EMIT_MODE).
+
+import threading
+
+import pathway as pw
+
+from config import WINDOW_EMIT_MODE, WINDOW_LATENESS_SECONDS
+
+
+def window_behavior(mode=WINDOW_EMIT_MODE, lateness=WINDOW_LATENESS_SECONDS):
+    """windowby behavior for an emit mode: None (stream), cutoff (preview) or exactly once (close)."""
+    if mode == "stream":
+        return None
+    if mode == "preview":
+        return pw.temporal.common_behavior(cutoff=pw.Duration(seconds=lateness))
+    if mode == "close":
+        return pw.temporal.exactly_once_behavior(shift=pw.Duration(seconds=lateness))
+    raise ValueError(f"unknown window emit mode: {mode!r}")
+
+
+class WindowGate:
+    """
+    offer() each row from on_change, then release() in on_time_end. With
+    closed_upstream (the "close" emit mode) every row offered is a final
+    window and is released at the end of its batch.
+    """
+
+    def __init__(self, closed_upstream=False):
+        self._closed_upstream = closed_upstream
+        self._open = {}       # city -> {window_end: newest row}
+        self._watermark = {}  # city -> latest reading timestamp seen
+        self._closed = {}     # city -> window_end of the last window released
+        self._touched = set()
+        self._lock = threading.Lock()
+        self.stats = {
+            "updates": 0,      # additions offered
+            "superseded": 0,   # replaced a buffered row of a still-open window
+            "late": 0,         # landed in a window already released
+            "retractions": 0,
+            "released": 0,     # windows handed to the Observer
+        }
+
+    def offer(self, row, is_addition):
+        with self._lock:
+            if not is_addition:
+                self.stats["retractions"] += 1
+                return
+            self.stats["updates"] += 1
+
+            city, end = row["city"], row["window_end"]
+            closed = self._closed.get(city)
+            if closed is not None and end <= closed:
+                self.stats["late"] += 1
+                return
+
+            windows = self._open.setdefault(city, {})
+            if end in windows:
+                self.stats["superseded"] += 1
+            windows[end] = row
+            seen = end if self._closed_upstream else row["timestamp"]
+            mark = self._watermark.get(city)
+            if mark is None or seen > mark:
+                self._watermark[city] = seen
+            self._touched.add(city)
+
+    def release(self, flush=False):
+        """Rows of the windows that closed since the last call, per station oldest first."""
+        with self._lock:
+            cities = list(self._open) if flush else self._touched
+            out = []
+            for city in cities:
+                windows = self._open.get(city, {})
+                mark = self._watermark.get(city)
+                # [start, end) is final once the station has a reading at or after its end
+                done = sorted(e for e in windows if flush or e <= mark)
+                if done:
+                    self._closed[city] = done[-1]
+                    out.extend(windows.pop(e) for e in done)
+            self._touched = set()
+            self.stats["released"] += len(out)
+            return out
+
+    def snapshot(self):
+        with self._lock:
+            released = self.stats["released"]
+            return {
+                **self.stats,
+                "open": sum(len(w) for w in self._open.values()),
+                "updates_per_window": round(self.stats["updates"] / released, 2) if released else None,
+            }
@@ -268,6 +268,12 @@ ingestion_status = data.get("ingestion_status", "ok")
 ingestion_error = data.get("ingestion_error")
 ac = aqi_color(aqi)
 gc = grap_color(grap)
+preview = data.get("window_preview")
+preview_html = (
+    f'<div class="aqi-source">Open window to {preview["window_end"]:%H:%M}: '
+    f'AQI {preview["aqi"]} ({preview["cpcb_band"]}), preview only</div>'
+    if preview else ""
+)
 pct = min(100, int((consec / max(PERSISTENCE_THRESHOLD, 1)) * 100))
 pc = "#ef4444" if pct >= 100 else "#f97316" if pct >= 50 else "#22c55e"
 
@@ -298,6 +304,7 @@ with c1:
         <div class="aqi-number" style="color:{ac}">{aqi}</div>
         <div class="aqi-band" style="color:{ac}">{band}</div>
         <div class="aqi-source">Dominant: {dominant} | {n_poll} pollutants | Feed: {feed_id}</div>
+        {preview_html}
     </div>""", unsafe_allow_html=True)
 with c2:
     st.markdown(f"""
@@ -539,6 +546,8 @@ with s3:
         w_s = f"{w_spd:.1f}"
         w_d_txt = f"{w_dir:.0f}°" if w_dir is not None else "—"
         wind_sub = f"Direction: {w_d_txt}"
+        if data.get("wind_source") == "grid":
+            wind_sub += " · interpolated from nearby stations"
     else:
         w_s = "—"
         wind_sub = "Wind telemetry unavailable from source feed"
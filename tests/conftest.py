@@ -0,0 +1,14 @@
+# conftest.py — run ingestion against the local WAQI stand-in
+# config reads WAQI_API_ROOT at import, so the stand-in is started and
+# the environment set before any test module imports the app's code.
+
+import os
+
+from tests.waqi_standin import serve
+
+WAQI_STANDIN = serve()
+
+os.environ["WAQI_API_ROOT"] = WAQI_STANDIN.root
+os.environ.setdefault("WAQI_TOKEN", "test-token")
+os.environ.setdefault("FIRMS_API_KEY", "test-key")
+os.environ["NO_PROXY"] = "127.0.0.1,localhost"
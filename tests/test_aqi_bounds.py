@@ -0,0 +1,75 @@
+# test_aqi_bounds.py — bulk map-bounds ingestion against recorded fixtures
+
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from config import AQI_BULK_BOUNDS
+from ingestion import aqi_stream
+from ingestion.aqi_stream import parse_bounds_payload, poll_bounds
+from tests.conftest import WAQI_STANDIN
+from tests.waqi_standin import FIXTURES
+
+ARRIVAL = datetime(2026, 1, 15, 4, 0, tzinfo=timezone.utc)
+
+
+def _fixture():
+    with open(os.path.join(FIXTURES, "waqi_bounds.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_dedup():
+    for station in list(aqi_stream._last_emitted):
+        aqi_stream.forget_station(station)
+    yield
+
+
+def test_parse_maps_configured_stations_to_their_keys():
+    records, stations = parse_bounds_payload("box", _fixture(), arrival=ARRIVAL)
+
+    by_key = {r["city"]: r for r in records}
+    assert set(by_key) == {
+        "Anand Vihar (Delhi) — @2553",
+        "BTM (Bangalore) — @8190",
+        "Lalbagh — @7023",
+    }
+    # only the station not in config.STATIONS is new
+    assert list(stations) == ["Lalbagh — @7023"]
+    assert stations["Lalbagh — @7023"]["feed_id"] == "@7023"
+
+    anand = by_key["Anand Vihar (Delhi) — @2553"]
+    assert anand["aqi"] == 312
+    assert anand["timestamp"] == ARRIVAL
+    assert anand["event_time"] == datetime(2026, 1, 15, 3, 30, tzinfo=timezone.utc)
+
+
+def test_parse_skips_dash_and_malformed_rows():
+    records, _ = parse_bounds_payload("box", _fixture(), arrival=ARRIVAL)
+    assert all("Kolkata" not in r["city"] and "Bandra" not in r["city"] for r in records)
+    assert len(records) == 3
+
+
+def test_parse_rejects_error_status():
+    with pytest.raises(RuntimeError):
+        parse_bounds_payload("box", {"status": "error", "data": "Invalid key"})
+
+
+def test_poll_bounds_against_standin():
+    from station_loader import _registry
+
+    emitted = []
+    stats = poll_bounds(AQI_BULK_BOUNDS, emitted.append)
+
+    assert stats["failed"] == 0
+    assert stats["emitted"] == 3
+    assert {r["city"] for r in emitted} >= {"Anand Vihar (Delhi) — @2553", "BTM (Bangalore) — @8190"}
+    assert "Lalbagh — @7023" in _registry
+    assert any(p.startswith("/map/bounds/?latlng=") for p in WAQI_STANDIN.requests)
+
+    # same readings again: suppressed as unchanged
+    again = []
+    stats = poll_bounds(AQI_BULK_BOUNDS, again.append)
+    assert again == [] and stats["suppressed"] == 3
@@ -0,0 +1,69 @@
+# test_aqi_dedup.py — event-time dedup and re-stating of WAQI readings
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from config import AQI_RESTATE_SECONDS, STALE_DATA_THRESHOLD_SECONDS
+from ingestion import aqi_stream
+
+T0 = datetime(2026, 1, 1, 6, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(aqi_stream, "_last_emitted", {})
+    monkeypatch.setattr(aqi_stream, "_last_fetched", {})
+    monkeypatch.setattr(aqi_stream, "_dedup_stats", {"emitted": 0, "restated": 0, "suppressed": 0, "expired": 0})
+
+
+def reading(station="A", aqi=180, event=T0, after=0):
+    """A fetched reading, `after` seconds past T0."""
+    ts = T0 + timedelta(seconds=after)
+    return {"city": station, "aqi": aqi, "event_time": event, "timestamp": ts}
+
+
+def test_unchanged_reading_is_suppressed_until_restate():
+    assert aqi_stream.should_emit(reading())
+    assert not aqi_stream.should_emit(reading(after=30))
+    assert not aqi_stream.should_emit(reading(after=AQI_RESTATE_SECONDS - 1))
+    assert aqi_stream.should_emit(reading(after=AQI_RESTATE_SECONDS))  # re-stated
+    assert not aqi_stream.should_emit(reading(after=AQI_RESTATE_SECONDS + 30))
+    assert aqi_stream._dedup_stats == {"emitted": 2, "restated": 1, "suppressed": 3, "expired": 0}
+
+
+def test_new_event_time_or_aqi_is_emitted():
+    assert aqi_stream.should_emit(reading())
+    assert aqi_stream.should_emit(reading(event=T0 + timedelta(hours=1), after=30))
+    assert aqi_stream.should_emit(reading(event=T0 + timedelta(hours=1), aqi=190, after=60))
+    assert aqi_stream._dedup_stats["suppressed"] == 0
+
+
+def test_stations_are_deduplicated_independently():
+    assert aqi_stream.should_emit(reading("A"))
+    assert aqi_stream.should_emit(reading("B"))
+    assert not aqi_stream.should_emit(reading("A", after=30))
+    aqi_stream.forget_station("A")  # its fetch failed: the next reading starts over
+    assert aqi_stream.should_emit(reading("A", after=60))
+
+
+def test_restate_unchanged_repeats_the_last_reading_once_due():
+    aqi_stream.should_emit(reading("A"))
+    aqi_stream.should_emit(reading("B", after=60))
+    emitted = []
+    assert aqi_stream.restate_unchanged(emitted.append, now=T0 + timedelta(seconds=AQI_RESTATE_SECONDS - 1)) == 0
+
+    now = T0 + timedelta(seconds=AQI_RESTATE_SECONDS)
+    assert aqi_stream.restate_unchanged(emitted.append, now=now) == 1  # B is not due yet
+    assert [(r["city"], r["aqi"], r["event_time"], r["timestamp"]) for r in emitted] == [("A", 180, T0, now)]
+    # the re-stated reading counts as emitted: nothing again until another period passes
+    assert aqi_stream.restate_unchanged(emitted.append, stations={"A"}, now=now + timedelta(seconds=30)) == 0
+
+
+def test_restate_unchanged_drops_stale_stations():
+    aqi_stream.should_emit(reading("A"))
+    emitted = []
+    now = T0 + timedelta(seconds=STALE_DATA_THRESHOLD_SECONDS + 1)  # no real reading since T0
+    assert aqi_stream.restate_unchanged(emitted.append, now=now) == 0
+    assert emitted == [] and "A" not in aqi_stream._last_emitted
+    assert aqi_stream._dedup_stats["expired"] == 1
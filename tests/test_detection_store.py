@@ -0,0 +1,71 @@
+# test_detection_store.py — detection merge / dedup, age eviction and the change feed
+
+import numpy as np
+
+from ingestion.detection_store import FIRE_DTYPE, DetectionStore
+
+NOW = 1_767_225_600  # 2026-01-01 UTC
+
+
+def fires(*rows):
+    """FIRE_DTYPE array from (lat, lon, acquired) tuples."""
+    out = np.zeros(len(rows), dtype=FIRE_DTYPE)
+    for i, (lat, lon, acquired) in enumerate(rows):
+        out[i]["lat"], out[i]["lon"], out[i]["acquired"] = lat, lon, acquired
+    return out
+
+
+def drain(q):
+    items = []
+    while not q.empty():
+        items.append(q.get_nowait())
+    return items
+
+
+def test_merge_dedups_within_and_across_stations():
+    store = DetectionStore(max_age=3600)
+    batch = fires((28.5, 77.0, NOW - 60), (28.6, 77.1, NOW - 30))
+    assert store.merge("A", batch, now=NOW)
+    assert store.version("A") == 1
+
+    assert not store.merge("A", batch, now=NOW)  # the same poll again
+    assert store.version("A") == 1
+    assert store.merge("B", batch[:1], now=NOW)  # overlapping station: stored once
+    assert len(store) == 2
+    assert store.stats == {"inserted": 2, "duplicates": 2, "evicted": 0}
+    assert store.fires("A")["acquired"].tolist() == [NOW - 60, NOW - 30]  # oldest first
+
+
+def test_aged_detections_are_skipped_and_evicted():
+    store = DetectionStore(max_age=3600)
+    assert not store.merge("A", fires((28.5, 77.0, NOW - 4000)), now=NOW)  # already too old
+    store.merge("A", fires((28.5, 77.0, NOW - 3000)), now=NOW)
+    store.merge("B", fires((28.5, 77.0, NOW - 3000), (28.7, 77.2, NOW - 10)), now=NOW)
+    versions = store.version("A"), store.version("B")
+
+    assert store.evict(now=NOW + 1000) == 1  # everywhere at once
+    assert store.fires("A").size == 0
+    assert store.fires("B")["acquired"].tolist() == [NOW - 10]
+    assert (store.version("A"), store.version("B")) == (versions[0] + 1, versions[1] + 1)
+    assert store.evict(now=NOW + 1000) == 0
+    assert store.stats["evicted"] == 1
+
+
+def test_change_feed_is_primed_and_ends_on_close():
+    store = DetectionStore(max_age=3600)
+    store.merge("A", fires((28.5, 77.0, NOW - 60)), now=NOW)
+    feed = store.watch()
+    sites = store.watch_sites()
+    store.locate("A", 28.5, 77.0)
+    store.locate("A", 28.5, 77.0)  # unchanged: no event
+
+    store.merge("A", fires((28.5, 77.0, NOW - 60), (28.6, 77.1, NOW - 30)), now=NOW)
+    store.evict(now=NOW + 3545)  # only the first fire ages out
+    store.close()
+
+    events = drain(feed)
+    assert [(len(added), len(removed)) for added, removed in events[:-1]] == [(1, 0), (1, 0), (0, 1)]
+    assert events[-1] is None
+    assert drain(sites) == [("A", 28.5, 77.0), None]
+    late = drain(store.watch())  # subscribing after close: primed with what is live, then ended
+    assert [(len(added), len(removed)) for added, removed in late[:-1]] == [(1, 0)] and late[-1] is None
@@ -0,0 +1,69 @@
+# test_enrichment_queue.py — latest-wins coalescing, one job in flight per station
+
+import threading
+import time
+
+from rag.enrichment_queue import EnrichmentQueue
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_jobs_superseded_while_pending_are_dropped():
+    gate = threading.Event()
+    ran = []
+
+    def work(station, version, job):
+        ran.append((station, version, job))
+        if version == 1:
+            gate.wait(2)
+
+    queue = EnrichmentQueue(work, concurrency=2)
+    queue.submit("A", 1, "first")
+    wait_until(lambda: ran)  # v1 is in flight
+    for version in (2, 3, 4):
+        queue.submit("A", version, f"job {version}")
+    time.sleep(0.1)
+    assert ran == [("A", 1, "first")]  # a second worker is idle, but A already has a job running
+
+    gate.set()
+    wait_until(lambda: queue.snapshot()["completed"] == 2)
+    assert ran == [("A", 1, "first"), ("A", 4, "job 4")]
+    snap = queue.snapshot()
+    assert (snap["submitted"], snap["coalesced"], snap["pending"], snap["running"]) == (4, 2, 0, 0)
+
+
+def test_busy_station_does_not_hold_up_others():
+    gate = threading.Event()
+    ran = []
+
+    def work(station, version, job):
+        ran.append(station)
+        if station == "A":
+            gate.wait(2)
+
+    queue = EnrichmentQueue(work, concurrency=2)
+    queue.submit("A", 1, None)
+    wait_until(lambda: ran == ["A"])
+    queue.submit("A", 2, None)
+    queue.submit("B", 1, None)
+    wait_until(lambda: ran == ["A", "B"])  # B runs while A's second job waits
+    gate.set()
+    wait_until(lambda: queue.snapshot()["completed"] == 3)
+
+
+def test_failed_job_is_counted_and_the_worker_keeps_going():
+    def work(station, version, job):
+        if job == "boom":
+            raise RuntimeError("LLM down")
+
+    queue = EnrichmentQueue(work, concurrency=1)
+    queue.submit("A", 1, "boom")
+    queue.submit("B", 1, "ok")
+    wait_until(lambda: queue.snapshot()["completed"] + queue.snapshot()["failed"] == 2)
+    snap = queue.snapshot()
+    assert (snap["completed"], snap["failed"]) == (1, 1)
@@ -0,0 +1,89 @@
+# test_fire_transport.py — detection/site connectors and per-station transport scoring
+
+import threading
+import time
+
+import numpy as np
+import pathway as pw
+
+from ingestion.detection_store import FIRE_DTYPE, DetectionStore
+from ingestion.firms_stream import transport_result
+from streaming.fire_transport import (
+    _UNITS, FireDetectionConnector, FireDetectionSchema, FireSiteConnector, FireSiteSchema,
+    _alignment_units, station_fires, station_transport,
+)
+
+
+def test_evicted_fires_leave_the_join_and_close_ends_the_run():
+    store = DetectionStore(max_age=3600)
+    store.locate("S", 28.6, 77.2)
+    now = time.time()
+    fires = np.zeros(2, dtype=FIRE_DTYPE)
+    fires["lat"] = [28.61, 28.62]
+    fires["lon"] = 77.21
+    fires["acquired"] = [int(now) - 10, int(now) - 3595]  # the second ages out below
+
+    detections = pw.io.python.read(FireDetectionConnector(store), schema=FireDetectionSchema)
+    sites = pw.io.python.read(FireSiteConnector(store), schema=FireSiteSchema)
+    pairs = station_fires(sites, detections)
+
+    def feed():
+        time.sleep(0.3)
+        store.merge("S", fires, now)
+        time.sleep(0.3)
+        assert store.evict(now + 10) == 1
+        time.sleep(0.3)
+        store.close()
+
+    threading.Thread(target=feed, daemon=True).start()
+    started = time.monotonic()
+    _, columns = pw.debug.table_to_dicts(pairs)  # returns only once every connector has ended
+
+    assert time.monotonic() - started < 30
+    assert list(columns["station"].values()) == ["S"]
+    assert [round(v, 2) for v in columns["fire_lat"].values()] == [28.61]
+
+
+def test_watch_after_close_is_already_ended():
+    store = DetectionStore()
+    store.close()
+    changes = store.watch()
+    assert changes.get_nowait() == ([], [])  # still primed
+    assert changes.get_nowait() is None
+    assert store.watch_sites().get_nowait() is None
+
+
+def test_station_transport_matches_the_per_pair_scalar():
+    rng = np.random.default_rng(0)
+    for n in (5, 200):  # scalar loop and NumPy path
+        lats, lons = tuple(rng.uniform(28, 29, n).tolist()), tuple(rng.uniform(77, 78, n).tolist())
+        for wind_dir in (0.0, 45.0, 200.0, None):
+            units = [_alignment_units(a, b, 28.5, 77.5, wind_dir) for a, b in zip(lats, lons)]
+            expected = transport_result(n, sum(u > 0 for u in units), sum(units) / _UNITS, 6.0)
+            assert station_transport(lats, lons, 28.5, 77.5, wind_dir, 6.0) == expected
+
+
+def test_station_without_fires_or_wind_scores_zero():
+    assert station_transport(None, None, None, None, 90.0, 6.0) == (0, 0, "none")
+    assert station_transport((28.6,), (77.2,), 28.5, 77.1, 90.0, 0.5) == (0, 0, "calm")
+
+
+def test_memo_hits_on_same_fire_set_and_wind_bucket():
+    from streaming import fire_transport as ft
+
+    lats, lons = (28.6, 28.62, 28.7), (77.3, 77.31, 77.35)
+    version = sum(ft.fire_fingerprint(a, b, 1) for a, b in zip(lats, lons))
+    ft.clear_transport_cache()
+    plain = station_transport(lats, lons, 28.5, 77.2, 45.0, 6.0)
+
+    before = ft.transport_cache_stats()
+    first = station_transport(lats, lons, 28.5, 77.2, 45.0, 6.0, fire_set=version)
+    again = station_transport(lats, lons, 28.5, 77.2, 45.0, 6.0, fire_set=version)
+    other = station_transport(lats[:2], lons[:2], 28.5, 77.2, 45.0, 6.0,
+                              fire_set=version - ft.fire_fingerprint(lats[2], lons[2], 1))
+    after = ft.transport_cache_stats()
+
+    assert first == again == plain
+    assert other == station_transport(lats[:2], lons[:2], 28.5, 77.2, 45.0, 6.0)
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 2
@@ -0,0 +1,49 @@
+# test_forecaster.py — running-sum forecast vs the polyfit reference, per-minute units
+
+from config import HIGH_AQI_THRESHOLD, WINDOW_HOP_MINUTES
+import random
+
+from streaming.forecaster import SlidingForecast, forecast_history
+from streaming.risk_engine import compute_short_term_forecast
+
+
+def test_rate_and_eta_are_per_minute_of_window_hops():
+    history = [100, 110, 120, 130, 140]  # +10 AQI per window
+    f = forecast_history(history)
+
+    assert f["slope"] == 10
+    assert f["rate_per_min"] == round(10 / WINDOW_HOP_MINUTES, 2)
+    assert f["escalation_eta"] == round((HIGH_AQI_THRESHOLD - 140) / 10 * WINDOW_HOP_MINUTES, 1)
+
+
+def test_units_match_polyfit_reference():
+    # exact lines are avoided: polyfit's float error can truncate a projection by one
+    for history in ([101, 113, 118, 134, 142], [250, 240, 263, 181, 300, 317], [80, 83, 79]):
+        reference = compute_short_term_forecast([{"aqi": a} for a in history])
+        f = forecast_history(history)
+        for field in ("slope", "direction", "rate_per_min", "escalation_eta"):
+            assert f[field] == reference[field], field
+
+
+def test_sliding_forecast_after_eviction_matches_reference():
+    rng = random.Random(7)
+    depth = 8
+    sliding = SlidingForecast(depth)
+    pushed = []
+    for _ in range(5 * depth):  # evicts once more than `depth` windows are pushed
+        aqi = rng.randint(60, 450)
+        sliding.push(aqi)
+        pushed.append(aqi)
+        window = pushed[-depth:]
+        f = sliding.forecast()
+        assert f == forecast_history(window)  # exact sums: the ring never drifts
+        if len(window) < 3:
+            assert f is None
+            continue
+        reference = compute_short_term_forecast([{"aqi": a} for a in window])
+        for field in ("slope", "direction", "rate_per_min", "escalation_eta", "anomaly", "data_points"):
+            assert f[field] == reference[field], field
+        # polyfit's float error can truncate an exact projection by one
+        assert abs(f["projected_5min"] - reference["projected_5min"]) <= 1
+        assert abs(f["projected_30min"] - reference["projected_30min"]) <= 1
+    assert sliding.n == depth
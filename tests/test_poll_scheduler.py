@@ -0,0 +1,88 @@
+# test_poll_scheduler.py — per-station cadence, hot stations and backoff
+
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from config import (
+    AQI_POLL_INTERVAL, AQI_POLL_GRACE_SECONDS, AQI_POLL_MAX_BACKOFF, AQI_POLL_HOT_MARGIN,
+    HIGH_AQI_THRESHOLD,
+)
+from ingestion.poll_scheduler import PollScheduler
+
+
+def reading(event, aqi=100):
+    """A fetched reading whose WAQI time.iso is `event` (epoch seconds)."""
+    return {"aqi": aqi, "event_time": datetime.fromtimestamp(event, tz=timezone.utc)}
+
+
+def test_unknown_cadence_polls_at_the_base_interval():
+    scheduler = PollScheduler(["A", "B"])
+    assert scheduler.pop_due(now=time.monotonic()) == ["A", "B"]
+    scheduler.observe("A", reading(time.time()), now=0)
+    assert scheduler.seconds_until_due(now=0) == AQI_POLL_INTERVAL
+    assert scheduler.pop_due(now=AQI_POLL_INTERVAL - 1) == []
+    assert scheduler.pop_due(now=AQI_POLL_INTERVAL) == ["A"]
+
+
+def test_learned_cadence_polls_after_the_next_expected_update():
+    scheduler = PollScheduler(["A"])
+    last = time.time() - 100
+    scheduler.observe("A", reading(last - 600), now=0)
+    scheduler.observe("A", reading(last), now=0)  # one 600 s period learned
+    assert scheduler.stats("A")["period"] == 600
+    expected = 600 - 100 + AQI_POLL_GRACE_SECONDS
+    assert scheduler.seconds_until_due(now=0) == pytest.approx(expected, abs=5)
+
+
+def test_overdue_update_retries_with_growing_delay():
+    scheduler = PollScheduler(["A"])
+    last = time.time() - 5_000  # next update was due long ago
+    scheduler.observe("A", reading(last - 600), now=0)
+    scheduler.observe("A", reading(last), now=0)
+    delays = []
+    for _ in range(3):  # same time.iso again: a miss each poll
+        scheduler.observe("A", reading(last), now=0)
+        delays.append(scheduler.seconds_until_due(now=0))
+    assert delays == [AQI_POLL_INTERVAL * 2, AQI_POLL_INTERVAL * 4, AQI_POLL_INTERVAL * 8]
+
+
+def test_hot_station_never_waits_longer_than_the_base_interval():
+    last = time.time() - 100
+    scheduler = PollScheduler(["A"])
+    scheduler.observe("A", reading(last - 600, aqi=HIGH_AQI_THRESHOLD - AQI_POLL_HOT_MARGIN), now=0)
+    scheduler.observe("A", reading(last, aqi=HIGH_AQI_THRESHOLD - AQI_POLL_HOT_MARGIN), now=0)
+    assert scheduler.seconds_until_due(now=0) == AQI_POLL_INTERVAL
+
+    hot = set()
+    scheduler = PollScheduler(["B"], hot_fn=lambda s: s in hot)
+    scheduler.observe("B", reading(last - 600), now=0)
+    scheduler.observe("B", reading(last), now=0)
+    assert scheduler.seconds_until_due(now=0) > AQI_POLL_INTERVAL
+    hot.add("B")  # e.g. escalating in the Observer
+    scheduler.observe("B", reading(last), now=0)
+    assert scheduler.seconds_until_due(now=0) == AQI_POLL_INTERVAL
+
+
+def test_failures_back_off_exponentially_and_reset_on_success():
+    scheduler = PollScheduler(["A"])
+    delays = []
+    for _ in range(8):
+        scheduler.observe("A", None, now=0)
+        delays.append(scheduler.seconds_until_due(now=0))
+    assert delays[:3] == [AQI_POLL_INTERVAL * 2, AQI_POLL_INTERVAL * 4, AQI_POLL_INTERVAL * 8]
+    assert delays[-1] == AQI_POLL_MAX_BACKOFF
+
+    scheduler.observe("A", reading(time.time()), now=0)
+    assert scheduler.stats("A")["failures"] == 0
+    assert scheduler.seconds_until_due(now=0) == AQI_POLL_INTERVAL
+
+
+def test_rescheduling_supersedes_the_earlier_entry():
+    scheduler = PollScheduler(["A"])
+    scheduler.pop_due(now=time.monotonic())
+    scheduler.observe("A", None, now=0)   # due at 2x the interval
+    scheduler.retry("A", now=0)           # then moved forward to 1x
+    assert scheduler.pop_due(now=AQI_POLL_INTERVAL) == ["A"]
+    assert scheduler.pop_due(now=AQI_POLL_INTERVAL * 2) == []  # the stale heap entry is skipped
@@ -0,0 +1,65 @@
+# test_poll_stations.py — cycle budget: skipped and late fetches
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pytest
+
+from ingestion import aqi_stream
+from ingestion.poll_scheduler import PollScheduler
+
+STATIONS = {name: {"feed_id": f"@{i}"} for i, name in enumerate(["A", "B", "C"])}
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Fake fetch_aqi: sleeps per station, counts calls; single-worker pool."""
+    calls, delays = [], {}
+    lock = threading.Lock()
+
+    def fetch(station, feed_id, timeout):
+        with lock:
+            calls.append(station)
+        time.sleep(delays.get(station, 0.0))
+        now = datetime.now(timezone.utc)
+        return {"timestamp": now, "event_time": now, "aqi": 100, "city": station}
+
+    monkeypatch.setattr(aqi_stream, "fetch_aqi", fetch)
+    monkeypatch.setattr(aqi_stream, "_poll_pool", ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(aqi_stream, "_inflight", {})
+    return calls, delays
+
+
+def test_queued_past_deadline_is_retried_without_backoff(fetches):
+    calls, delays = fetches
+    delays["A"] = 0.8  # holds the only worker until B and C have < 0.5 s left
+    outcomes = []
+    stats = aqi_stream.poll_stations(STATIONS, lambda r: None,
+                                     on_result=lambda s, r: outcomes.append((s, r)), budget=1.0)
+
+    assert [s for s, _ in outcomes] == ["A"]  # no None outcome for B / C
+    assert stats["overran"] == ["B", "C"]
+    assert stats["emitted"] == 1
+
+    scheduler = PollScheduler(["B"])
+    scheduler.pop_due()
+    scheduler.retry("B")
+    assert scheduler.stats("B")["failures"] == 0
+
+
+def test_late_result_is_used_not_refetched(fetches):
+    calls, delays = fetches
+    delays["A"] = 1.2
+    emitted = []
+    stats = aqi_stream.poll_stations({"A": STATIONS["A"]}, emitted.append, budget=0.8)
+    assert stats["overran"] == ["A"] and emitted == []
+
+    time.sleep(0.6)  # the fetch finishes after its cycle gave up on it
+    outcomes = []
+    stats = aqi_stream.poll_stations({"A": STATIONS["A"]}, emitted.append,
+                                     on_result=lambda s, r: outcomes.append(s), budget=0.8)
+    assert calls == ["A"]  # one request, not two
+    assert outcomes == ["A"] and stats["overran"] == []
+    assert [r["city"] for r in emitted] == ["A"]
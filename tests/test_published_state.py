@@ -0,0 +1,55 @@
+# test_published_state.py — state versions survive wholesale replacement; latest enrichment wins
+
+import pytest
+
+from streaming import published_state as ps
+
+CITY = "Anand Vihar (Delhi)"
+DEFAULTS = {"advisory_text": "Initializing...", "enriched_version": 0}
+
+
+@pytest.fixture(autouse=True)
+def _clean():
+    ps.latest_state.clear()
+    ps._versions.clear()
+    yield
+
+
+def _window(aqi):
+    # as Observer._evaluate: enrichment fields carry over until a job patches them
+    return lambda previous: {**{k: previous.get(k, v) for k, v in DEFAULTS.items()}, "aqi": aqi}
+
+
+def _invalid(previous):
+    return {"status": "DATA_INVALID", "aqi": 0}
+
+
+def test_invalid_window_does_not_restart_versions_or_freeze_the_advisory():
+    for _ in range(57):
+        version = ps.publish(CITY, _window(300))
+    assert version == 57
+    assert ps.patch_enrichment(CITY, 56, {"advisory_text": "v56"})
+
+    assert ps.publish(CITY, _invalid) == 58          # replaced wholesale
+    assert ps.publish(CITY, _window(310)) == 59      # not 1
+
+    # the v57 job was in flight across the invalid window; it lands late
+    assert ps.patch_enrichment(CITY, 57, {"advisory_text": "v57"})
+    # and the job for the new window still lands after it
+    assert ps.patch_enrichment(CITY, 59, {"advisory_text": "v59"})
+    state = ps.latest_state[CITY]
+    assert state["advisory_text"] == "v59" and state["enriched_version"] == 59
+    assert state["state_version"] == 59
+
+
+def test_older_job_never_overwrites_a_newer_one():
+    ps.publish(CITY, _window(200))
+    ps.publish(CITY, _window(210))
+    assert ps.patch_enrichment(CITY, 2, {"advisory_text": "v2"})
+    assert not ps.patch_enrichment(CITY, 1, {"advisory_text": "v1"})
+    assert ps.latest_state[CITY]["advisory_text"] == "v2"
+
+
+def test_patch_before_any_state_is_dropped():
+    assert not ps.patch_enrichment(CITY, 1, {"advisory_text": "x"})
+    assert CITY not in ps.latest_state
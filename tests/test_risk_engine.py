@@ -0,0 +1,80 @@
+# test_risk_engine.py — Observer-side WindowAssessor against the dataflow UDF stages
+
+from datetime import datetime, timedelta, timezone
+
+import pathway as pw
+
+from config import WINDOW_HOP_MINUTES
+from streaming.fire_transport import with_transport
+from streaming.risk_engine import WindowAssessor, assess_windows, enrich_windows
+from streaming.state_machine import window_history
+
+FIELDS = (
+    "cpcb_band", "grap_stage", "grap_description", "consecutive_windows", "remaining_windows",
+    "projected_trigger_time", "forecast", "vulnerable_risk", "vulnerability_max",
+    "preemptive_advisory", "confidence_score", "eri_score", "eri_category", "eri_factors",
+)
+
+
+class WindowSchema(pw.Schema):
+    city: str
+    timestamp: pw.DateTimeUtc
+    window_end: pw.DateTimeUtc
+    aqi: int
+    pollutants: int
+
+
+class TransportSchema(pw.Schema):
+    city: str
+    wind_speed: float | None
+    wind_direction: float | None
+    wind_source: str
+    fire_count: int
+    high_conf_fires: int
+    last_seen: float | None
+    transport_score: int
+    aligned_fires: int
+    transport_label: str
+
+
+def _windows():
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for city, aqis in {
+        "A": [280, 300, 320, 340, 360, 380, 390, 400, 410, 420, 430, 440, 450, 460],
+        "B": [120, 150, 180, 210, 240, 270, 300, 330, 360, 390, 420, 450],
+    }.items():
+        for i, aqi in enumerate(aqis):
+            if city == "B" and i in (5, 6, 7):
+                continue  # three missing windows: both paths leave them out of B's history
+            end = start + timedelta(minutes=WINDOW_HOP_MINUTES * (i + 1))
+            rows.append((city, end - timedelta(seconds=10), end, aqi, 2))
+    return rows
+
+
+def _unwrap(value):
+    return value.value if isinstance(value, pw.Json) else value
+
+
+def test_window_assessor_matches_dataflow_stages():
+    rows = _windows()
+    transport = [
+        ("A", 4.0, 270.0, "waqi", 6, 2, None, 60, 3, "strong"),
+        ("B", 1.0, 90.0, "waqi", 0, 0, None, 0, 0, "none"),
+    ]
+    windowed = pw.debug.table_from_rows(WindowSchema, rows)
+    enriched = enrich_windows(with_transport(
+        assess_windows(window_history(windowed)), pw.debug.table_from_rows(TransportSchema, transport),
+    ))
+    _, columns = pw.debug.table_to_dicts(enriched)
+    expected = {
+        (columns["city"][k], columns["window_end"][k]): {f: _unwrap(columns[f][k]) for f in FIELDS}
+        for k in columns["city"]
+    }
+
+    winds = {t[0]: dict(zip(TransportSchema.column_names(), t)) for t in transport}
+    assessor = WindowAssessor()
+    for city, ts, end, aqi, pollutants in rows:  # per station, window order
+        row = {**winds[city], "city": city, "timestamp": ts, "window_end": end, "pollutants": pollutants}
+        got = {f: _unwrap(v) for f, v in assessor.assess(row, aqi).items()}
+        assert got == expected[(city, end)], (city, end)
@@ -0,0 +1,75 @@
+# test_transport.py — per-host byte and latency counters for plain and streamed bodies
+
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ingestion import transport
+
+BODY = b"latitude,longitude,frp\n" + b"28.61234,77.20456,12.5\n" * 4000
+PACKED = gzip.compress(BODY)
+CHUNK_DELAY = 0.05
+
+
+class _Chunked(BaseHTTPRequestHandler):
+    """gzip body sent chunked (no Content-Length), in three slow pieces."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        step = len(PACKED) // 3 + 1
+        for i in range(0, len(PACKED), step):
+            piece = PACKED[i:i + step]
+            self.wfile.write(f"{len(piece):x}\r\n".encode() + piece + b"\r\n")
+            self.wfile.flush()
+            time.sleep(CHUNK_DELAY)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Chunked)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+
+
+def _stats(netloc):
+    return transport.host_stats()[netloc]
+
+
+def test_plain_body_counts_decoded_and_wire_bytes(server):
+    before = dict(_stats(server)) if server in transport.host_stats() else None
+    resp = transport.get(f"http://{server}/plain", timeout=5)
+    assert resp.content == BODY
+    st = _stats(server)
+    base = before or {"bytes": 0, "wire_bytes": 0, "completed": 0}
+    assert st["bytes"] - base["bytes"] == len(BODY)
+    assert st["wire_bytes"] - base["wire_bytes"] == len(PACKED)
+    assert st["completed"] - base["completed"] == 1
+
+
+def test_streamed_body_is_counted_as_consumed(server):
+    url = f"http://{server}/stream"
+    transport.get(url, timeout=5).close()  # make sure the host entry exists
+    before = dict(_stats(server))
+
+    with transport.get(url, timeout=5, stream=True) as resp:
+        assert _stats(server)["bytes"] == before["bytes"]  # headers only so far
+        received = b"".join(resp.iter_content(1024))
+    assert received == BODY
+
+    st = _stats(server)
+    assert st["bytes"] - before["bytes"] == len(BODY)
+    assert st["wire_bytes"] - before["wire_bytes"] == len(PACKED)
+    assert st["completed"] - before["completed"] == 1  # counted once, not again on close
+    assert st["latency_last"] >= 2 * CHUNK_DELAY  # runs to the last byte, not the headers
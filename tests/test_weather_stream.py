@@ -0,0 +1,51 @@
+# test_weather_stream.py — WindField IDW lookups and pruning by event time
+
+import pytest
+
+from ingestion.weather_stream import WindField
+
+BOUNDS = (27.0, 76.0, 30.0, 79.0)
+
+
+def _field(**kw):
+    return WindField(bounds=BOUNDS, resolution=0.25, power=2, radius_km=300, **kw)
+
+
+def test_single_station_covers_its_radius():
+    field = _field()
+    field.report("A", 28.5, 77.0, 4.0, 270, ts=1_000)
+    assert field.wind_for("A") == (4.0, 270)
+    assert field.wind_at(29.5, 78.0) == (4.0, 270)  # ~145 km away, the only contributor
+    assert field.wind_at(BOUNDS[0], BOUNDS[3]) != (None, None)
+
+
+def test_idw_weights_the_nearer_station():
+    field = _field()
+    field.report("A", 28.0, 77.0, 2.0, 350, ts=1_000)
+    field.report("B", 28.0, 78.0, 6.0, 10, ts=1_000)
+    # halfway: equal weights, so the mean speed and 350° / 10° average to north
+    assert field.wind_at(28.0, 77.5) == (4.0, 0)
+    # a quarter of the way: A weighs (3/1)^2 = 9x B
+    speed, _ = field.wind_at(28.0, 77.25)
+    assert speed == pytest.approx((9 * 2.0 + 6.0) / 10, abs=0.05)
+
+
+def test_report_replaces_the_station_and_skips_out_of_order():
+    field = _field()
+    field.report("A", 28.5, 77.0, 4.0, 270, ts=1_000)
+    field.report("A", 28.5, 77.0, 8.0, 90, ts=2_000)
+    field.report("A", 28.5, 77.0, 1.0, 180, ts=1_500)  # older than the one held
+    assert field.wind_for("A") == (8.0, 90)
+    assert field.stats()["stations_reporting"] == 1
+
+
+def test_stale_reports_are_pruned_by_event_time():
+    # replayed event times far behind the wall clock still age out
+    field = _field(max_age=3600)
+    field.report("A", 28.0, 77.0, 4.0, 270, ts=1_000)
+    field.report("B", 29.5, 78.5, 6.0, 90, ts=1_000 + 1_800)
+    assert field.stats()["stations_reporting"] == 2
+
+    field.report("B", 29.5, 78.5, 6.0, 90, ts=1_000 + 3_700)
+    assert field.stats()["stations_reporting"] == 1
+    assert field.wind_at(28.0, 77.0) == (6.0, 90)  # only B's contribution is left
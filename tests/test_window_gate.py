@@ -0,0 +1,58 @@
+# test_window_gate.py — one release per window: order, superseded and late updates
+
+from datetime import datetime, timedelta, timezone
+
+from streaming.window_gate import WindowGate
+
+T0 = datetime(2026, 1, 1, 6, 0, tzinfo=timezone.utc)
+
+
+def row(city, end_min, ts_sec, aqi=100):
+    """Window [end - 3 min, end) of city, updated by a reading at T0 + ts_sec."""
+    return {
+        "city": city, "aqi": aqi,
+        "window_end": T0 + timedelta(minutes=end_min),
+        "timestamp": T0 + timedelta(seconds=ts_sec),
+    }
+
+
+def released(gate, **kw):
+    return [(r["city"], r["window_end"], r["aqi"]) for r in gate.release(**kw)]
+
+
+def test_window_is_released_once_the_readings_pass_its_end():
+    gate = WindowGate()
+    gate.offer(row("A", 1, 10, aqi=100), True)
+    gate.offer(row("A", 2, 10, aqi=100), True)
+    assert released(gate) == []  # both still open
+
+    gate.offer(row("A", 1, 40, aqi=120), True)  # replaces the buffered row
+    gate.offer(row("A", 2, 70, aqi=150), True)  # replaces too; its reading at 1:10 closes window 1
+    gate.offer(row("A", 1, 70, aqi=150), False)  # retraction of an update: ignored
+    assert released(gate) == [("A", T0 + timedelta(minutes=1), 120)]
+    assert released(gate) == []  # nothing touched since
+
+    assert gate.stats == {"updates": 4, "superseded": 2, "late": 0, "retractions": 1, "released": 1}
+
+
+def test_windows_release_in_order_per_station_and_late_updates_are_counted():
+    gate = WindowGate()
+    for end in (3, 1, 2):  # one batch, arbitrary order
+        gate.offer(row("A", end, 200), True)
+    gate.offer(row("B", 5, 30), True)
+    assert released(gate) == [("A", T0 + timedelta(minutes=m), 100) for m in (1, 2, 3)]
+
+    gate.offer(row("A", 2, 150, aqi=400), True)  # lands in a window already released
+    gate.offer(row("A", 4, 250), True)
+    assert released(gate) == [("A", T0 + timedelta(minutes=4), 100)]
+    assert gate.stats["late"] == 1
+
+    assert released(gate, flush=True) == [("B", T0 + timedelta(minutes=5), 100)]  # on_end
+    assert gate.snapshot()["open"] == 0
+
+
+def test_closed_upstream_releases_every_row_at_batch_end():
+    gate = WindowGate(closed_upstream=True)
+    gate.offer(row("A", 2, 60), True)
+    gate.offer(row("A", 1, 30), True)
+    assert released(gate) == [("A", T0 + timedelta(minutes=m), 100) for m in (1, 2)]
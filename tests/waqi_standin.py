@@ -0,0 +1,60 @@
+# waqi_standin.py — local stand-in for the WAQI API, serving recorded fixtures
+# /map/bounds/ answers with fixtures/waqi_bounds.json and /feed/<id>/ with
+# fixtures/feed_<id>.json when present (else a WAQI-style error body).
+# Point WAQI_API_ROOT at it to run ingestion without the network:
+#
+#   python -m tests.waqi_standin [port]
+#   WAQI_API_ROOT=http://127.0.0.1:8765 AQI_INGEST_MODE=bounds python app.py
+
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fixtures = FIXTURES
+
+    def do_GET(self):
+        path = self.path.split("?")[0].strip("/")
+        if path == "map/bounds":
+            name = "waqi_bounds.json"
+        elif path.startswith("feed/"):
+            name = f"feed_{path[len('feed/'):].lstrip('@')}.json"
+        else:
+            return self._reply(404, {"status": "error", "data": "Unknown endpoint"})
+        file = os.path.join(self.fixtures, name)
+        if not os.path.exists(file):
+            return self._reply(200, {"status": "error", "data": "Unknown station"})
+        with open(file, encoding="utf-8") as f:
+            self._reply(200, json.load(f))
+        self.server.requests.append(self.path)
+
+    def _reply(self, code, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port=0, host="127.0.0.1"):
+    """Start the stand-in on a daemon thread; returns the server (server.root is its URL)."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.requests = []
+    server.root = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True, name="waqi-standin").start()
+    return server
+
+
+if __name__ == "__main__":
+    server = serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print(f"[STANDIN] WAQI fixtures from {FIXTURES} at {server.root}")
+    threading.Event().wait()